@@ -0,0 +1,270 @@
+import ast
+
+from tracer import RETURN_VAR
+
+# --- CONFIGURATION ---
+MAX_EVENTS = 200_000   # per trace; longer traces are aligned on their first MAX_EVENTS events
+MAX_EDITS = 1_000      # beyond this edit distance the traces count as unrelated (only the prefix is reported)
+MAX_HUNKS = 5          # differing stretches kept in the report
+PREVIEW = 4            # events shown per side of a hunk / before the divergence
+
+
+class TooDifferent(Exception):
+    """The edit distance passed MAX_EDITS."""
+
+
+# --- EVENTS ---
+def loop_lines(code):
+    """{line of a for/while header: loop nesting depth (1 = outermost)} for source code."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+    lines = {}
+
+    def visit(node, depth):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                visit(child, 0)  # loops count from the enclosing function
+            elif isinstance(child, (ast.For, ast.AsyncFor, ast.While)):
+                lines[child.lineno] = depth + 1
+                visit(child, depth + 1)
+            else:
+                visit(child, depth)
+    visit(tree, 0)
+    return lines
+
+
+def trace_events(log, code, limit=MAX_EVENTS):
+    """
+    Maps a full-mode TraceLog to comparable events. Variable names differ between
+    solutions, so an event carries what happened, not where:
+      ("set", value)  a local changed to value
+      ("iter", depth) a loop header was reached (one per iteration)
+      ("ret", value)  a call returned value
+    Returns (events, origins); origins[i] = (step, line, variable name or None).
+    A record holds the changes made by the line before it, so a change is
+    attributed to the previous record's line (its own line after a return,
+    when that isn't known).
+    """
+    loops = loop_lines(code)
+    events, origins = [], []
+    previous = None
+    for record in log:
+        step, line = record["step"], record["line"]
+        for name, value in record["vars"].items():
+            if name == RETURN_VAR:
+                events.append(("ret", value))
+                origins.append((step, line, None))
+            else:
+                events.append(("set", value))
+                origins.append((previous or (step, line)) + (name,))
+        if RETURN_VAR in record["vars"]:
+            previous = None
+            continue
+        # The iteration marker follows the changes the previous line made
+        depth = loops.get(line)
+        if depth:
+            events.append(("iter", depth))
+            origins.append((step, line, None))
+        previous = (step, line)
+        if len(events) >= limit:
+            del events[limit:], origins[limit:]
+            break
+    return events, origins
+
+
+# --- LINEAR-SPACE DIFF (Myers 1986, divide and conquer on the middle snake) ---
+def _middle_snake(a, b, a0, a1, b0, b1, max_edits):
+    """
+    Middle snake of the shortest edit script between a[a0:a1] and b[b0:b1].
+    Returns ((x, y, u, v), d): the snake runs from (x, y) to (u, v) in local
+    coordinates and d is the segment's edit distance. O(N + M) memory.
+    """
+    n, m = a1 - a0, b1 - b0
+    delta = n - m
+    odd = delta & 1
+    half = (n + m + 1) // 2
+    off = half + 1
+    vf = [0] * (2 * off + 1)
+    vb = [0] * (2 * off + 1)
+    for d in range(half + 1):
+        if 2 * d - 1 > max_edits:
+            raise TooDifferent()
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[off + k - 1] < vf[off + k + 1]):
+                x = vf[off + k + 1]
+            else:
+                x = vf[off + k - 1] + 1
+            y = x - k
+            sx, sy = x, y
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            vf[off + k] = x
+            c = delta - k
+            if odd and -(d - 1) <= c <= d - 1 and x + vb[off + c] >= n:
+                return (sx, sy, x, y), 2 * d - 1
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and vb[off + c - 1] < vb[off + c + 1]):
+                x = vb[off + c + 1]
+            else:
+                x = vb[off + c - 1] + 1
+            y = x - c
+            sx, sy = x, y
+            while x < n and y < m and a[a1 - 1 - x] == b[b1 - 1 - y]:
+                x += 1
+                y += 1
+            vb[off + c] = x
+            k = delta - c
+            if not odd and -d <= k <= d and x + vf[off + k] >= n:
+                return (n - x, m - y, n - sx, m - sy), 2 * d
+    raise AssertionError("no middle snake")  # unreachable: d = half always overlaps
+
+
+def matching_blocks(a, b, max_edits=MAX_EDITS):
+    """
+    [(i, j, size)] runs where a[i:i+size] == b[j:j+size] along a shortest edit
+    script, in order. Linear memory; time O((N + M) * D). Raises TooDifferent
+    once the edit distance D passes max_edits.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        raise TooDifferent()  # every length difference is at least one edit
+    blocks = []
+
+    def solve(a0, a1, b0, b1, budget):
+        start = a0
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            a0 += 1
+            b0 += 1
+        if a0 > start:
+            blocks.append((start, b0 - (a0 - start), a0 - start))
+        end = 0
+        while a1 > a0 and b1 > b0 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            end += 1
+        if a0 < a1 and b0 < b1:
+            (x, y, u, v), d = _middle_snake(a, b, a0, a1, b0, b1, budget)
+            solve(a0, a0 + x, b0, b0 + y, budget)
+            if u > x:
+                blocks.append((a0 + x, b0 + y, u - x))
+            solve(a0 + u, a1, b0 + v, b1, budget)
+        if end:
+            blocks.append((a1, b1, end))
+
+    solve(0, len(a), 0, len(b), max_edits)
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def opcodes(blocks, n, m):
+    """difflib-style [(tag, i1, i2, j1, j2)] for the stretches between matching blocks."""
+    ops, i, j = [], 0, 0
+    for bi, bj, size in blocks + [(n, m, 0)]:
+        if i < bi or j < bj:
+            tag = "replace" if i < bi and j < bj else ("delete" if i < bi else "insert")
+            ops.append((tag, i, bi, j, bj))
+        if size:
+            ops.append(("equal", bi, bi + size, bj, bj + size))
+        i, j = bi + size, bj + size
+    return ops
+
+
+# --- REPORT ---
+def describe_event(event, origin):
+    kind, value = event
+    step, line, name = origin
+    if kind == "set":
+        return f"{name} = {value}"
+    if kind == "ret":
+        return f"return {value}"
+    return f"loop iteration (depth {value})"
+
+
+def _side(events, origins, lo, hi, code_lines):
+    items = []
+    for i in range(lo, min(hi, lo + PREVIEW)):
+        step, line, _ = origins[i]
+        items.append({"step": step, "line": line, "event": describe_event(events[i], origins[i]),
+                      "source": code_lines[line - 1].strip() if 0 < line <= len(code_lines) else ""})
+    return items
+
+
+def align(user_log, user_code, ref_log, ref_code):
+    """
+    Aligns the user's and the reference's traces of the same input.
+    Returns {"user_events", "ref_events", "truncated", "similarity" (0..1, None if
+    too different to diff), "edits", "divergence" (None if identical, else the first
+    differing event of each side plus the common events leading up to it),
+    "hunks": [{"tag", "user": [...], "ref": [...]}]}.
+    """
+    user_events, user_origins = trace_events(user_log, user_code)
+    ref_events, ref_origins = trace_events(ref_log, ref_code)
+    user_lines, ref_lines = user_code.splitlines(), ref_code.splitlines()
+    n, m = len(user_events), len(ref_events)
+
+    # Events are compared as ints: cheaper than tuples of strings in the inner loop
+    a = [hash(e) for e in user_events]
+    b = [hash(e) for e in ref_events]
+    prefix = 0
+    while prefix < min(n, m) and a[prefix] == b[prefix]:
+        prefix += 1
+
+    report = {
+        "user_events": n, "ref_events": m,
+        "truncated": n >= MAX_EVENTS or m >= MAX_EVENTS,
+        "similarity": 1.0 if n == m == prefix else None,
+        "edits": 0 if n == m == prefix else None,
+        "divergence": None, "hunks": [],
+    }
+    if n == m == prefix:
+        return report
+
+    report["divergence"] = {
+        "index": prefix,
+        "user": _side(user_events, user_origins, prefix, n, user_lines)[:1],
+        "ref": _side(ref_events, ref_origins, prefix, m, ref_lines)[:1],
+        "before": _side(user_events, user_origins, max(0, prefix - PREVIEW), prefix, user_lines),
+    }
+    try:
+        blocks = matching_blocks(a, b)
+    except TooDifferent:
+        return report
+    matched = sum(size for _, _, size in blocks)
+    report["similarity"] = 2 * matched / (n + m)
+    report["edits"] = (n - matched) + (m - matched)
+    for tag, i1, i2, j1, j2 in opcodes(blocks, n, m):
+        if tag != "equal" and len(report["hunks"]) < MAX_HUNKS:
+            report["hunks"].append({"tag": tag,
+                                    "user": _side(user_events, user_origins, i1, i2, user_lines),
+                                    "ref": _side(ref_events, ref_origins, j1, j2, ref_lines)})
+    return report
+
+
+def summary(report):
+    """Short plain-text account of the alignment for the LLM context."""
+    div = report["divergence"]
+    if div is None:
+        return "Execution trace: identical to the reference's step by step."
+    text = f"Execution trace: matches the reference for the first {div['index']} events"
+    if div["user"] and div["ref"]:
+        u, r = div["user"][0], div["ref"][0]
+        text += (f"; first divergence at your line {u['line']} (`{u['source']}`: {u['event']}) "
+                 f"where the reference does {r['event']} (line {r['line']}: `{r['source']}`)")
+    elif div["user"]:
+        u = div["user"][0]
+        text += f"; yours continues with line {u['line']} (`{u['source']}`: {u['event']}) after the reference ends"
+    else:
+        r = div["ref"][0]
+        text += f"; yours stops where the reference continues with {r['event']} (line {r['line']})"
+    if report["similarity"] is not None:
+        text += f". {report['similarity']:.0%} of events align"
+    else:
+        text += ". The traces are too different to align further"
+    return text + "."
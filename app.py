@@ -1,12 +1,17 @@
 import streamlit as st
-import google.generativeai as genai
-from google.api_core.exceptions import ResourceExhausted
 import time
 
 # IMPORT BACKEND MODULES
-from tracer import CodeTracer
-from inspector import inspect_code_snippet
-from search_engine import find_solution
+from executor import get_pool
+from llm_gateway import get_gateway
+from feedback import SECTIONS, review_prompt, deep_dive_prompt, stream_feedback, parse_sections
+from pipeline import analyze, PHASE_NAMES, EXACT_MATCH
+from search_engine import get_engine
+import metrics
+
+# --- CONFIGURATION ---
+TRACE_PAGE_SIZE = 50  # trace records per page in the Execution Trace tab
+DEBUG = st.query_params.get("debug") == "1"  # ?debug=1 adds the Debug tab (span waterfall, metrics)
 
 # --- PAGE CONFIG (MUST BE FIRST) ---
 st.set_page_config(
@@ -93,6 +98,19 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- SHARED RESOURCES (survive script reruns) ---
+@st.cache_resource(show_spinner="Loading search index...")
+def load_search_engine():
+    return get_engine().warmup()
+
+@st.cache_resource(show_spinner="Starting execution workers...")
+def load_execution_pool():
+    metrics.serve()  # Prometheus endpoint if CODEALIGNER_METRICS_PORT is set
+    return get_pool()
+
+engine = load_search_engine()
+pool = load_execution_pool()
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.markdown("## CodeAligner")
@@ -104,87 +122,144 @@ with st.sidebar:
     st.markdown("#### System Status")
     st.info("Database Connected: Local (ChromaDB)")
     st.info("Execution Engine: Active (Python)")
+    llm_stats = get_gateway().stats()
+    st.caption(f"LLM cache: {llm_stats['hits']} hits / {llm_stats['misses']} calls "
+               f"({llm_stats['coalesced']} coalesced, {llm_stats['retries']} retries)")
 
 # --- HELPERS ---
-def get_ui_feedback(model, user_code, lang, issue_type, context, reference_code=None):
-    """Concise, Executive Summary Style Feedback"""
-    
-    ref_instruction = ""
-    if reference_code:
-        ref_instruction = f"\nREFERENCE SOLUTION (Use this as ground truth):\n{reference_code}\n"
+def render_sections(slots, text):
+    """Fills one placeholder per review section (Diagnosis, Action Plan, ...) from the text so far."""
+    for name, body in parse_sections(text).items():
+        if body:
+            slots[name].markdown(f"##### {name}\n{body}" if name else body)
 
-    prompt = f"""
-    You are a Principal Software Engineer conducting a code review.
-    
-    USER CODE ({lang}):
-    {user_code}
-    {ref_instruction}
-    
-    CONTEXT: {issue_type} | {context}
-    
-    TASK: Provide a structured code review using the exact headers below.
-    
-    ### 1. Diagnosis
-    [Brief explanation of the logic error or inefficiency if there is any. Otherwise, appreciate the code]
-    
-    ### 2. Action Plan
-    [Concrete steps to fix or optimize if needed]
-    
-    ### 3. Solution
-    ```{lang}
-    [The corrected code block]
-    ```
-    
-    ### 4. Complexity Analysis
-    [Time & Space Big O with brief reasoning]
-    
-    CONSTRAINT: Do not output 'undefined'. Keep it professional, structured, brief and direct. We can keep indepth analysis for later.
+def llm_context(res):
+    """Verdict plus the measured facts (reference family, complexity, trace divergence) the mentor should build on."""
+    context = res["fb_msg"]
+    for key in ("family", "complexity", "alignment"):
+        if res.get(key):
+            context += f" | {res[key]['summary']}"
+    return context
+
+def render_alignment(report):
+    """First divergence between the user's and the reference's trace, side by side."""
+    st.markdown(f"**Trace alignment** on input `{report['args']!r}`")
+    div = report["divergence"]
+    if div is None:
+        st.success("Step-by-step identical to the reference.")
+        return
+    similarity = f"{report['similarity']:.0%} of events align" if report["similarity"] is not None \
+        else "too different to align beyond the first divergence"
+    st.caption(f"{report['user_events']} vs {report['ref_events']} events, {similarity}"
+               + (" (long traces truncated)" if report["truncated"] else ""))
+    if div["before"]:
+        st.markdown("Common steps just before:  " + " → ".join(f"`{e['event']}`" for e in div["before"]))
+    col_user, col_ref = st.columns(2)
+    for col, title, side in ((col_user, "Yours", div["user"]), (col_ref, "Reference", div["ref"])):
+        col.markdown(f"**{title}**")
+        if side:
+            col.code(f"line {side[0]['line']}: {side[0]['source']}\n# {side[0]['event']}", language="python")
+        else:
+            col.caption("(trace ends here)")
+    if report["hunks"]:
+        with st.expander(f"Differing stretches ({len(report['hunks'])} shown)"):
+            for hunk in report["hunks"]:
+                rows = max(len(hunk["user"]), len(hunk["ref"]))
+                st.table({title: [e["event"] for e in hunk[side]] + ["-"] * (rows - len(hunk[side]))
+                          for title, side in (("yours", "user"), ("reference", "ref"))})
+
+def render_debug(res):
+    """Hidden tab: this analysis as a span waterfall, plus process-wide latency percentiles."""
+    spans = res.get("spans") or []
+    st.markdown(f"**Request waterfall** ({len(spans)} spans)")
+    if spans:
+        import altair as alt
+        depth, rows = {}, []
+        for s in spans:  # sorted by start, so a parent always comes before its children
+            depth[s["id"]] = depth.get(s["parent"], -1) + 1
+            rows.append({"span": f"{'  ' * depth[s['id']]}{s['name']} #{s['id']}",
+                         "start_ms": s["start"] * 1000, "end_ms": (s["start"] + s["seconds"]) * 1000,
+                         "ms": round(s["seconds"] * 1000, 1), "attrs": str(s["attrs"])})
+        chart = alt.Chart(alt.Data(values=rows)).mark_bar().encode(
+            x=alt.X("start_ms:Q", title="ms since request start"), x2="end_ms:Q",
+            y=alt.Y("span:N", sort=None, title=None), tooltip=["span:N", "ms:Q", "attrs:N"],
+        ).properties(height=max(120, 18 * len(rows)))
+        st.altair_chart(chart, use_container_width=True)
+
+    st.markdown("**Latency percentiles** (this process)")
+    rows = []
+    for row in metrics.get_registry().summary():
+        if row["metric"].startswith("span_seconds"):  # seconds -> ms for reading
+            row = dict(row, **{k: round(row[k] * 1000, 2) for k in ("mean", "p50", "p95", "p99")})
+        rows.append(row)
+    st.dataframe(rows, use_container_width=True)
+    st.caption("span_seconds rows in ms; sizes (trace_records, trace_bytes) as counted.")
+    st.json(metrics.get_registry().collected(), expanded=False)
+    with st.expander("Prometheus export"):
+        st.code(metrics.get_registry().prometheus_text(), language="text")
+
+def render_review(res):
     """
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"AI Service Error: {str(e)}"
-
-def get_deep_dive_feedback(model, user_code, lang, issue_type, context):
-    """Detailed Academic Breakdown"""
-    prompt = f"""
-    You are a Computer Science Professor.
-    USER CODE ({lang}):
-    {user_code}
-    CONTEXT: {issue_type} | {context}
-    
-    TASK:
-    1. **Algorithmic Concept:** Explain the pattern used (e.g., Two Pointers, Sliding Window).
-    2. **Step-by-Step Diagnosis:** Walk through the execution trace to show exactly where it deviates.
-    3. **Complexity Theory:** Prove mathematically why the solution is O(n) vs O(n^2).
-    4. **Industry Standard:** How would this be written in a FAANG production environment?
-    
-    FORMAT: Use clear headers and bullet points.
+    Executive summary: streamed into the Mentor tab on first render, section by section,
+    then kept in the results so later reruns render it instantly.
+    """
+    slots = {name: st.empty() for name in ("",) + SECTIONS}
+    if res.get("feedback") is None:
+        if res.get("error"):
+            prompt = review_prompt(res["u_code"], res["lang"], "RUNTIME CRASH", res["u_res"])
+        else:
+            prompt = review_prompt(res["u_code"], res["lang"], res["fb_type"], llm_context(res),
+                                   reference_code=res["used_reference"])
+        started = time.perf_counter()
+        text, first_chunk = "", None
+        for chunk in stream_feedback(prompt, api_key):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            text += chunk
+            render_sections(slots, text)
+        res["feedback"] = text
+        res["timings"]["feedback (first token)"] = first_chunk or 0.0
+        res["timings"]["feedback"] = time.perf_counter() - started
+    render_sections(slots, res["feedback"])
+
+def render_deep_dive(res):
     """
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"AI Service Error: {str(e)}"
+    Streams the deep dive. Any click (the Stop button included) makes Streamlit rerun
+    the script, which abandons the stream; the rerun then finds it still 'running'
+    and marks it stopped, keeping the partial text.
+    """
+    dd = st.session_state.deep_dive
+    if dd["status"] == "running":
+        dd["status"] = "stopped"
+
+    if dd["status"] == "requested":
+        dd["status"] = "running"
+        st.button("⏹ Stop", key="stop_deep_dive")
+        slot = st.empty()
+        prompt = deep_dive_prompt(res["u_code"], res["lang"], res["fb_type"], llm_context(res))
+        for chunk in stream_feedback(prompt, api_key):
+            dd["text"] += chunk
+            slot.markdown(dd["text"])
+        dd["status"] = "done"
+        st.rerun()  # drop the Stop button
+
+    if dd["text"]:
+        st.markdown("---")
+        st.markdown(dd["text"])
+        if dd["status"] == "stopped":
+            st.caption("Deep dive stopped. Click the button again to regenerate it.")
 
 # --- SESSION STATE ---
 if 'results' not in st.session_state:
     st.session_state.results = None
 if 'deep_dive' not in st.session_state:
-    st.session_state.deep_dive = None
+    st.session_state.deep_dive = {"text": "", "status": "idle"}
 
 # --- CALLBACKS ---
 def generate_deep_dive():
     res = st.session_state.results
     if res and api_key:
-        genai.configure(api_key=api_key)
-        model_dd = genai.GenerativeModel('gemini-2.0-flash')
-        with st.spinner("Generating comprehensive analysis..."):
-            deep_fb = get_deep_dive_feedback(
-                model_dd, res["u_code"], res["lang"], res["fb_type"], res["fb_msg"]
-            )
-            st.session_state.deep_dive = deep_fb
+        st.session_state.deep_dive = {"text": "", "status": "requested"}
 
 # --- MAIN LAYOUT ---
 col_left, col_right = st.columns([1, 1], gap="large")
@@ -212,99 +287,41 @@ if run_btn:
         st.toast("Missing API Key", icon="⚠️")
         st.stop()
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.0-flash')
-
     with col_right:
         st.markdown("### Diagnostics")
         progress_bar = st.progress(0)
         status_text = st.empty()
+        status_text.markdown("**Analyzing: static analysis, search and execution in parallel...**")
 
-        # 1. INSPECTION
-        status_text.markdown("**Phase 1: Static Analysis...**")
-        meta = inspect_code_snippet(user_code, problem_desc, api_key)
-        progress_bar.progress(33)
-        
-        if not meta:
-            st.error("Analysis failed. Please check input.")
-            st.stop()
-            
-        lang = meta.get('language', 'unknown')
-        func = meta.get('user_function', 'unknown')
-        slug = meta.get('predicted_slug', 'Unknown') 
-        inputs = meta.get('test_input', '()')
-
-        # 2. EXECUTION
-        status_text.markdown(f"**Phase 2: Executing Trace (`{slug}`)...**")
-        u_res = None
-        u_log = []
-        
-        if lang.lower() == 'python':
-            tracer = CodeTracer()
+        # 1-3. INSPECTION, EXECUTION, SEARCH (independent phases run concurrently)
+        finished = []
+        def on_phase_done(name, seconds):
+            finished.append(name)
+            progress_bar.progress(int(90 * len(finished) / len(PHASE_NAMES)))
+            status_text.markdown(f"**Done: `{name}`** ({seconds * 1000:.0f} ms)")
+
+        started = time.perf_counter()
+        with metrics.request("analyze") as req:
             try:
-                real_args = eval(inputs)
-                if not isinstance(real_args, tuple): real_args = (real_args,)
-                u_res, u_log = tracer.run(user_code, func, real_args, is_class=False)
-                
-                if isinstance(u_res, str) and "Error" in u_res:
-                    st.error(f"Runtime Exception: {u_res}")
-                    fb = get_ui_feedback(model, user_code, lang, "RUNTIME CRASH", u_res)
-                    st.session_state.results = {"error": True, "feedback": fb}
-                    st.stop()
-            except Exception as e:
-                st.error(f"System Error: {e}")
-                st.stop()
-        progress_bar.progress(66)
-        
-        # 3. SEARCH & COMPARE
-        status_text.markdown("**Phase 3: Verifying Solution...**")
-        golden_code, conf = find_solution(user_code, predicted_slug=slug)
-        progress_bar.progress(100)
-        time.sleep(0.5)
+                res = analyze(user_code, problem_desc, api_key, engine, pool, on_done=on_phase_done)
+            except RuntimeError as e:
+                res = None
+                st.error(str(e))
+        if res is None:
+            st.stop()
+        res["spans"] = req.as_dict()["spans"]
+
+        # 4. REPORT: the review streams into the Mentor Review tab while it renders
+        if res["error"]:
+            st.error(f"Runtime Exception: {res['u_res']}")
+        res["feedback"] = None
+        res["wall"] = time.perf_counter() - started
         progress_bar.empty()
         status_text.empty()
 
-        # 4. GENERATE REPORT
-        fb_type = "REVIEW"
-        fb_msg = "Complexity Analysis"
-        g_res = None
-        g_log = []
-        used_reference = None
-
-        if conf > 0.9 and lang.lower() == 'python':
-            gold_meta = inspect_code_snippet(golden_code, "", api_key)
-            if gold_meta:
-                g_func = gold_meta.get('user_function') or "twoSum"
-                g_res, g_log = tracer.run(golden_code, g_func, real_args, is_class=True)
-                used_reference = golden_code
-                
-                if str(u_res) != str(g_res):
-                    fb_type = "LOGIC ERROR"
-                    fb_msg = f"Expected {g_res}, Got {u_res}"
-                elif len(u_log) > len(g_log) * 2:
-                    fb_type = "OPTIMIZATION NEEDED"
-                    fb_msg = f"Steps: {len(u_log)} vs Ref: {len(g_log)}"
-                else:
-                    fb_type = "OPTIMAL"
-                    fb_msg = "Performance matches reference."
-
-        concise_fb = get_ui_feedback(model, user_code, lang, fb_type, fb_msg, reference_code=used_reference)
-
-        st.session_state.results = {
-            "error": False,
-            "lang": lang,
-            "conf": conf,
-            "u_log": u_log,
-            "u_res": u_res,
-            "u_code": user_code,
-            "slug": slug,
-            "golden_code": golden_code,
-            "feedback": concise_fb,
-            "fb_type": fb_type,
-            "fb_msg": fb_msg
-        }
+        st.session_state.results = res
         # Reset deep dive on new run
-        st.session_state.deep_dive = None
+        st.session_state.deep_dive = {"text": "", "status": "idle"}
 
 # --- RENDER RESULTS ---
 if st.session_state.results:
@@ -313,20 +330,36 @@ if st.session_state.results:
     with col_right:
         if res.get("error"):
             st.error("Analysis Halted")
-            st.markdown(res["feedback"])
+            render_review(res)
         else:
             # TABS interface
-            tab_overview, tab_trace, tab_code, tab_mentor = st.tabs(
-                ["Overview", "Execution Trace", "Reference Code", "Mentor Review"]
-            )
+            tabs = st.tabs(["Overview", "Execution Trace", "Reference Code", "Mentor Review"]
+                           + (["Debug"] if DEBUG else []))
+            tab_overview, tab_trace, tab_code, tab_mentor = tabs[:4]
+            if DEBUG:
+                with tabs[4]:
+                    render_debug(res)
             
             with tab_overview:
                 c1, c2, c3 = st.columns(3)
                 c1.metric("Language", res["lang"].upper())
                 c2.metric("Match Score", f"{res['conf']:.0%}")
-                c3.metric("User Steps", len(res["u_log"]) if res["lang"]=='python' else "-")
+                c3.metric("User Steps", res["u_steps"] if res.get("executed") else "-")
                 
                 st.caption(f"Target Problem: **{res['slug']}**")
+                if res.get("family"):
+                    st.caption(res["family"]["summary"])
+                if res.get("checks"):
+                    passed = sum(c["got"] == c["expected"] for c in res["checks"])
+                    st.caption(f"Reference inputs passed: **{passed}/{len(res['checks'])}** (precomputed)")
+                if res.get("diff"):
+                    diff = res["diff"]
+                    st.caption(f"Differential testing: **{diff['valid']}** generated inputs compared "
+                               f"({diff['inputs'] - diff['valid']} rejected by the reference)")
+                    if diff["counterexample"]:
+                        label = "Minimal counterexample" if diff["counterexample"]["verified"] else \
+                            "Unverified counterexample (may be another valid answer)"
+                        st.code(f"{label}: {diff['counterexample']['args']!r}", language="python")
                 
                 if res["fb_type"] == "LOGIC ERROR":
                     st.error(f"Outcome: {res['fb_msg']}")
@@ -334,25 +367,57 @@ if st.session_state.results:
                     st.warning(f"Outcome: {res['fb_msg']}")
                 elif res["fb_type"] == "OPTIMAL":
                     st.success("Outcome: Optimal Solution")
+                elif res.get("diff") and res["diff"]["counterexample"]:
+                    st.info(f"Outcome: {res['fb_msg']}")
                 else:
                     st.info("Outcome: Static Analysis")
 
+                if res.get("complexity"):
+                    scaling = res["complexity"]
+                    st.caption(scaling["summary"])
+                    with st.expander("Scaling runs (steps per input size)"):
+                        series = {"yours": {n: steps for n, steps, _ in scaling["user"]["samples"]}}
+                        if scaling["reference"]:
+                            series["reference"] = {n: steps for n, steps, _ in scaling["reference"]["samples"]}
+                        st.line_chart(series)
+
+                if res.get("phase_errors"):
+                    st.caption("Not run: " + "; ".join(f"{name} ({err})" for name, err in res["phase_errors"].items()))
+                with st.expander(f"Phase timings (analysis {res['wall'] * 1000:.0f} ms)"):
+                    st.table({"phase": list(res["timings"]),
+                              "ms": [round(t * 1000) for t in res["timings"].values()]})
+
             with tab_trace:
-                if res["lang"] == 'python':
+                if res.get("executed"):
                     st.markdown(f"**Final Output:** `{res['u_res']}`")
-                    st.json(res["u_log"], expanded=False)
+                    u_log = res["u_log"]
+                    if len(u_log):
+                        # Page through the spilled trace instead of rendering it all
+                        pages = u_log.pages(TRACE_PAGE_SIZE)
+                        page = st.number_input(f"Trace page (1-{pages}, {len(u_log)} steps)",
+                                               min_value=1, max_value=pages, value=1)
+                        st.json(u_log.page(page - 1, TRACE_PAGE_SIZE), expanded=False)
+                    elif res["lang"].lower() != 'python':
+                        st.caption("Compiled code is counted (loop iterations and calls), not traced line by line.")
+                    if res.get("alignment"):
+                        st.divider()
+                        render_alignment(res["alignment"])
                 else:
-                    st.info("Tracing is available for Python only.")
+                    st.info("Tracing is available for Python, C++ and Java (with its compiler installed).")
 
             with tab_code:
-                if res["conf"] > 0.9:
-                    st.code(res["golden_code"], language=res["lang"])
+                if res["conf"] > EXACT_MATCH:
+                    st.code(res["golden_code"], language="python")
+                    fam = res.get("family")
+                    if fam and fam["nearest"]["id"] != fam["optimal"]["id"]:
+                        with st.expander(f"Closest to your approach ({fam['nearest']['approach']})"):
+                            st.code(fam["nearest"]["code"], language="python")
                 else:
                     st.warning("No exact reference found.")
 
             with tab_mentor:
                 st.markdown("#### Executive Summary")
-                st.markdown(res["feedback"])
+                render_review(res)
                 
                 st.divider()
                 
@@ -361,6 +426,4 @@ if st.session_state.results:
                 with col_btn:
                     st.button("📖 Detailed Deep Dive", on_click=generate_deep_dive, use_container_width=True)
                 
-                if st.session_state.deep_dive:
-                    st.markdown("---")
-                    st.markdown(st.session_state.deep_dive)
\ No newline at end of file
+                render_deep_dive(res)
\ No newline at end of file
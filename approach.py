@@ -0,0 +1,177 @@
+"""
+Algorithmic approach of a solution (hash map, two pointers, brute force, ...),
+read off its AST. build_db.py tags every stored reference with it, and the
+pipeline uses it to pick the reference closest to the user's own approach.
+"""
+import ast
+import re
+
+# --- CONFIGURATION ---
+# Most specific first: a solution is labelled with the first approach whose rule matches
+APPROACHES = ("dynamic-programming", "binary-search", "heap", "graph-search", "two-pointers",
+              "brute-force", "hash-map", "sorting", "recursion", "linear-scan", "direct")
+TAG_WEIGHT = 0.5  # family distance: weight of tag overlap next to a different approach label
+
+_MEMO_NAMES = {"dp", "memo", "cache", "f", "g"}
+_LOW_NAMES = {"l", "lo", "low", "left", "i", "start", "s", "begin"}
+_HIGH_NAMES = {"r", "hi", "high", "right", "j", "end", "e", "stop"}
+_HASH_CALLS = {"dict", "set", "Counter", "defaultdict", "OrderedDict"}
+_QUEUE_CALLS = {"deque", "Queue"}
+_VISITED_NAMES = {"visited", "vis"}
+# Compiled languages: no AST, keywords of the standard library calls each approach relies on
+_KEYWORD_TAGS = (
+    ("memoization", re.compile(r"\b(dp|memo)\b")),
+    ("binary-search", re.compile(r"\b(lower_bound|upper_bound|binary_search|binarySearch)\b")),
+    ("heap", re.compile(r"\b(priority_queue|PriorityQueue)\b")),
+    ("queue", re.compile(r"\b(queue|deque|ArrayDeque|LinkedList)\s*<")),
+    ("hash-map", re.compile(r"\b(unordered_map|unordered_set|HashMap|HashSet|map|set|Map|Set)\s*<")),
+    ("sorting", re.compile(r"\b(sort)\s*\(")),
+)
+
+
+def _name(node):
+    """Called name of a Call's func: foo(...) / mod.foo(...) / self.foo(...) -> 'foo'."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _loops_nested(node, depth=0):
+    """Deepest loop nesting under node (a function's body starts again from 0)."""
+    deepest = depth
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            inner = 0
+        else:
+            inner = depth + 1 if isinstance(child, (ast.For, ast.While, ast.comprehension)) else depth
+        deepest = max(deepest, _loops_nested(child, inner))
+    return deepest
+
+
+def _bisects(loop):
+    """while lo <= hi / lo < hi with a midpoint computed as ... // 2 or ... >> 1 inside."""
+    if not isinstance(loop.test, ast.Compare):
+        return False
+    for node in ast.walk(loop):
+        if isinstance(node, ast.BinOp) and (
+                isinstance(node.op, ast.FloorDiv) and isinstance(node.right, ast.Constant) and node.right.value == 2
+                or isinstance(node.op, ast.RShift) and isinstance(node.right, ast.Constant) and node.right.value == 1):
+            return True
+    return False
+
+
+def _moves_both_ends(loop):
+    """while i < j with i moved forward and j moved back inside the loop."""
+    test = loop.test
+    if not (isinstance(test, ast.Compare) and len(test.comparators) == 1
+            and isinstance(test.left, ast.Name) and isinstance(test.comparators[0], ast.Name)):
+        return False
+    names = {test.left.id, test.comparators[0].id}
+    moved = {node.target.id for node in ast.walk(loop)
+             if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name)}
+    moved |= {t.id for node in ast.walk(loop) if isinstance(node, ast.Assign)
+              for t in node.targets if isinstance(t, ast.Name)}
+    return names <= moved and bool(names & _LOW_NAMES or names & _HIGH_NAMES)
+
+
+def _recursive(tree):
+    """Some function calls itself (directly, or as self.name)."""
+    for fn in ast.walk(tree):
+        if isinstance(fn, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for node in ast.walk(fn):
+                if isinstance(node, ast.Call) and _name(node.func) == fn.name:
+                    return True
+    return False
+
+
+def _python_tags(tree):
+    tags = set()
+    calls = {_name(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    stored = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+
+    decorators = {_name(d.func if isinstance(d, ast.Call) else d) for node in ast.walk(tree)
+                  if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) for d in node.decorator_list}
+    if decorators & {"lru_cache", "cache"} or stored & _MEMO_NAMES and any(
+            isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store)
+            and isinstance(node.value, ast.Name) and node.value.id in _MEMO_NAMES for node in ast.walk(tree)):
+        tags.add("memoization")
+    if calls & {"bisect", "bisect_left", "bisect_right", "insort"} or any(
+            isinstance(node, ast.While) and _bisects(node) for node in ast.walk(tree)):
+        tags.add("binary-search")
+    if calls & {"heappush", "heappop", "heapify", "heappushpop", "nlargest", "nsmallest"}:
+        tags.add("heap")
+    if calls & _QUEUE_CALLS:
+        tags.add("queue")
+    if stored & _VISITED_NAMES:
+        tags.add("visited")
+    if any(isinstance(node, ast.While) and _moves_both_ends(node) for node in ast.walk(tree)):
+        tags.add("two-pointers")
+    if calls & _HASH_CALLS or any(isinstance(node, (ast.Dict, ast.Set, ast.DictComp, ast.SetComp))
+                                  for node in ast.walk(tree)):
+        tags.add("hash-map")
+    if calls & {"sorted", "sort"}:
+        tags.add("sorting")
+    if _recursive(tree):
+        tags.add("recursion")
+    depth = _loops_nested(tree)
+    if depth >= 2:
+        tags.add("nested-loops")
+    if depth >= 1:
+        tags.add("loop")
+    return tags
+
+
+def _approach(tags):
+    if "memoization" in tags:
+        return "dynamic-programming"
+    if "binary-search" in tags:
+        return "binary-search"
+    if "heap" in tags:
+        return "heap"
+    if "queue" in tags or "visited" in tags and "recursion" in tags:
+        return "graph-search"
+    if "two-pointers" in tags:
+        return "two-pointers"
+    if "nested-loops" in tags and not tags & {"hash-map", "sorting"}:
+        return "brute-force"
+    for label in ("hash-map", "sorting", "recursion"):
+        if label in tags:
+            return label
+    if "loop" in tags:
+        return "linear-scan"
+    return "direct"
+
+
+def classify(code, language="python"):
+    """
+    {"approach": one of APPROACHES (or "unknown"), "tags": sorted [str]}.
+    Python is read from its AST; C++ / Java only from library names, so their
+    loop structure (brute-force, linear-scan...) stays "unknown".
+    """
+    if language != "python":
+        tags = {tag for tag, pattern in _KEYWORD_TAGS if pattern.search(code or "")}
+        return {"approach": _approach(tags) if tags else "unknown", "tags": sorted(tags)}
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return {"approach": "unknown", "tags": []}
+    tags = _python_tags(tree)
+    return {"approach": _approach(tags), "tags": sorted(tags)}
+
+
+def family_distance(a, b):
+    """
+    0 for two solutions of the same approach with the same tags, up to 1 + TAG_WEIGHT.
+    a, b: classify() results (or metadata with "approach" and comma-joined "tags").
+    """
+    def tag_set(x):
+        tags = x.get("tags") or ()
+        return set(tags.split(",") if isinstance(tags, str) else tags) - {""}
+
+    ta, tb = tag_set(a), tag_set(b)
+    overlap = len(ta & tb) / len(ta | tb) if ta | tb else 1.0
+    known = "unknown" not in (a.get("approach"), b.get("approach"))
+    same = a.get("approach") == b.get("approach") and known
+    return (0.0 if same else 1.0) + TAG_WEIGHT * (1.0 - overlap)
@@ -0,0 +1,167 @@
+import threading
+import sqlite3
+import marshal
+import json
+import ast
+import sys
+import os
+
+from tracer import SOURCE_NAME
+
+# --- CONFIGURATION ---
+ARTIFACTS_NAME = "artifacts.sqlite3"  # stored inside the DB folder, next to Chroma's files
+CANONICAL_INPUTS = int(os.getenv("CODEALIGNER_CANONICAL_INPUTS", 5))  # reference runs per problem
+CACHE_TAG = sys.implementation.cache_tag  # marshalled bytecode only loads on the same interpreter
+
+
+def compile_solution(code_str):
+    """Marshalled code object, compiled under the tracer's filename (or None if it doesn't compile)."""
+    try:
+        return marshal.dumps(compile(code_str, SOURCE_NAME, "exec"))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def _parse_call_args(text):
+    """'nums = [2,7], target = 9' -> {'nums': [2, 7], 'target': 9} (literals only)."""
+    try:
+        call = ast.parse(f"f({text})", mode="eval").body
+        kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in call.keywords}
+        if call.args or None in kwargs:
+            return None
+        return kwargs
+    except (SyntaxError, ValueError, TypeError, MemoryError, RecursionError):
+        return None
+
+
+def canonical_inputs(row, signature, limit=CANONICAL_INPUTS):
+    """
+    Argument tuples for a dataset row's `input_output` examples, ordered by the
+    solution's parameter names. Examples that aren't plain literals (or don't
+    match the signature) are skipped.
+    """
+    examples = row.get('input_output') or []
+    if isinstance(examples, str):
+        try:
+            examples = json.loads(examples)
+        except ValueError:
+            return []
+    if not signature:
+        return []
+
+    entry = next(m for m in signature["methods"] if m["name"] == signature["entry_point"])
+    names = [p["name"] for p in entry["params"]]
+    inputs = []
+    for example in examples:
+        if len(inputs) >= limit:
+            break
+        kwargs = _parse_call_args((example or {}).get("input", ""))
+        if kwargs is None or sorted(kwargs) != sorted(names):
+            continue
+        inputs.append(tuple(kwargs[n] for n in names))
+    return inputs
+
+
+class ArtifactStore:
+    """
+    Per-solution artefacts keyed by Chroma id, in SQLite:
+      artifacts       - content hash, signature JSON, marshalled bytecode (+ interpreter tag)
+      reference_runs  - result and step count of the solution on each canonical input
+      growth          - the solution's measured complexity order (complexity.py) and its confidence
+    Written by build_db.py, read on the request path. Thread-safe.
+    """
+    def __init__(self, db_path):
+        self.path = os.path.join(db_path, ARTIFACTS_NAME)
+        os.makedirs(db_path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " id TEXT PRIMARY KEY, hash TEXT NOT NULL, signature TEXT,"
+            " cache_tag TEXT, bytecode BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reference_runs ("
+            " id TEXT NOT NULL, position INTEGER NOT NULL, args TEXT NOT NULL,"
+            " result TEXT NOT NULL, steps INTEGER NOT NULL, PRIMARY KEY (id, position))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS growth ("
+            " id TEXT PRIMARY KEY, estimate TEXT, confidence REAL NOT NULL)"
+        )
+
+    # --- WRITE (build time) ---
+    def put(self, doc_id, content_hash, signature, bytecode, runs, growth=None):
+        """
+        Replaces everything stored for doc_id. runs: [(args_tuple, result_str, steps)];
+        growth: complexity.profile() result (or None if it wasn't measured).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM reference_runs WHERE id=?", (doc_id,))
+            self._conn.execute("DELETE FROM growth WHERE id=?", (doc_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                (doc_id, content_hash, json.dumps(signature) if signature else None,
+                 CACHE_TAG if bytecode else None, bytecode),
+            )
+            self._conn.executemany(
+                "INSERT INTO reference_runs VALUES (?, ?, ?, ?, ?)",
+                [(doc_id, n, repr(args), result, steps) for n, (args, result, steps) in enumerate(runs)],
+            )
+            if growth:
+                self._conn.execute("INSERT INTO growth VALUES (?, ?, ?)",
+                                   (doc_id, growth["order"], growth["confidence"]))
+            self._conn.commit()
+
+    def delete(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._conn.execute("DELETE FROM artifacts WHERE id=?", (doc_id,))
+                self._conn.execute("DELETE FROM reference_runs WHERE id=?", (doc_id,))
+                self._conn.execute("DELETE FROM growth WHERE id=?", (doc_id,))
+            self._conn.commit()
+
+    def hashes(self):
+        """{chroma_id: content_hash} of every stored artefact (for incremental builds)."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, hash FROM artifacts").fetchall())
+
+    # --- READ (request time) ---
+    def bytecode(self, doc_id):
+        """Marshalled code for doc_id, or None if missing or built by another interpreter."""
+        with self._lock:
+            row = self._conn.execute("SELECT cache_tag, bytecode FROM artifacts WHERE id=?",
+                                     (doc_id,)).fetchone()
+        if not row or row[0] != CACHE_TAG:
+            return None
+        return row[1]
+
+    def signature(self, doc_id):
+        with self._lock:
+            row = self._conn.execute("SELECT signature FROM artifacts WHERE id=?", (doc_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def reference_runs(self, doc_id):
+        """[(args_tuple, result_str, steps)] in canonical order ([] if none were recorded)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT args, result, steps FROM reference_runs WHERE id=? ORDER BY position", (doc_id,)
+            ).fetchall()
+        return [(ast.literal_eval(args), result, steps) for args, result, steps in rows]
+
+    def growth(self, doc_ids):
+        """{chroma_id: {"order", "confidence"}} for the ids that have a measured complexity."""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, estimate, confidence FROM growth WHERE id IN ({','.join('?' * len(doc_ids))})",
+                doc_ids,
+            ).fetchall()
+        return {doc_id: {"order": order, "confidence": confidence} for doc_id, order, confidence in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
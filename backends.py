@@ -0,0 +1,1106 @@
+"""
+Execution backends for compiled languages (C++ via g++, Java via javac).
+
+A submission is instrumented (a counter tick in every loop condition / loop body
+and at every function entry), wrapped in a generated harness and compiled once;
+the build is cached by hash of the harness source and toolchain. The harness
+reads one JSON argument list per stdin line, calls the entry point and writes
+"status<TAB>steps<TAB>seconds<TAB>result" per call, so a whole batch of inputs
+runs in one process. Results are printed the way Python's str() would, so they
+compare directly with the (Python) reference's.
+
+Steps are loop iterations + calls, not executed lines: they grow with the input
+like Python's line counts (so complexity fits work) but aren't comparable to them.
+"""
+from functools import lru_cache
+import subprocess
+import threading
+import tempfile
+import hashlib
+import shutil
+import signal
+import json
+import time
+import re
+import os
+
+import metrics
+
+# --- CONFIGURATION ---
+BUILD_DIR = os.getenv("CODEALIGNER_BUILD_DIR", "./.codealigner_cache/builds")
+MAX_BUILDS = int(os.getenv("CODEALIGNER_MAX_BUILDS", 500))   # cached builds kept on disk (oldest pruned)
+COMPILE_TIMEOUT = 60  # seconds per compiler run
+CXX = os.getenv("CODEALIGNER_CXX", "g++")
+CXX_FLAGS = ("-O2", "-std=c++17")
+JAVAC = os.getenv("CODEALIGNER_JAVAC", "javac")
+JAVA = os.getenv("CODEALIGNER_JAVA", "java")
+# The worker's address-space limit applies to the JVM too: keep its reservations small
+JAVA_OPTS = tuple(os.getenv("CODEALIGNER_JAVA_OPTS", "-Xmx256m -Xss8m -XX:+UseSerialGC -XX:TieredStopAtLevel=1 "
+                            "-XX:ReservedCodeCacheSize=32m -XX:CompressedClassSpaceSize=64m "
+                            "-XX:MaxMetaspaceSize=96m -XX:-UsePerfData").split())
+LANGUAGE_ALIASES = {"c++": "cpp", "cpp": "cpp", "cc": "cpp", "cxx": "cpp", "java": "java"}
+MAX_ERROR_LINES = 12  # compiler output kept in a build error
+
+CPP_TICK = "codealigner_rt::tick()"
+JAVA_TICK = "CodeAlignerRt.tick()"
+_KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "sizeof", "synchronized", "new", "delete",
+             "throw", "else", "do", "case", "decltype", "alignof", "static_assert", "assert", "super", "this",
+             "try", "operator", "defined"}
+_MODIFIERS = {"static", "inline", "virtual", "public", "private", "protected", "final", "synchronized",
+              "constexpr", "explicit", "friend", "abstract", "extern", "native", "strictfp"}
+
+
+class BuildError(Exception):
+    """The submission can't be run by this backend (unsupported signature, compile error, no toolchain)."""
+
+
+def normalize_language(language):
+    """'C++' -> 'cpp', 'Java' -> 'java', 'Python' -> 'python'; other names lowercased."""
+    language = (language or "unknown").strip().lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+# --- SOURCE SCANNING ---
+def _mask(code):
+    """code with comments and string / char literal contents blanked (same offsets and newlines)."""
+    out = list(code)
+    i, n = 0, len(code)
+
+    def blank(start, end):
+        for k in range(start, min(end, n)):
+            if out[k] != "\n":
+                out[k] = " "
+
+    while i < n:
+        if code[i] == "#" and not code[code.rfind("\n", 0, i) + 1:i].strip():  # preprocessor line
+            end = i
+            while True:
+                end = code.find("\n", end)
+                if end < 0 or code[end - 1] != "\\":
+                    break
+                end += 1
+            end = n if end < 0 else end
+            blank(i, end)
+            i = end
+        elif code.startswith("//", i):
+            end = code.find("\n", i)
+            end = n if end < 0 else end
+            blank(i, end)
+            i = end
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            blank(i, end)
+            i = end
+        elif code[i] in "\"'":
+            quote, j = code[i], i + 1
+            while j < n and code[j] != quote and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            blank(i + 1, j)
+            i = j + 1
+        else:
+            i += 1
+    return "".join(out)
+
+
+_PAIRS = {"(": ")", "[": "]", "{": "}"}
+
+
+def _close(mask, start):
+    """Index of the bracket closing the one at mask[start] (len(mask) if unbalanced)."""
+    depth = 0
+    for k in range(start, len(mask)):
+        c = mask[k]
+        if c in _PAIRS:
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+            if depth == 0:
+                return k
+    return len(mask)
+
+
+def _top_level(text, separator, angles=True):
+    """Positions of separator in text outside any brackets (angle brackets too if angles)."""
+    opening, closing = ("([{<", ")]}>") if angles else ("([{", ")]}")
+    depth, found = 0, []
+    for k, c in enumerate(text):
+        if c in opening:
+            depth += 1
+        elif c in closing:
+            depth -= 1
+        elif c == separator and depth == 0:
+            found.append(k)
+    return found
+
+
+def _statement_end(mask, start):
+    """Index of the ';' ending the simple statement at start."""
+    depth = 0
+    for k in range(start, len(mask)):
+        c = mask[k]
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+        elif c == ";" and depth == 0:
+            return k
+    return None
+
+
+def _skip_space(mask, k):
+    while k < len(mask) and mask[k].isspace():
+        k += 1
+    return k
+
+
+def _statement_span(mask, start):
+    """Index just past the statement starting at start (blocks, if / else, loops, try included)."""
+    k = _skip_space(mask, start)
+    if k >= len(mask):
+        return None
+    if mask[k] == "{":
+        return _close(mask, k) + 1
+    m = re.match(r"(if|for|while|switch|do|try)\b", mask[k:])
+    if not m:
+        end = _statement_end(mask, k)
+        return None if end is None else end + 1
+    keyword, k = m.group(1), k + m.end()
+    if keyword == "do":
+        k = _statement_span(mask, k)
+        tail = k is not None and re.match(r"\s*while\s*\(", mask[k:])
+        end = tail and _statement_end(mask, _close(mask, k + tail.end() - 1) + 1)
+        return end + 1 if end is not None else None
+    if keyword == "try":
+        k = _statement_span(mask, k)
+        while k is not None and re.match(r"\s*catch\s*\(", mask[k:]):
+            k = _statement_span(mask, _close(mask, mask.index("(", k)) + 1)
+        return k
+    k = _skip_space(mask, k)
+    if k >= len(mask) or mask[k] != "(":
+        return None
+    k = _statement_span(mask, _close(mask, k) + 1)
+    if keyword == "if" and k is not None and re.match(r"\s*else\b", mask[k:]):
+        k = _statement_span(mask, k + re.match(r"\s*else\b", mask[k:]).end())
+    return k
+
+
+def _classes(mask):
+    """[(name, body_start, body_end)] for every class / struct body."""
+    found = []
+    for m in re.finditer(r"\b(?:class|struct)\s+(\w+)[^;{()]*\{", mask):
+        found.append((m.group(1), m.end() - 1, _close(mask, m.end() - 1)))
+    return found
+
+
+def _functions(mask, class_names):
+    """
+    [{"name", "params" (text), "returns" (text), "open" (index of the body's '{'),
+      "class" (innermost enclosing class or None), "static"}] for every function definition.
+    """
+    classes = _classes(mask)
+    found = []
+    for m in re.finditer(r"\b([A-Za-z_]\w*)\s*\(", mask):
+        name = m.group(1)
+        if name in _KEYWORDS or name in class_names:
+            continue
+        before = mask[:m.start()].rstrip()
+        if before.endswith((".", "->", "::", "new")) and not before.endswith("operator"):
+            continue
+        open_paren = m.end() - 1
+        close = _close(mask, open_paren)
+        trailer = re.match(r"\s*(?:const\s*)?(?:noexcept\s*)?(?:override\s*)?(?:final\s*)?"
+                           r"(?:throws\s+[\w.\s,]+?)?\s*\{", mask[close + 1:])
+        if not trailer:
+            continue
+        head_start = max(mask.rfind(c, 0, m.start()) for c in ";{}") + 1
+        head = re.sub(r"^\s*(?:(?:public|private|protected)\s*:)?", "", mask[head_start:m.start()])
+        head = re.sub(r"template\s*<[^>]*>", "", head)
+        words = [w for w in head.split() if not w.startswith("@")]  # Java annotations
+        if not words or words[-1] in ("else", "return", "=", "case"):
+            continue  # a call, not a definition
+        enclosing = [c for c in classes if c[1] < m.start() < c[2]]
+        found.append({
+            "name": name,
+            "params": mask[open_paren + 1:close],
+            "returns": " ".join(w for w in words if w not in _MODIFIERS),
+            "open": close + 1 + trailer.end() - 1,
+            "class": max(enclosing, key=lambda c: c[1])[0] if enclosing else None,
+            "static": "static" in words,
+        })
+    return found
+
+
+def _split_params(text):
+    """'const vector<int>& nums, int k = 3' -> [('const vector<int>&', 'nums'), ('int', 'k')]."""
+    params = []
+    if not text.strip() or text.strip() == "void":
+        return params
+    bounds = [-1] + _top_level(text, ",") + [len(text)]
+    for a, b in zip(bounds, bounds[1:]):
+        part = text[a + 1:b]
+        eq = _top_level(part, "=")
+        if eq:
+            part = part[:eq[0]]
+        m = re.match(r"(.*?)\s*\b([A-Za-z_]\w*)\s*$", part.strip(), re.S)
+        if not m or not m.group(1):
+            return None
+        params.append((m.group(1).strip(), m.group(2)))
+    return params
+
+
+def _instrument(code, mask, tick, functions, class_names):
+    """
+    Inserts tick() into every loop (condition for classic for / while, body for
+    range-based / for-each loops) and at the top of every function body.
+    """
+    inserts = []  # (offset, text)
+    for m in re.finditer(r"\b(for|while)\s*\(", mask):
+        open_paren = m.end() - 1
+        close = _close(mask, open_paren)
+        if m.group(1) == "while":
+            inserts += [(open_paren + 1, f"{tick} && ("), (close, ")")]
+            continue
+        semis = _top_level(mask[open_paren + 1:close], ";", angles=False)
+        if len(semis) == 2:
+            s1, s2 = open_paren + 1 + semis[0], open_paren + 1 + semis[1]
+            if mask[s1 + 1:s2].strip():
+                inserts += [(s1 + 1, f" {tick} && ("), (s2, ")")]
+            else:
+                inserts.append((s1 + 1, f" {tick}"))
+            continue
+        # for (x : xs): no condition to hook, count the body instead
+        body = _skip_space(mask, close + 1)
+        if body < len(mask) and mask[body] == "{":
+            inserts.append((body + 1, f" {tick};"))
+        else:
+            end = _statement_span(mask, body)
+            if end is not None:
+                inserts += [(body, f"{{ {tick}; "), (end, " }")]
+    for fn in functions:
+        inserts.append((fn["open"] + 1, f" {tick};"))
+
+    inserts.sort(key=lambda item: item[0])
+    out, last = [], 0
+    for offset, text in inserts:
+        out.append(code[last:offset])
+        out.append(text)
+        last = offset
+    out.append(code[last:])
+    return "".join(out)
+
+
+# --- TYPES ---
+_CPP_INTS = {"int", "long", "long long", "long int", "long long int", "short", "unsigned", "unsigned int",
+             "unsigned long", "unsigned long long", "size_t", "int64_t", "int32_t", "uint32_t", "uint64_t"}
+_CPP_SCALARS = dict({t: "int" for t in _CPP_INTS},
+                    **{"double": "float", "float": "float", "long double": "float",
+                       "bool": "bool", "char": "str", "string": "str"})
+
+
+def cpp_type(native):
+    """C++ parameter type -> (declarable type, Python annotation) or None if the harness can't read it."""
+    t = re.sub(r"\bconst\b|&|\bstd::", " ", native)
+    t = re.sub(r"\s*([<>,])\s*", r"\1", " ".join(t.split()))
+    if t in _CPP_SCALARS:
+        return t, _CPP_SCALARS[t]
+    m = re.fullmatch(r"vector<(.+)>", t)
+    if m:
+        inner = cpp_type(m.group(1))
+        if inner:
+            return f"vector<{inner[0]}>", f"List[{inner[1]}]"
+    return None
+
+
+_JAVA_SCALARS = {
+    "int": ("int", "CodeAlignerRt.i({})"), "Integer": ("int", "CodeAlignerRt.i({})"),
+    "long": ("int", "CodeAlignerRt.l({})"), "Long": ("int", "CodeAlignerRt.l({})"),
+    "short": ("int", "(short) CodeAlignerRt.i({})"), "Short": ("int", "(short) CodeAlignerRt.i({})"),
+    "double": ("float", "CodeAlignerRt.d({})"), "Double": ("float", "CodeAlignerRt.d({})"),
+    "float": ("float", "(float) CodeAlignerRt.d({})"), "Float": ("float", "(float) CodeAlignerRt.d({})"),
+    "boolean": ("bool", "CodeAlignerRt.b({})"), "Boolean": ("bool", "CodeAlignerRt.b({})"),
+    "char": ("str", "CodeAlignerRt.c({})"), "Character": ("str", "CodeAlignerRt.c({})"),
+    "String": ("str", "CodeAlignerRt.s({})"),
+}
+_JAVA_ARRAYS = {"int": "CodeAlignerRt.ia({})", "long": "CodeAlignerRt.la({})", "double": "CodeAlignerRt.da({})",
+                "boolean": "CodeAlignerRt.ba({})", "char": "CodeAlignerRt.ca({})"}
+
+
+def java_type(native, depth=0):
+    """
+    Java parameter type -> (declarable type, Python annotation, converter) or None;
+    converter(expr) is Java turning a parsed JSON value into that type.
+    """
+    t = re.sub(r"\bfinal\b", " ", native)
+    t = re.sub(r"\s*([<>,\[\]])\s*", r"\1", " ".join(t.split())).replace("java.util.", "")
+    if t in _JAVA_SCALARS:
+        annotation, template = _JAVA_SCALARS[t]
+        return t, annotation, template.format
+    if t.endswith("[]"):
+        inner_name = t[:-2]
+        if inner_name in _JAVA_ARRAYS:
+            return t, f"List[{_JAVA_SCALARS[inner_name][0]}]", _JAVA_ARRAYS[inner_name].format
+        inner = java_type(inner_name, depth + 1)
+        if not inner or "<" in inner_name or inner_name in ("short", "float", "Short", "Float"):
+            return None
+        var = f"x{depth}"
+        return t, f"List[{inner[1]}]", lambda e: (f"CodeAlignerRt.list({e}).stream().map({var} -> "
+                                                   f"{inner[2](var)}).toArray({inner_name}[]::new)")
+    m = re.fullmatch(r"(List|ArrayList|Collection|Iterable)<(.+)>", t)
+    if m:
+        inner = java_type(m.group(2), depth + 1)
+        if not inner or inner[0] in ("int", "long", "short", "double", "float", "boolean", "char"):
+            return None
+        var = f"x{depth}"
+        return t, f"List[{inner[1]}]", lambda e: (f"CodeAlignerRt.list({e}).stream().map({var} -> {inner[2](var)})"
+                                                   f".collect(Collectors.toCollection(ArrayList::new))")
+    return None
+
+
+# --- BUILD CACHE ---
+_build_locks = {}
+_build_failures = {}  # key -> message: a broken submission is compiled once, not once per input
+_locks_guard = threading.Lock()
+
+
+def _cached_build(language, key, compile_into):
+    """
+    Directory holding the build for key, compiling it (compile_into(tmp_dir)) on
+    a miss. One build per key at a time; concurrent callers wait for it.
+    """
+    final = os.path.join(BUILD_DIR, f"{language}-{key[:24]}")
+    if os.path.isdir(final):
+        metrics.inc("backend.builds", language=language, cache="hit")
+        return final
+    with _locks_guard:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    with lock:
+        if key in _build_failures:
+            raise BuildError(_build_failures[key])
+        if os.path.isdir(final):
+            return final
+        try:
+            os.makedirs(BUILD_DIR, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=f".{language}-", dir=BUILD_DIR)
+        except OSError as e:
+            raise BuildError(f"Build directory not writable ({e})")
+        try:
+            with metrics.span("backend.build", language=language):
+                compile_into(tmp)
+        except BuildError as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            _build_failures[key] = str(e)
+            metrics.inc("backend.builds", language=language, cache="error")
+            raise
+        except Exception as e:
+            # I/O trouble or a backend bug, not the submission: clean up, don't cache the failure
+            shutil.rmtree(tmp, ignore_errors=True)
+            metrics.inc("backend.builds", language=language, cache="error")
+            raise BuildError(f"Build failed ({type(e).__name__}: {e})") from e
+        try:
+            os.rename(tmp, final)
+        except OSError:  # another process finished the same build first
+            shutil.rmtree(tmp, ignore_errors=True)
+        metrics.inc("backend.builds", language=language, cache="miss")
+        _prune()
+        return final
+
+
+def _prune():
+    """Drops the oldest cached builds beyond MAX_BUILDS."""
+    try:
+        builds = [os.path.join(BUILD_DIR, d) for d in os.listdir(BUILD_DIR) if not d.startswith((".", "pch"))]
+    except OSError:
+        return
+    if len(builds) <= MAX_BUILDS:
+        return
+    builds.sort(key=lambda path: os.path.getmtime(path))
+    for path in builds[:len(builds) - MAX_BUILDS]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _compile(command, cwd, source_names):
+    try:
+        proc = subprocess.run(command, cwd=cwd, capture_output=True, text=True, timeout=COMPILE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise BuildError(f"Compilation timed out ({COMPILE_TIMEOUT}s)")
+    except OSError as e:
+        raise BuildError(f"Compiler not available ({e})")
+    if proc.returncode != 0:
+        lines = [line.replace(os.path.join(cwd, ""), "") for line in (proc.stderr or proc.stdout).splitlines()
+                 if line.startswith(source_names) or line.startswith(" ")]
+        raise BuildError("Compilation failed:\n" + "\n".join(lines[:MAX_ERROR_LINES]))
+
+
+# --- BACKENDS ---
+class Backend:
+    """One compiled language: signature extraction, instrumentation, harness, build."""
+    name = None
+    compiler = None
+
+    def available(self):
+        return shutil.which(self.compiler) is not None
+
+    @lru_cache(maxsize=None)
+    def toolchain(self):
+        """Compiler identity (part of every build key)."""
+        try:
+            proc = subprocess.run([self.compiler, "--version" if self.name == "cpp" else "-version"],
+                                  capture_output=True, text=True, timeout=30)
+            return (proc.stdout or proc.stderr).splitlines()[0]
+        except (OSError, subprocess.SubprocessError, IndexError):
+            return self.compiler
+
+    def native_type(self, text):
+        raise NotImplementedError
+
+    def signature(self, code, func=None):
+        """
+        analyze_signature()-style {"class", "entry_point", "arity", "methods", "native"}
+        with Python annotations for the parameters (for difftest's input generation),
+        or None if the entry point takes or returns a type the harness can't handle.
+        """
+        return _signature(self, code, func)
+
+    def build(self, code, func=None):
+        """Command (argv list) running the harness for code; raises BuildError."""
+        if not self.available():
+            raise BuildError(f"{self.compiler} is not installed")
+        sig = self.signature(code, func)
+        if sig is None:
+            raise BuildError("Unsupported entry point signature for execution")
+        source = self.harness(code, sig)
+        key = hashlib.sha256("\0".join((self.name, self.toolchain(), " ".join(self.flags()), source))
+                             .encode("utf-8")).hexdigest()
+        return self.command(_cached_build(self.name, key, lambda tmp: self.compile_into(tmp, source)))
+
+
+@lru_cache(maxsize=256)
+def _signature(backend, code, func):
+    mask = _mask(code)
+    class_names = {name for name, _, _ in _classes(mask)}
+    functions = [f for f in _functions(mask, class_names) if f["name"] != "main"]
+    if not functions:
+        return None
+    entry = next((f for f in functions if f["name"] == func), None)
+    if entry is None:
+        in_solution = [f for f in functions if f["class"] == "Solution"] or functions
+        # The entry point is a method nothing else calls (helpers like dfs are called)
+        # and that takes input (not toString() & co)
+        uncalled = [f for f in in_solution if len(re.findall(rf"\b{f['name']}\s*\(", mask)) == 1]
+        with_input = [f for f in uncalled if f["params"].strip() not in ("", "void")]
+        entry = (with_input or uncalled or in_solution)[0]
+
+    methods, native = [], None
+    for fn in functions:
+        params = _split_params(fn["params"])
+        typed = [(backend.native_type(t), name) for t, name in params] if params is not None else None
+        methods.append({"name": fn["name"],
+                        "params": [{"name": name, "annotation": t[1] if t else None} for t, name in typed or []],
+                        "returns": None})
+        if fn is entry:
+            returns = fn["returns"]
+            if typed is None or any(t is None for t, _ in typed):
+                return None
+            if returns != "void" and backend.native_type(returns) is None:
+                return None
+            native = {"params": [(t, name) for t, name in typed], "returns": returns,
+                      "class": fn["class"], "static": fn["static"]}
+    return {
+        "class": entry["class"],
+        "entry_point": entry["name"],
+        "arity": len(native["params"]),
+        "methods": methods,
+        "native": native,
+    }
+
+
+class CppBackend(Backend):
+    name = "cpp"
+    compiler = CXX
+    _pch_lock = threading.Lock()
+    _pch_dir = None
+
+    def native_type(self, text):
+        return cpp_type(text)
+
+    def flags(self):
+        return CXX_FLAGS
+
+    def instrument(self, code):
+        code = re.sub(r"\bint\s+main\s*\(", "int codealigner_user_main(", code)
+        mask = _mask(code)
+        class_names = {name for name, _, _ in _classes(mask)}
+        return _instrument(code, mask, CPP_TICK, _functions(mask, class_names), class_names)
+
+    def harness(self, code, sig):
+        native = sig["native"]
+        declare = "\n".join(f"            {t[0]} a{k}{{}}; rt::read(r, a{k}); r.eat(',');"
+                            for k, (t, _) in enumerate(native["params"]))
+        args = ", ".join(f"a{k}" for k in range(len(native["params"])))
+        if native["class"]:
+            call = f"{native['class']} codealigner_obj; return codealigner_obj.{sig['entry_point']}({args});"
+        else:
+            call = f"return {sig['entry_point']}({args});"
+        main = _CPP_MAIN.replace("/*DECLARE*/", declare).replace("/*CALL*/", call)
+        return _CPP_PRELUDE + self.instrument(code) + "\n" + _CPP_RUNTIME + main
+
+    def precompiled_header(self):
+        """Folder with codealigner_pch.h (+ its .gch once built): cuts a compile from ~2s to ~0.3s."""
+        with self._pch_lock:
+            if CppBackend._pch_dir is None:
+                key = hashlib.sha256((self.toolchain() + " ".join(self.flags())).encode()).hexdigest()[:16]
+                folder = os.path.join(BUILD_DIR, f"pch-{key}")
+                header = os.path.join(folder, "codealigner_pch.h")
+                if not os.path.exists(header + ".gch"):
+                    os.makedirs(folder, exist_ok=True)
+                    with open(header, "w") as f:
+                        f.write("#include <bits/stdc++.h>\n")
+                    tmp = f"{header}.{os.getpid()}.gch"
+                    try:
+                        subprocess.run([self.compiler, *self.flags(), "-x", "c++-header", header, "-o", tmp],
+                                       capture_output=True, timeout=COMPILE_TIMEOUT * 4, check=True)
+                        os.replace(tmp, header + ".gch")
+                    except (OSError, subprocess.SubprocessError):
+                        pass  # the plain header still works, just slower
+                CppBackend._pch_dir = folder
+            return CppBackend._pch_dir
+
+    def compile_into(self, folder, source):
+        path = os.path.join(folder, "solution.cpp")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        _compile([self.compiler, *self.flags(), "-I", os.path.abspath(self.precompiled_header()),
+                  "solution.cpp", "-o", "solution"], folder, ("submission.cpp", "solution.cpp"))
+
+    def command(self, folder):
+        return [os.path.abspath(os.path.join(folder, "solution"))]
+
+
+class JavaBackend(Backend):
+    name = "java"
+    compiler = JAVAC
+
+    def available(self):
+        return shutil.which(JAVAC) is not None and shutil.which(JAVA) is not None
+
+    def native_type(self, text):
+        return java_type(text)
+
+    def flags(self):
+        return JAVA_OPTS
+
+    def instrument(self, code):
+        code = re.sub(r"(?m)^[ \t]*package\s+[\w.]+\s*;", "", code)
+        # Only the harness class may be public in its file
+        code = re.sub(r"(?m)^(\s*)public\s+((?:final\s+|abstract\s+)*class\b)", r"\1\2", code)
+        mask = _mask(code)
+        class_names = {name for name, _, _ in _classes(mask)}
+        return _instrument(code, mask, JAVA_TICK, _functions(mask, class_names), class_names)
+
+    def harness(self, code, sig):
+        native = sig["native"]
+        declare = "\n".join(f"                    {t[0]} a{k} = {t[2](f'args.get({k})')};"
+                            for k, (t, _) in enumerate(native["params"]))
+        args = ", ".join(f"a{k}" for k in range(len(native["params"])))
+        target = native["class"] if native["static"] else f"new {native['class']}()"
+        invocation = f"{target}.{sig['entry_point']}({args})"
+        if native["returns"] == "void":
+            call = f"{invocation};\n                    text = \"None\";"
+        else:
+            call = f"text = CodeAlignerRt.show({invocation}, false);"
+        main = _JAVA_MAIN.replace("/*DECLARE*/", declare).replace("/*CALL*/", call)
+        return _JAVA_IMPORTS + self.instrument(code) + "\n" + _JAVA_RUNTIME + main
+
+    def compile_into(self, folder, source):
+        with open(os.path.join(folder, "CodeAlignerMain.java"), "w", encoding="utf-8") as f:
+            f.write(source)
+        _compile([self.compiler, "-encoding", "UTF-8", "-nowarn", "-d", ".", "CodeAlignerMain.java"],
+                 folder, ("CodeAlignerMain.java",))
+
+    def command(self, folder):
+        return [JAVA, *self.flags(), "-cp", os.path.abspath(folder), "CodeAlignerMain"]
+
+
+BACKENDS = {"cpp": CppBackend(), "java": JavaBackend()}
+
+
+def get_backend(language):
+    """The backend for a language name (any alias), or None (Python, unknown languages)."""
+    return BACKENDS.get(normalize_language(language))
+
+
+def is_executable(language):
+    """True if submissions in this language can be run here (Python, or a compiled backend with its toolchain)."""
+    language = normalize_language(language)
+    if language == "python":
+        return True
+    backend = BACKENDS.get(language)
+    return backend is not None and backend.available()
+
+
+def warm_up():
+    """Builds what a first compile would otherwise wait for (the C++ precompiled header)."""
+    backend = BACKENDS.get("cpp")
+    if backend is not None and backend.available():
+        backend.precompiled_header()
+
+
+def signature(language, code, func=None):
+    """Backend.signature() for a compiled language; None for anything else."""
+    backend = get_backend(language)
+    return backend.signature(code, func) if backend else None
+
+
+def build(language, code, func=None):
+    """Command running code's harness (see Backend.build); raises BuildError."""
+    backend = get_backend(language)
+    if backend is None:
+        raise BuildError(f"No execution backend for {language}")
+    return backend.build(code, func)
+
+
+# --- RUNNING (inside an executor worker) ---
+_EXIT_SIGNALS = {
+    "SIGXCPU": "CPU time limit exceeded",
+    "SIGSEGV": "Segmentation fault (stack overflow or out-of-bounds access)",
+    "SIGFPE": "Floating point exception (division by zero)",
+    "SIGKILL": "Killed (memory or CPU limit)",
+}
+
+
+def _exit_error(returncode, stderr):
+    last = next((line.strip() for line in reversed((stderr or "").splitlines()) if line.strip()), "")
+    if returncode < 0:
+        try:
+            name = signal.Signals(-returncode).name
+        except ValueError:
+            name = f"signal {-returncode}"
+        message = _EXIT_SIGNALS.get(name, f"Killed by {name}")
+        if name == "SIGABRT" and last:
+            message = f"Aborted: {last}"
+        return f"Error: {message}"
+    if returncode > 0:
+        return f"Error: {last or f'exit status {returncode}'}"
+    return "Error: Process exited during the call"
+
+
+def _unescape(text):
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), text)
+
+
+def _read_results(path):
+    runs = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # torn last line: the process died while writing it
+            status, steps, seconds, text = line.rstrip("\n").split("\t", 3)
+            text = _unescape(text)
+            runs.append({"result": text if status == "ok" else f"Error: {text}",
+                         "steps": int(steps), "seconds": float(seconds)})
+    return runs
+
+
+def run_compiled(command, batch, max_steps, timeout):
+    """
+    Runs a built harness on every argument tuple in batch; same reply shape as
+    executor._run_batch. A call that kills the process (segfault, abort...) gets
+    the error and the rest of the batch continues in a fresh process.
+    """
+    started = time.perf_counter()
+    runs, pending = [], list(batch)
+    fd, out_path = tempfile.mkstemp(suffix=".results")
+    os.close(fd)
+    try:
+        while pending:
+            remaining = timeout - (time.perf_counter() - started)
+            if remaining <= 0:
+                break
+            stdin = "".join(json.dumps(list(args), ensure_ascii=False) + "\n" for args in pending)
+            try:
+                proc = subprocess.run(command + [out_path, str(max_steps)], input=stdin, text=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=remaining)
+                returncode, stderr = proc.returncode, proc.stderr
+            except subprocess.TimeoutExpired:
+                returncode, stderr = None, ""
+            except OSError as e:
+                returncode, stderr = 127, str(e)
+            done = _read_results(out_path)
+            runs += done
+            pending = pending[len(done):]
+            if pending and returncode is not None:
+                runs.append({"result": _exit_error(returncode, stderr), "steps": 0, "seconds": 0.0})
+                pending = pending[1:]
+            elif pending:
+                break  # out of time
+    finally:
+        os.remove(out_path)
+    runs += [{"result": f"Error: Time limit exceeded ({timeout:g}s)", "steps": 0, "seconds": 0.0} for _ in pending]
+    return {"runs": runs, "seconds": time.perf_counter() - started}
+
+
+# --- HARNESS SOURCES ---
+_CPP_PRELUDE = r"""#include "codealigner_pch.h"
+using namespace std;
+namespace codealigner_rt {
+long long steps = 0, max_steps = 1000000;
+struct StepLimit {};
+inline bool tick() {
+    if (++steps > max_steps) throw StepLimit();
+    return true;
+}
+}
+#line 1 "submission.cpp"
+"""
+
+_CPP_RUNTIME = r"""
+namespace codealigner_rt {
+struct Reader {
+    const string& s;
+    size_t i = 0;
+    void ws() { while (i < s.size() && isspace((unsigned char) s[i])) ++i; }
+    bool eat(char c) { ws(); if (i < s.size() && s[i] == c) { ++i; return true; } return false; }
+    void expect(char c) { if (!eat(c)) throw runtime_error(string("malformed input, expected ") + c); }
+    string token() {
+        ws();
+        size_t j = i;
+        while (j < s.size() && (isalnum((unsigned char) s[j]) || s[j] == '+' || s[j] == '-' || s[j] == '.')) ++j;
+        string t = s.substr(i, j - i);
+        i = j;
+        return t;
+    }
+    string text() {
+        expect('"');
+        string out;
+        while (i < s.size() && s[i] != '"') {
+            char c = s[i++];
+            if (c != '\\' || i >= s.size()) { out += c; continue; }
+            char e = s[i++];
+            if (e == 'n') out += '\n';
+            else if (e == 't') out += '\t';
+            else if (e == 'r') out += '\r';
+            else if (e == 'b') out += '\b';
+            else if (e == 'f') out += '\f';
+            else if (e == 'u') {
+                unsigned cp = stoul(s.substr(i, 4), nullptr, 16);
+                i += 4;
+                if (cp < 0x80) out += char(cp);
+                else if (cp < 0x800) { out += char(0xC0 | (cp >> 6)); out += char(0x80 | (cp & 0x3F)); }
+                else { out += char(0xE0 | (cp >> 12)); out += char(0x80 | ((cp >> 6) & 0x3F)); out += char(0x80 | (cp & 0x3F)); }
+            } else out += e;
+        }
+        ++i;
+        return out;
+    }
+};
+
+template <class T> enable_if_t<is_integral_v<T> && !is_same_v<T, bool> && !is_same_v<T, char>> read(Reader& r, T& v) { v = (T) stoll(r.token()); }
+template <class T> enable_if_t<is_floating_point_v<T>> read(Reader& r, T& v) { v = (T) stod(r.token()); }
+inline void read(Reader& r, bool& v) { v = r.token() == "true"; }
+inline void read(Reader& r, char& v) { string t = r.text(); v = t.empty() ? '\0' : t[0]; }
+inline void read(Reader& r, string& v) { v = r.text(); }
+template <class T> void read(Reader& r, vector<T>& v) {
+    r.expect('[');
+    if (r.eat(']')) return;
+    do { T x{}; read(r, x); v.push_back(x); } while (r.eat(','));
+    r.expect(']');
+}
+
+// Python's str() of the result (repr() inside containers)
+inline string repr(const string& s) {
+    char q = (s.find('\'') != string::npos && s.find('"') == string::npos) ? '"' : '\'';
+    string out(1, q);
+    for (char c : s) {
+        if (c == q || c == '\\') { out += '\\'; out += c; }
+        else if (c == '\n') out += "\\n";
+        else if (c == '\t') out += "\\t";
+        else if (c == '\r') out += "\\r";
+        else out += c;
+    }
+    return out + q;
+}
+template <class T> enable_if_t<is_integral_v<T> && !is_same_v<T, bool> && !is_same_v<T, char>, string> show(T v, bool) { return to_string(v); }
+template <class T> enable_if_t<is_floating_point_v<T>, string> show(T v, bool) {
+    char buf[64];
+    auto res = to_chars(buf, buf + sizeof buf, (double) v);
+    string t(buf, res.ptr);
+    if (t.find_first_of(".ein") == string::npos) t += ".0";
+    return t;
+}
+inline string show(bool v, bool) { return v ? "True" : "False"; }
+inline string show(char c, bool nested) { string s(1, c); return nested ? repr(s) : s; }
+inline string show(const string& s, bool nested) { return nested ? repr(s) : s; }
+template <class T> string show(const vector<T>& v, bool) {
+    string out = "[";
+    for (size_t k = 0; k < v.size(); ++k) {
+        if (k) out += ", ";
+        if constexpr (is_same_v<T, bool>) out += show((bool) v[k], true);
+        else out += show(v[k], true);
+    }
+    return out + "]";
+}
+template <class F> string call_and_show(F&& f) {
+    if constexpr (is_void_v<invoke_result_t<F&>>) { f(); return "None"; }
+    else return show(f(), false);
+}
+inline string escape(const string& s) {
+    string out;
+    for (char c : s) {
+        if (c == '\\') out += "\\\\";
+        else if (c == '\n') out += "\\n";
+        else if (c == '\t') out += "\\t";
+        else out += c;
+    }
+    return out;
+}
+}
+"""
+
+_CPP_MAIN = r"""
+int main(int argc, char** argv) {
+    namespace rt = codealigner_rt;
+    if (argc < 3) return 2;
+    ofstream out(argv[1]);
+    out << setprecision(9);
+    rt::max_steps = atoll(argv[2]);
+    string line;
+    while (getline(cin, line)) {
+        if (line.empty()) continue;
+        string status = "ok", text;
+        rt::steps = 0;
+        auto started = chrono::steady_clock::now();
+        try {
+            rt::Reader r{line};
+            r.expect('[');
+/*DECLARE*/
+            r.expect(']');
+            started = chrono::steady_clock::now();
+            text = rt::call_and_show([&]() { /*CALL*/ });
+        } catch (const rt::StepLimit&) {
+            status = "error";
+            text = "Exceeded " + to_string(rt::max_steps) + " steps (possible infinite loop)";
+        } catch (const exception& e) {
+            status = "error";
+            text = e.what();
+        } catch (...) {
+            status = "error";
+            text = "unknown exception";
+        }
+        double seconds = chrono::duration<double>(chrono::steady_clock::now() - started).count();
+        out << status << '\t' << rt::steps << '\t' << seconds << '\t' << rt::escape(text) << '\n' << flush;
+    }
+    return 0;
+}
+"""
+
+# On the submission's first line, so compiler line numbers match the user's
+_JAVA_IMPORTS = "import java.util.*; import java.util.stream.*; import java.io.*; import java.nio.charset.StandardCharsets; "
+
+_JAVA_RUNTIME = r"""
+final class CodeAlignerRt {
+    static long steps = 0, maxSteps = 1000000;
+
+    static final class StepLimit extends Error {
+        StepLimit() { super(null, null, false, false); }
+    }
+
+    static boolean tick() {
+        if (++steps > maxSteps) throw new StepLimit();
+        return true;
+    }
+
+    // --- JSON input ---
+    private final String s;
+    private int i;
+
+    private CodeAlignerRt(String s) { this.s = s; }
+
+    static Object parse(String line) { return new CodeAlignerRt(line).value(); }
+
+    private void ws() { while (i < s.length() && Character.isWhitespace(s.charAt(i))) i++; }
+
+    private Object value() {
+        ws();
+        char c = s.charAt(i);
+        if (c == '[') {
+            i++;
+            List<Object> out = new ArrayList<>();
+            ws();
+            if (s.charAt(i) == ']') { i++; return out; }
+            while (true) {
+                out.add(value());
+                ws();
+                if (s.charAt(i++) == ']') return out;
+            }
+        }
+        if (c == '"') {
+            i++;
+            StringBuilder b = new StringBuilder();
+            while (s.charAt(i) != '"') {
+                char ch = s.charAt(i++);
+                if (ch != '\\') { b.append(ch); continue; }
+                char e = s.charAt(i++);
+                switch (e) {
+                    case 'n': b.append('\n'); break;
+                    case 't': b.append('\t'); break;
+                    case 'r': b.append('\r'); break;
+                    case 'b': b.append('\b'); break;
+                    case 'f': b.append('\f'); break;
+                    case 'u': b.append((char) Integer.parseInt(s.substring(i, i + 4), 16)); i += 4; break;
+                    default: b.append(e);
+                }
+            }
+            i++;
+            return b.toString();
+        }
+        int j = i;
+        while (j < s.length() && ",] \t".indexOf(s.charAt(j)) < 0) j++;
+        String t = s.substring(i, j);
+        i = j;
+        if (t.equals("true")) return Boolean.TRUE;
+        if (t.equals("false")) return Boolean.FALSE;
+        if (t.equals("null")) return null;
+        try {
+            return Long.parseLong(t);
+        } catch (NumberFormatException e) {
+            return Double.parseDouble(t);
+        }
+    }
+
+    @SuppressWarnings("unchecked")
+    static List<Object> list(Object o) { return (List<Object>) o; }
+    static int i(Object o) { return ((Number) o).intValue(); }
+    static long l(Object o) { return ((Number) o).longValue(); }
+    static double d(Object o) { return ((Number) o).doubleValue(); }
+    static boolean b(Object o) { return (Boolean) o; }
+    static String s(Object o) { return (String) o; }
+    static char c(Object o) { String t = (String) o; return t.isEmpty() ? '\0' : t.charAt(0); }
+    static int[] ia(Object o) { return list(o).stream().mapToInt(CodeAlignerRt::i).toArray(); }
+    static long[] la(Object o) { return list(o).stream().mapToLong(CodeAlignerRt::l).toArray(); }
+    static double[] da(Object o) { return list(o).stream().mapToDouble(CodeAlignerRt::d).toArray(); }
+    static boolean[] ba(Object o) {
+        List<Object> v = list(o);
+        boolean[] a = new boolean[v.size()];
+        for (int k = 0; k < a.length; k++) a[k] = b(v.get(k));
+        return a;
+    }
+    static char[] ca(Object o) {
+        List<Object> v = list(o);
+        char[] a = new char[v.size()];
+        for (int k = 0; k < a.length; k++) a[k] = c(v.get(k));
+        return a;
+    }
+
+    // --- Python's str() of the result (repr() inside containers) ---
+    static String show(Object o, boolean nested) {
+        if (o == null) return "None";
+        if (o instanceof Boolean) return ((Boolean) o) ? "True" : "False";
+        if (o instanceof String || o instanceof Character) return nested ? repr(o.toString()) : o.toString();
+        if (o instanceof Double || o instanceof Float) return showFloat(((Number) o).doubleValue());
+        if (o instanceof Number) return o.toString();
+        StringBuilder b = new StringBuilder("[");
+        if (o.getClass().isArray()) {
+            int n = java.lang.reflect.Array.getLength(o);
+            for (int k = 0; k < n; k++) {
+                if (k > 0) b.append(", ");
+                b.append(show(java.lang.reflect.Array.get(o, k), true));
+            }
+            return b.append("]").toString();
+        }
+        if (o instanceof Iterable) {
+            boolean first = true;
+            for (Object x : (Iterable<?>) o) {
+                if (!first) b.append(", ");
+                first = false;
+                b.append(show(x, true));
+            }
+            return b.append("]").toString();
+        }
+        return o.toString();
+    }
+
+    static String showFloat(double v) {
+        if (Double.isNaN(v)) return "nan";
+        if (Double.isInfinite(v)) return v > 0 ? "inf" : "-inf";
+        if (v == 0) return 1 / v < 0 ? "-0.0" : "0.0";
+        java.math.BigDecimal d = new java.math.BigDecimal(Double.toString(v)).stripTrailingZeros();
+        double a = Math.abs(v);
+        if (a >= 1e-4 && a < 1e16) {
+            String t = d.toPlainString();
+            return t.contains(".") ? t : t + ".0";
+        }
+        String m = d.unscaledValue().abs().toString();
+        int exp = m.length() - 1 - d.scale();
+        String mantissa = m.length() > 1 ? m.charAt(0) + "." + m.substring(1) : m;
+        return (v < 0 ? "-" : "") + mantissa + "e" + (exp < 0 ? "-" : "+") + (Math.abs(exp) < 10 ? "0" : "") + Math.abs(exp);
+    }
+
+    static String repr(String s) {
+        char q = s.indexOf('\'') >= 0 && s.indexOf('"') < 0 ? '"' : '\'';
+        StringBuilder b = new StringBuilder().append(q);
+        for (char c : s.toCharArray()) {
+            if (c == q || c == '\\') b.append('\\').append(c);
+            else if (c == '\n') b.append("\\n");
+            else if (c == '\t') b.append("\\t");
+            else if (c == '\r') b.append("\\r");
+            else b.append(c);
+        }
+        return b.append(q).toString();
+    }
+
+    static String escape(String s) {
+        return s.replace("\\", "\\\\").replace("\n", "\\n").replace("\t", "\\t");
+    }
+}
+"""
+
+_JAVA_MAIN = r"""
+public class CodeAlignerMain {
+    public static void main(String[] argv) throws Exception {
+        Throwable[] failure = new Throwable[1];
+        // Recursive solutions need more than the default thread stack
+        Thread t = new Thread(null, () -> {
+            try { run(argv); } catch (Throwable e) { failure[0] = e; }
+        }, "solution", 1L << 26);
+        t.start();
+        t.join();
+        if (failure[0] != null) {
+            System.err.println(failure[0]);
+            System.exit(1);
+        }
+    }
+
+    static void run(String[] argv) throws IOException {
+        CodeAlignerRt.maxSteps = Long.parseLong(argv[1]);
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        try (PrintWriter out = new PrintWriter(new OutputStreamWriter(new FileOutputStream(argv[0]), StandardCharsets.UTF_8))) {
+            String line;
+            while ((line = in.readLine()) != null) {
+                if (line.isEmpty()) continue;
+                String status = "ok", text = "";
+                CodeAlignerRt.steps = 0;
+                long started = System.nanoTime();
+                try {
+                    List<Object> args = CodeAlignerRt.list(CodeAlignerRt.parse(line));
+/*DECLARE*/
+                    started = System.nanoTime();
+                    /*CALL*/
+                } catch (CodeAlignerRt.StepLimit e) {
+                    status = "error";
+                    text = "Exceeded " + CodeAlignerRt.maxSteps + " steps (possible infinite loop)";
+                } catch (StackOverflowError e) {
+                    status = "error";
+                    text = "maximum recursion depth exceeded";
+                } catch (Throwable e) {
+                    status = "error";
+                    text = e.getClass().getSimpleName() + (e.getMessage() != null ? ": " + e.getMessage() : "");
+                }
+                double seconds = (System.nanoTime() - started) / 1e9;
+                out.print(status + "\t" + CodeAlignerRt.steps + "\t" + seconds + "\t" + CodeAlignerRt.escape(text) + "\n");
+                out.flush();
+            }
+        }
+    }
+}
+"""
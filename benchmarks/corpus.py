@@ -0,0 +1,203 @@
+"""
+Fixed workloads for the benchmark suites. Changing anything here changes the
+numbers: bump CORPUS_VERSION so results aren't compared against an old baseline.
+"""
+import random
+import ast
+
+CORPUS_VERSION = 3  # 3: two-sum has a brute-force alternative reference
+
+# --- TRACING WORKLOADS: (name, code, entry function, args) ---
+TRACING = [
+    ("small_list", '''
+def solve(nums):
+    best = nums[0]
+    for x in nums:
+        if x > best:
+            best = x
+    return best
+''', "solve", (list(range(100)),)),
+    ("large_list", '''
+def solve(nums):
+    total = 0
+    for i, x in enumerate(nums):
+        if x % 3 == 0:
+            total += x * i
+    return total
+''', "solve", (list(range(50_000)),)),
+    ("recursion", '''
+def solve(n):
+    if n < 2:
+        return n
+    return solve(n - 1) + solve(n - 2)
+''', "solve", (18,)),
+    ("nested_loops", '''
+def solve(nums):
+    count = 0
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == 0:
+                count += 1
+    return count
+''', "solve", ([(i * 7919) % 201 - 100 for i in range(250)],)),
+    ("dict_building", '''
+def solve(words):
+    freq = {}
+    for w in words:
+        freq[w] = freq.get(w, 0) + 1
+    return max(freq.values())
+''', "solve", ([f"w{(i * 31) % 997}" for i in range(20_000)],)),
+]
+
+
+# --- END-TO-END SCENARIOS ---
+# Each one is a reference solution (indexed under `slug`), a submission and the
+# verdict the pipeline must reach. The fake inspector answers with `inspect`.
+# `alternatives` are more solutions of the same problem, indexed after the reference.
+E2E = [
+    {
+        "slug": "two-sum",
+        "reference": '''class Solution:
+    def twoSum(self, nums: List[int], target: int) -> List[int]:
+        seen = {}
+        for i, x in enumerate(nums):
+            if target - x in seen:
+                return [seen[target - x], i]
+            seen[x] = i
+        return []
+''',
+        "alternatives": ['''class Solution:
+    def twoSum(self, nums: List[int], target: int) -> List[int]:
+        for i in range(len(nums)):
+            for j in range(i + 1, len(nums)):
+                if nums[i] + nums[j] == target:
+                    return [i, j]
+        return []
+'''],
+        "examples": [(([2, 7, 11, 15], 9),), (([3, 2, 4], 6),), (([3, 3], 6),)],
+        "submission": '''def pair_sum(nums, target):
+    for j in range(len(nums)):
+        for i in reversed(range(j)):
+            if nums[i] + nums[j] == target:
+                return [i, j]
+    return []
+''',
+        "inspect": {"language": "python", "user_function": "pair_sum", "test_input": "([2, 7, 11, 15], 9)"},
+        "expected": "OPTIMIZATION NEEDED",
+    },
+    {
+        "slug": "maximum-element",
+        "reference": '''class Solution:
+    def findMax(self, nums: List[int]) -> int:
+        best = nums[0]
+        for x in nums:
+            if x > best:
+                best = x
+        return best
+''',
+        "examples": [(([3, 1, 4, 1, 5],),), (([-2, -7],),)],
+        "submission": '''def find_max(arr):
+    m = 0
+    for x in arr:
+        if x > m: m = x
+    return m
+''',
+        "inspect": {"language": "python", "user_function": "find_max", "test_input": "([3, 1, 4, 1, 5],)"},
+        "expected": "LOGIC ERROR",
+    },
+    {
+        "slug": "valid-palindrome",
+        "reference": '''class Solution:
+    def isPalindrome(self, s: str) -> bool:
+        i, j = 0, len(s) - 1
+        while i < j:
+            if s[i] != s[j]:
+                return False
+            i += 1
+            j -= 1
+        return True
+''',
+        "examples": [(("abba",),), (("abc",),), (("",),)],
+        "submission": '''def is_pal(s):
+    left, right = 0, len(s) - 1
+    while left < right:
+        if s[left] != s[right]:
+            return False
+        left += 1
+        right -= 1
+    return True
+''',
+        "inspect": {"language": "python", "user_function": "is_pal", "test_input": "('racecar',)"},
+        "expected": "OPTIMAL",
+    },
+]
+
+
+# --- INDEX SIZES ---
+INDEX_DOCUMENTS = 2600  # about one document per dataset row; the index suite also builds 10x this
+INDEX_VARIANTS = 3      # synthetic solutions per problem
+INDEX_APPROACHES = ("hash-map", "brute-force", "two-pointers", "sorting")
+
+
+def index_entries(scale):
+    """(doc_id, name, document, metadata) of a synthetic slug index with INDEX_DOCUMENTS * scale documents."""
+    for n in range(INDEX_DOCUMENTS * scale):
+        problem, variant = divmod(n, INDEX_VARIANTS)
+        slug = f"problem-{problem}"
+        yield (str(problem) if not variant else f"{problem}.{variant}", slug, f"# solution {n}\n",
+               {"problem": slug, "variant": variant, "approach": INDEX_APPROACHES[n % len(INDEX_APPROACHES)]})
+
+
+def index_queries(size, seed=0):
+    """Deterministic (slug, approach) lookups, all valid at every scale."""
+    rng = random.Random(seed)
+    problems = INDEX_DOCUMENTS // INDEX_VARIANTS
+    return [(f"problem-{rng.randrange(problems)}", rng.choice(INDEX_APPROACHES)) for _ in range(size)]
+
+
+# --- SEARCH QUERIES ---
+class _Renamer(ast.NodeTransformer):
+    """Renames parameters and assigned locals; attributes, globals and builtins stay."""
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def visit_Name(self, node):
+        if node.id in self.mapping:
+            node.id = self.mapping[node.id]
+        return node
+
+    def visit_arg(self, node):
+        if node.arg in self.mapping:
+            node.arg = self.mapping[node.arg]
+        return node
+
+
+def rename_identifiers(code, seed=0):
+    """
+    The same solution with every parameter / local variable renamed (what a user
+    typing the "same" solution changes most). Returns the code unchanged if it
+    doesn't parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.arg) and node.arg != "self":
+            names.add(node.arg)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+    rng = random.Random(seed)
+    pool = ["val", "tmp", "acc", "cur", "res", "idx", "ptr", "buf", "item", "node", "lo", "hi", "cnt", "memo"]
+    mapping = {}
+    for i, name in enumerate(sorted(names)):
+        mapping[name] = f"{rng.choice(pool)}_{i}"
+    return ast.unparse(_Renamer(mapping).visit(tree))
+
+
+def search_sample(entries, size, seed=0):
+    """Deterministic sample of (doc_id, mutated code) from the slug index entries."""
+    ids = sorted(doc_id for doc_id, e in entries.items() if e.get('document'))
+    picks = random.Random(seed).sample(ids, min(size, len(ids)))
+    return [(doc_id, rename_identifiers(entries[doc_id]['document'], seed=n)) for n, doc_id in enumerate(picks)]
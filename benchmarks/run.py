@@ -0,0 +1,173 @@
+"""
+Reproducible benchmarks for search, the slug index, tracing and end-to-end analysis.
+
+Run from the repo root:
+    python -m benchmarks.run                                   # all suites, compare with the baseline
+    python -m benchmarks.run --suites tracing,e2e --save-baseline
+    python -m benchmarks.run --save-baseline --portable        # the committed baseline
+
+Everything runs offline on fixed corpora (benchmarks/corpus.py); the LLM is a
+FakeModel. The search suite needs the vector DB built by build_db.py and is
+skipped without it. Results are written as JSON; against a baseline file each
+metric may move by its tolerance in its bad direction (and by more than its
+noise floor) before the run fails. The committed baseline holds only the
+metrics that don't depend on the machine (PORTABLE_UNITS: overhead ratios,
+quality, call counts); record a full one locally to gate timings too.
+"""
+import subprocess
+import platform
+import argparse
+import json
+import time
+import sys
+import os
+
+from benchmarks.corpus import CORPUS_VERSION
+from benchmarks.suites import SUITES, SuiteUnavailable
+
+# --- CONFIGURATION ---
+RESULTS_PATH = "benchmarks/results/latest.json"
+BASELINE_PATH = "benchmarks/baseline.json"
+PORTABLE_UNITS = ("x", "ratio", "calls")  # units comparable across machines
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"corpus_version": CORPUS_VERSION, "python": platform.python_version(),
+            "implementation": sys.implementation.cache_tag, "platform": platform.platform(),
+            "cpus": os.cpu_count(), "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run_suites(names, repeats, queries):
+    """Returns {"meta", "metrics", "skipped": {suite: reason}}."""
+    metrics, skipped = {}, {}
+    pool = None
+    if {"tracing", "e2e"} & set(names):
+        from executor import ExecutionPool
+        pool = ExecutionPool(size=1)  # one worker: timings don't depend on the machine's core count
+    try:
+        for name in names:
+            print(f"[bench] ⏱️ {name}...")
+            start = time.perf_counter()
+            try:
+                metrics.update(SUITES[name](repeats=repeats, pool=pool, queries=queries))
+            except SuiteUnavailable as e:
+                skipped[name] = str(e)
+                print(f"[bench] ⚠️ {name} skipped: {e}")
+                continue
+            print(f"[bench] ✅ {name} done in {time.perf_counter() - start:.1f}s")
+    finally:
+        if pool is not None:
+            pool.close()
+    return {"meta": environment(), "metrics": metrics, "skipped": skipped}
+
+
+def compare(current, baseline, tolerance_scale=1.0):
+    """
+    [{"metric", "baseline", "current", "change", "regressed"}] for metrics in both runs.
+    change is relative, signed so that positive is always worse; tolerances are
+    multiplied by tolerance_scale (noisy CI machines).
+    """
+    rows = []
+    for name, base in sorted(baseline["metrics"].items()):
+        cur = current["metrics"].get(name)
+        if cur is None:
+            continue
+        if base["value"]:
+            change = (cur["value"] - base["value"]) / abs(base["value"])
+        else:
+            change = 0.0 if cur["value"] == base["value"] else float("inf")
+        if base["better"] == "higher":
+            change = 0.0 - change
+        regressed = (base["tolerance"] is not None and change > base["tolerance"] * tolerance_scale
+                     and abs(cur["value"] - base["value"]) > base.get("noise", 0.0))
+        rows.append({"metric": name, "baseline": base["value"], "current": cur["value"],
+                     "change": change, "regressed": regressed})
+    return rows
+
+
+def print_report(current, rows):
+    by_name = {row["metric"]: row for row in rows}
+    print(f"\n{'metric':<44} {'value':>12} {'baseline':>12} {'change':>8}")
+    for name, m in sorted(current["metrics"].items()):
+        row = by_name.get(name)
+        line = f"{name:<44} {m['value']:>12.4g}"
+        if row:
+            flag = "  ❌ regression" if row["regressed"] else ""
+            line += f" {row['baseline']:>12.4g} {row['change']:>+8.1%}{flag}"
+        print(line + f" {m['unit']}")
+    for name, reason in current["skipped"].items():
+        print(f"{name}: skipped ({reason})")
+
+
+def portable(results):
+    """The results with only the metrics in PORTABLE_UNITS."""
+    kept = {name: m for name, m in results["metrics"].items() if m["unit"] in PORTABLE_UNITS}
+    return dict(results, metrics=kept)
+
+
+def write_json(path, data):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"Comma-separated suites to run (of: {', '.join(SUITES)})")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed samples per measurement")
+    parser.add_argument("--queries", type=int, default=100, help="Search suite: mutated solutions queried")
+    parser.add_argument("-o", "--output", default=RESULTS_PATH, help="Where to write this run's results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Results file to compare against")
+    parser.add_argument("--tolerance-scale", type=float, default=1.0,
+                        help="Multiply every metric's tolerance (e.g. 2 on shared CI runners)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write this run as the new baseline instead of comparing")
+    parser.add_argument("--portable", action="store_true",
+                        help=f"With --save-baseline: keep only machine-independent metrics ({', '.join(PORTABLE_UNITS)})")
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.suites.split(",") if name]
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    current = run_suites(names, args.repeats, args.queries)
+    write_json(args.output, current)
+    print(f"[bench] results -> {args.output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, portable(current) if args.portable else current)
+        print(f"[bench] baseline -> {args.baseline}")
+        print_report(current, [])
+        return 0
+
+    rows = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("corpus_version") != CORPUS_VERSION:
+            print(f"[bench] ⚠️ baseline was recorded on corpus v{baseline['meta'].get('corpus_version')}, "
+                  f"this is v{CORPUS_VERSION}: not comparing (re-record with --save-baseline)")
+        else:
+            rows = compare(current, baseline, args.tolerance_scale)
+    else:
+        print(f"[bench] no baseline at {args.baseline} (record one with --save-baseline)")
+    print_report(current, rows)
+
+    regressions = [row["metric"] for row in rows if row["regressed"]]
+    if regressions:
+        print(f"\n[bench] ❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
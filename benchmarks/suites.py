@@ -0,0 +1,315 @@
+"""
+The benchmark suites. Each returns {metric name: metric} where a metric is
+{"value", "unit", "better" ("lower" | "higher"), "tolerance" (relative change
+allowed before it counts as a regression; None: reported, never gated), "noise"
+(absolute change that never counts)}, or raises SuiteUnavailable.
+"""
+import tempfile
+import hashlib
+import time
+import os
+
+from tracer import CodeTracer, MODES
+from artifacts import compile_solution
+from module_cache import load_module
+
+from benchmarks import corpus
+
+# --- CONFIGURATION ---
+MIN_SAMPLE_SECONDS = 0.05  # tracing: calls are looped until one timed sample takes at least this long
+TIMING_TOLERANCE = 0.30    # wall-clock metrics (noisy on shared machines)
+RATIO_TOLERANCE = 0.35     # traced / untraced: machine speed mostly cancels out
+QUALITY_TOLERANCE = 0.0    # recall, verdict accuracy: any drop is a regression
+NOISE_MS = 1.0             # timing changes smaller than this are jitter, whatever the percentage
+
+
+class SuiteUnavailable(Exception):
+    """The suite can't run here (no vector DB, missing dependency...)."""
+
+
+def metric(value, unit, better="lower", tolerance=TIMING_TOLERANCE):
+    return {"value": value, "unit": unit, "better": better, "tolerance": tolerance,
+            "noise": NOISE_MS if unit == "ms" else 0.0}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# --- TRACING ---
+def _calibrate(fn):
+    """Calls per timed sample, so a sample of a cheap call isn't timer noise."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= MIN_SAMPLE_SECONDS or number >= 1 << 16:
+            return number
+        number *= 2
+
+
+def _best_per_call(fns, repeats):
+    """
+    {name: best-of-repeats seconds per call} for {name: fn}. The functions take
+    turns within each repeat, so a slow patch of a shared machine hits all of
+    them rather than skewing their ratios.
+    """
+    numbers = {name: _calibrate(fn) for name, fn in fns.items()}
+    best = {name: float("inf") for name in fns}
+    for _ in range(repeats):
+        for name, fn in fns.items():
+            start = time.perf_counter()
+            for _ in range(numbers[name]):
+                fn()
+            best[name] = min(best[name], (time.perf_counter() - start) / numbers[name])
+    return best
+
+
+def _untraced(bytecode, func, args):
+    def call():
+        return load_module(bytecode).entry(func)(*args)
+    return call
+
+
+def _traced(name, mode, bytecode, func, args):
+    tracer = CodeTracer(mode=mode)
+
+    def call():
+        result, log = tracer.run(bytecode, func, args)
+        log.close()  # full mode may have spilled to a temp file
+        if isinstance(result, str) and result.startswith("Error"):
+            raise RuntimeError(f"{name} failed under {mode} tracing: {result}")
+    return call
+
+
+def tracing(repeats=5, pool=None, **_):
+    """
+    CodeTracer overhead: each workload untraced and under every trace mode, in
+    this process. Both sides get the module from module_cache (loaded once,
+    reset per call), so the ratio is the cost of tracing alone. With a pool, also the
+    round trip of one small job through the worker processes.
+    """
+    results = {}
+    for name, code, func, args in corpus.TRACING:
+        bytecode = compile_solution(code)
+        fns = {"untraced": _untraced(bytecode, func, args)}
+        fns.update((mode, _traced(name, mode, bytecode, func, args)) for mode in MODES)
+        best = _best_per_call(fns, repeats)
+        for key, seconds in best.items():
+            results[f"tracing.{name}.{key}_ms"] = metric(seconds * 1000, "ms")
+            if key != "untraced":
+                results[f"tracing.{name}.{key}_overhead"] = metric(seconds / best["untraced"], "x",
+                                                                   tolerance=RATIO_TOLERANCE)
+
+    if pool is not None:
+        name, code, func, args = corpus.TRACING[0]
+        pool.run(code, func, args, mode="count")  # warm the worker
+        samples = []
+        for _ in range(max(20, repeats * 4)):
+            start = time.perf_counter()
+            pool.run(code, func, args, mode="count")
+            samples.append(time.perf_counter() - start)
+        results["tracing.pool_roundtrip_p50_ms"] = metric(percentile(samples, 50) * 1000, "ms")
+    return results
+
+
+# --- SEARCH ---
+def search(queries=100, k=5, **_):
+    """
+    Retrieval on the real vector DB: dataset solutions with their variables
+    renamed must bring back the original. recall@1 / recall@k and per-query
+    latency (one query per call, as the app does), plus batched throughput.
+    """
+    try:
+        from search_engine import get_engine
+        engine = get_engine()
+        entries = engine.slug_index.entries
+    except Exception as e:  # chromadb / sentence-transformers missing, no DB built
+        raise SuiteUnavailable(f"vector DB not available ({type(e).__name__}: {e})")
+    if not entries:
+        raise SuiteUnavailable("vector DB is empty (run build_db.py)")
+    sample = corpus.search_sample(entries, queries)
+    engine.warmup()
+
+    latencies, hits1, hitsk = [], 0, 0
+    for doc_id, code in sample:
+        start = time.perf_counter()
+        candidates = engine.find_solutions([code], top_k=k)[0]
+        latencies.append(time.perf_counter() - start)
+        ids = [c['id'] for c in candidates]
+        hits1 += ids[:1] == [doc_id]
+        hitsk += doc_id in ids
+
+    start = time.perf_counter()
+    engine.find_solutions([code for _, code in sample], top_k=k)
+    batched = (time.perf_counter() - start) / len(sample)
+
+    return {
+        "search.recall_at_1": metric(hits1 / len(sample), "ratio", "higher", QUALITY_TOLERANCE),
+        f"search.recall_at_{k}": metric(hitsk / len(sample), "ratio", "higher", QUALITY_TOLERANCE),
+        "search.latency_p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "search.latency_p95_ms": metric(percentile(latencies, 95) * 1000, "ms"),
+        "search.batched_per_query_ms": metric(batched * 1000, "ms"),
+    }
+
+
+# --- END TO END ---
+class FixtureEngine:
+    """
+    Stand-in for SearchEngine over the E2E corpus: the real slug index and
+    artefact store, BM25 instead of vectors (no model to load).
+    """
+    def __init__(self, scenarios, pool, db_path):
+        from slug_index import SlugIndex
+        from artifacts import ArtifactStore, compile_solution
+        from lexical_index import BM25Index
+        from signature import analyze_signature
+        from difftest import infer_types
+        import approach
+        import complexity
+
+        self.slug_index = SlugIndex()
+        self.artifacts = ArtifactStore(db_path)
+        for n, sc in enumerate(scenarios):
+            for variant, code in enumerate([sc["reference"]] + sc.get("alternatives", [])):
+                doc_id = f"bench-{n}" if not variant else f"bench-{n}.{variant}"
+                tagged = approach.classify(code)
+                self.slug_index.add(doc_id, sc["slug"], code, {"name": sc["slug"], "problem": sc["slug"],
+                                                               "variant": variant, "approach": tagged["approach"],
+                                                               "tags": ",".join(tagged["tags"])})
+                sig = analyze_signature(code)
+                bytecode = compile_solution(code)
+                is_class = sig["class"] is not None
+                runs = []
+                for (args,) in sc["examples"]:
+                    run = pool.run(bytecode, sig["entry_point"], args, is_class=is_class, mode="count")
+                    runs.append((args, str(run["result"]), run["steps"]))
+                growth = None
+                if "alternatives" in sc:  # only read when a problem has several references
+                    growth = complexity.profile(pool, bytecode, sig["entry_point"],
+                                                infer_types(sig, sc["examples"][0][0]), is_class=is_class)
+                self.artifacts.put(doc_id, hashlib.sha256(code.encode()).hexdigest(), sig, bytecode, runs, growth)
+        self.lexical_index = BM25Index({d: e['document'] for d, e in self.slug_index.entries.items()})
+
+    def find_solutions(self, snippets, slugs=None, top_k=3):
+        ranked = []
+        for snippet in snippets:
+            candidates = []
+            for doc_id, score in self.lexical_index.search(snippet, top_k):
+                entry = self.slug_index.entries[doc_id]
+                candidates.append({"id": doc_id, "name": entry['name'], "code": entry['document'],
+                                   "metadata": entry['metadata'], "distance": None, "confidence": None,
+                                   "source": "lexical", "score": score})
+            ranked.append(candidates)
+        return ranked
+
+    def close(self):
+        self.artifacts.close()
+
+
+def _fake_inspector(scenarios):
+    """FakeModel handler answering the inspector prompt for each scenario's submission."""
+    import json
+
+    def reply(prompt):
+        for sc in scenarios:
+            if sc["submission"] in prompt:
+                return json.dumps(dict(sc["inspect"], predicted_slug=sc["slug"]))
+        raise ValueError("benchmark fake model got a prompt for an unknown submission")
+    return reply
+
+
+def e2e(repeats=5, pool=None, **_):
+    """
+    The whole analysis DAG offline: fixed submissions against fixed references,
+    the LLM replaced by a FakeModel behind a throwaway cache. The first run of
+    each scenario is cold (cache miss); later ones hit the LLM cache like a
+    resubmission. Also checks every verdict, so a "faster" pipeline that got
+    wrong can't pass.
+    """
+    import llm_gateway
+    from pipeline import analyze, PHASE_NAMES
+
+    if pool is None:
+        raise SuiteUnavailable("needs an execution pool")
+    scenarios = corpus.E2E
+    with tempfile.TemporaryDirectory(prefix="codealigner-bench-") as tmp:
+        engine = FixtureEngine(scenarios, pool, os.path.join(tmp, "db"))
+        fake = llm_gateway.FakeModel(handler=_fake_inspector(scenarios))
+        gateway = llm_gateway.LLMGateway(path=os.path.join(tmp, "llm.sqlite3"), model_factory=lambda key, name: fake)
+        previous = llm_gateway.set_gateway(gateway)
+        cold, warm, correct, runs = [], [], 0, 0
+        phases = {name: [] for name in PHASE_NAMES}
+        try:
+            for sc in scenarios:
+                for attempt in range(repeats):
+                    start = time.perf_counter()
+                    res = analyze(sc["submission"], "", "offline", engine, pool)
+                    (warm if attempt else cold).append(time.perf_counter() - start)
+                    if hasattr(res["u_log"], "close"):
+                        res["u_log"].close()
+                    runs += 1
+                    correct += res["fb_type"] == sc["expected"]
+                    if res["fb_type"] != sc["expected"]:
+                        print(f"   [bench] ⚠️ {sc['slug']}: expected {sc['expected']}, got "
+                              f"{res['fb_type']} ({res['fb_msg']})")
+                    for name, seconds in res["timings"].items():
+                        phases[name].append(seconds)
+        finally:
+            llm_gateway.set_gateway(previous)
+            gateway.close()
+            engine.close()
+
+    results = {
+        "e2e.verdict_accuracy": metric(correct / runs, "ratio", "higher", QUALITY_TOLERANCE),
+        "e2e.cold_p50_ms": metric(percentile(cold, 50) * 1000, "ms"),
+        "e2e.warm_p50_ms": metric(percentile(warm or cold, 50) * 1000, "ms"),
+        "e2e.warm_p95_ms": metric(percentile(warm or cold, 95) * 1000, "ms"),
+        "e2e.llm_calls": metric(len(fake.calls), "calls", tolerance=0.0),
+    }
+    for name, samples in phases.items():
+        if samples:
+            # Breakdown for reading, not gating: single phases are too jittery on a few runs
+            results[f"e2e.phase.{name}_p50_ms"] = metric(percentile(samples, 50) * 1000, "ms", tolerance=None)
+    return results
+
+
+# --- SLUG INDEX ---
+def index(repeats=5, queries=100, **_):
+    """
+    Metadata filtering in SlugIndex (solutions of a problem with a given
+    approach) on a synthetic index the size of the dataset and 10x that: the
+    secondary index against a scan of every entry. growth_10x should stay ~1.
+    """
+    from slug_index import SlugIndex
+
+    lookups = corpus.index_queries(queries)
+    results, best = {}, {}
+    for scale in (1, 10):
+        idx = SlugIndex()
+        for doc_id, name, document, meta in corpus.index_entries(scale):
+            idx.add(doc_id, name, document, meta)
+
+        def indexed():
+            for slug, label in lookups:
+                idx.solutions(slug, approach=label)
+
+        def scan():
+            for slug, label in lookups:
+                [d for d, e in idx.entries.items()
+                 if e["metadata"]["problem"] == slug and e["metadata"]["approach"] == label]
+
+        fns = {"solutions": indexed}
+        if scale == 10:
+            fns["scan"] = scan  # the baseline the index replaces, at the size that matters
+        for name, seconds in _best_per_call(fns, repeats).items():
+            best[f"{name}_{scale}x"] = seconds / len(lookups)
+            results[f"index.{name}_{scale}x_us"] = metric(seconds / len(lookups) * 1e6, "us",
+                                                          tolerance=None if name == "scan" else TIMING_TOLERANCE)
+    results["index.growth_10x"] = metric(best["solutions_10x"] / best["solutions_1x"], "x", tolerance=RATIO_TOLERANCE)
+    return results
+
+
+SUITES = {"tracing": tracing, "search": search, "e2e": e2e, "index": index}
@@ -2,88 +2,421 @@ import chromadb
 from sentence_transformers import SentenceTransformer
 from datasets import load_dataset
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import argparse
+import hashlib
 import shutil
+import queue
+import json
+import time
+import ast
 import os
+import re
+
+from slug_index import invalidate_snapshot, normalize_slug
+from vector_backends import invalidate_flat_index
+from embedding_cache import EmbeddingCache
+from signature import signature_metadata, analyze_signature
+from artifacts import ArtifactStore, compile_solution, canonical_inputs
+from difftest import infer_types
+from executor import ExecutionPool
+import approach
+import complexity
 
 # --- CONFIGURATION ---
 DB_PATH = "./leetcodedb_data"
 MODEL_NAME = 'all-MiniLM-L6-v2'
-BATCH_SIZE = 50 
-
-def build_database():
-    print("--- 1. CLEANING UP OLD DATA ---")
-    if os.path.exists(DB_PATH):
-        try:
-            shutil.rmtree(DB_PATH)
-            print("Deleted old database folder.")
-        except Exception as e:
-            print(f"Warning: Could not delete folder (might be in use). Error: {e}")
-
-    # Initialize New DB
+EMBED_BATCH_SIZE = int(os.getenv("CODEALIGNER_EMBED_BATCH", 256))   # rows per model.encode() call
+WRITE_BATCH_SIZE = int(os.getenv("CODEALIGNER_WRITE_BATCH", 1000))  # rows per collection.upsert() call
+QUEUE_DEPTH = 4  # max embedded batches waiting for the writer (bounds memory)
+INDEX_VERSION = 3  # bump when the stored metadata layout changes to force a re-upsert
+RESPONSE_VARIANT = 1  # variant number of the solution written up in a row's 'response'
+
+_DONE = object()  # end-of-stream marker for the writer queue
+_CODE_BLOCK = re.compile(r"```(?:python3?|py)?[ \t]*\n(.*?)```", re.S)
+
+
+class StageStats:
+    """Wall time and row count for one pipeline stage."""
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+
+    def add(self, rows, seconds):
+        self.rows += rows
+        self.seconds += seconds
+
+    def report(self):
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        return f"{self.name:<8} {self.rows:>7} rows in {self.seconds:7.2f}s  ({rate:,.0f} rows/sec)"
+
+
+def content_hash(code_solution):
+    """Fingerprint of a stored document. Includes INDEX_VERSION so schema changes re-index."""
+    payload = f"v{INDEX_VERSION}\n{code_solution}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def response_code(response):
+    """The Python code block of a row's 'response' write-up ('' if there is none)."""
+    match = _CODE_BLOCK.search(response or "")
+    return match.group(1).strip() + "\n" if match else ""
+
+
+def same_solution(a, b):
+    """Same code up to comments and formatting."""
+    try:
+        return ast.dump(ast.parse(a)) == ast.dump(ast.parse(b))
+    except (SyntaxError, ValueError):
+        return a.strip() == b.strip()
+
+
+def load_extra_solutions(path):
+    """
+    {problem slug: [code]} from a JSONL file with one {"slug" (or "task_id"), "code"}
+    object per line: more reference solutions for problems already in the dataset.
+    """
+    extra = {}
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            slug = normalize_slug(item.get("slug") or item.get("task_id"))
+            if not slug or not item.get("code"):
+                print(f"Warning: {path}:{n} has no slug/task_id or code, skipped.")
+                continue
+            extra.setdefault(slug, []).append(item["code"])
+    return extra
+
+
+def doc_id_for(i, variant):
+    """Chroma id of a row's solution: the row index for its primary solution, "<row>.<variant>" after that."""
+    return str(i) if not variant else f"{i}.{variant}"
+
+
+def iter_rows(dataset, extra_solutions=None):
+    """
+    STAGE 1: Stream (doc_id, row index, name, code, variant) tuples out of the dataset.
+    Variant 0 is 'completion' (full solution code), falling back to 'response'.
+    The code in 'response' is variant 1 when it is a different solution, and
+    extra_solutions ({slug: [code]}, see load_extra_solutions) follow from 2 on.
+    """
+    extra_solutions = extra_solutions or {}
+    for i, row in enumerate(dataset):
+        code_solution = row.get('completion', '')
+        alternative = response_code(row.get('response', ''))
+
+        # Fallback: Sometimes 'completion' is None, check 'response'
+        if not code_solution:
+            code_solution, alternative = row.get('response', ''), None
+
+        if not code_solution:
+            continue
+
+        # Get problem name (or make one up)
+        p_name = row.get('task_id', f"Problem {i}")
+        codes = [code_solution, None]  # numbering stays stable whether or not 'response' differs
+        if alternative and not same_solution(alternative, code_solution):
+            codes[RESPONSE_VARIANT] = alternative
+        codes += extra_solutions.get(normalize_slug(p_name), [])
+        for variant, code in enumerate(codes):
+            if code:
+                yield doc_id_for(i, variant), i, p_name, code, variant
+
+
+def solution_metadata(p_name, code_solution, variant):
+    """Problem grouping, variant number and approach tags (approach.py) for one stored solution."""
+    tagged = approach.classify(code_solution)
+    return {"problem": normalize_slug(p_name), "variant": variant,
+            "approach": tagged["approach"], "tags": ",".join(tagged["tags"])}
+
+
+def iter_batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _writer(collection, work_queue, stats, errors):
+    """
+    STAGE 3: Drain embedded batches from the queue and write them to Chroma.
+    Small embed batches are coalesced into WRITE_BATCH_SIZE upserts.
+    """
+    ids, embeddings, metadatas, documents = [], [], [], []
+
+    def flush():
+        start = time.perf_counter()
+        collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+        stats.add(len(ids), time.perf_counter() - start)
+
+    try:
+        while True:
+            item = work_queue.get()
+            if item is _DONE:
+                break
+            batch, vectors = item
+            for (doc_id, i, p_name, code_solution, variant), vector in zip(batch, vectors):
+                ids.append(doc_id)
+                embeddings.append(vector)
+                meta = {"id": i, "name": p_name, "hash": content_hash(code_solution)}
+                meta.update(solution_metadata(p_name, code_solution, variant))
+                meta.update(signature_metadata(code_solution))  # entry_point / arity / signature
+                metadatas.append(meta)
+                documents.append(code_solution)
+
+            if len(ids) >= WRITE_BATCH_SIZE:
+                flush()
+                ids, embeddings, metadatas, documents = [], [], [], []
+
+        # Final Batch
+        if ids:
+            flush()
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the producer never blocks on a full queue
+        while work_queue.get() is not _DONE:
+            pass
+
+
+def ingest(rows, collection, model, total=None, cache=None):
+    """
+    Producer/consumer ingestion: the main thread embeds rows in large batches
+    while a writer thread upserts the previous batches into Chroma.
+    `rows` is an iterable of (doc_id, row index, name, code, variant) tuples (see iter_rows).
+    With an EmbeddingCache, only solutions not embedded before hit the model.
+    Returns the per-stage stats (read, embed, write).
+    """
+    read_stats = StageStats("read")
+    embed_stats = StageStats("embed")
+    write_stats = StageStats("write")
+    errors = []
+
+    work_queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    writer = threading.Thread(target=_writer, args=(collection, work_queue, write_stats, errors), daemon=True)
+    writer.start()
+
+    def encode(texts):
+        return model.encode(texts, batch_size=min(EMBED_BATCH_SIZE, 128), show_progress_bar=False).tolist()
+
+    batches = iter_batches(rows, EMBED_BATCH_SIZE)
+    try:
+        with tqdm(total=total, unit="rows") as bar:
+            while not errors:
+                # STAGE 1: READ
+                start = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                read_stats.add(len(batch), time.perf_counter() - start)
+
+                # STAGE 2: EMBED (one model call per batch)
+                start = time.perf_counter()
+                texts = [row[3] for row in batch]
+                vectors = cache.encode(encode, texts) if cache else encode(texts)
+                embed_stats.add(len(batch), time.perf_counter() - start)
+
+                work_queue.put((batch, vectors))
+                bar.update(len(batch))
+    finally:
+        work_queue.put(_DONE)
+        writer.join()
+
+    if errors:
+        raise errors[0]
+
+    return read_stats, embed_stats, write_stats
+
+
+def fetch_existing_hashes(collection, page_size=5000):
+    """Returns {chroma_id: content_hash} for everything currently stored."""
+    existing = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        for doc_id, meta in zip(page['ids'], page['metadatas']):
+            existing[doc_id] = (meta or {}).get("hash")
+        offset += len(page['ids'])
+    return existing
+
+
+def plan_incremental(dataset, existing, extra_solutions=None):
+    """
+    Diffs the dataset against the stored hashes.
+    Returns (changed_rows, stale_ids, unchanged_count).
+    """
+    changed = []
+    seen = set()
+    for row in iter_rows(dataset, extra_solutions):
+        doc_id, code_solution = row[0], row[3]
+        seen.add(doc_id)
+        if existing.get(doc_id) != content_hash(code_solution):
+            changed.append(row)
+
+    stale = [doc_id for doc_id in existing if doc_id not in seen]
+    return changed, stale, len(seen) - len(changed)
+
+
+def solution_artifacts(code_solution, row, pool=None, measure_growth=True):
+    """
+    Signature, bytecode, reference runs and measured complexity (or None) for one solution.
+    Runs go through the sandboxed pool in count mode; inputs the solution fails on are dropped.
+    Complexity is profiled on inputs shaped like the first canonical one (complexity.py).
+    """
+    signature = analyze_signature(code_solution)
+    bytecode = compile_solution(code_solution)
+    runs = []
+    if pool is not None and signature and bytecode:
+        for args in canonical_inputs(row, signature):
+            run = pool.run(bytecode, signature["entry_point"], args,
+                           is_class=signature["class"] is not None, mode="count")
+            result = run["result"]
+            if isinstance(result, str) and result.startswith("Error"):
+                continue
+            runs.append((args, str(result), run["steps"]))
+    growth = None
+    if measure_growth and runs:
+        types = infer_types(signature, runs[0][0])
+        if types is not None:
+            growth = complexity.profile(pool, bytecode, signature["entry_point"], types,
+                                        is_class=signature["class"] is not None)
+            if not growth["order"]:
+                growth = None
+    return signature, bytecode, runs, growth
+
+
+def build_artifacts(dataset, store, run_references=True, measure_growth=True, extra_solutions=None):
+    """
+    STAGE 4: Precompute per-solution artefacts into the side store (artifacts.py).
+    Incremental on its own: only solutions whose stored hash differs are redone.
+    Returns StageStats.
+    """
+    stats = StageStats("artifact")
+    stored = store.hashes()
+    todo, seen = [], set()
+    for doc_id, i, _, code_solution, _ in iter_rows(dataset, extra_solutions):
+        seen.add(doc_id)
+        if stored.get(doc_id) != content_hash(code_solution):
+            todo.append((doc_id, i, code_solution))
+    stale = [doc_id for doc_id in stored if doc_id not in seen]
+    if stale:
+        store.delete(stale)
+    measure_growth = measure_growth and run_references
+    print(f"Artefacts to build: {len(todo)} | Removed: {len(stale)} | Reference runs: {run_references}"
+          f" | Complexity: {measure_growth}")
+    if not todo:
+        return stats
+
+    pool = ExecutionPool() if run_references else None
+    started = time.perf_counter()
+    try:
+        # One thread per pool worker keeps every worker busy
+        with ThreadPoolExecutor(max_workers=pool.size if pool else 1) as executor:
+            futures = {executor.submit(solution_artifacts, code, dataset[i], pool, measure_growth): (doc_id, code)
+                       for doc_id, i, code in todo}
+            for future in tqdm(as_completed(futures), total=len(futures), unit="rows"):
+                doc_id, code_solution = futures[future]
+                signature, bytecode, runs, growth = future.result()
+                store.put(doc_id, content_hash(code_solution), signature, bytecode, runs, growth)
+    finally:
+        if pool is not None:
+            pool.close()
+    stats.add(len(todo), time.perf_counter() - started)
+    return stats
+
+
+def build_database(full=False, run_references=True, measure_growth=True, extra_solutions_path=None):
+    if full or not os.path.exists(DB_PATH):
+        print("--- 1. CLEANING UP OLD DATA ---")
+        if os.path.exists(DB_PATH):
+            try:
+                shutil.rmtree(DB_PATH)
+                print("Deleted old database folder.")
+            except Exception as e:
+                print(f"Warning: Could not delete folder (might be in use). Error: {e}")
+        mode = "full"
+    else:
+        print("--- 1. OPENING EXISTING DATABASE (incremental) ---")
+        mode = "incremental"
+
     chroma_client = chromadb.PersistentClient(path=DB_PATH)
     collection = chroma_client.get_or_create_collection(name="leetcode_solutions")
-    print(f"New Database initialized at: {DB_PATH}")
+    print(f"Database ready at: {DB_PATH} ({collection.count()} records)")
 
     print("\n--- 2. LOADING AI MODELS & DATA ---")
     model = SentenceTransformer(MODEL_NAME)
-    
+
     # Load dataset
     print("Downloading LeetCode Dataset...")
     dataset = load_dataset("newfacade/LeetCodeDataset", split="train")
-    
+
     total_records = len(dataset)
     print(f"Dataset Loaded. Total Problems: {total_records}")
+    extra_solutions = load_extra_solutions(extra_solutions_path) if extra_solutions_path else None
+    if extra_solutions:
+        print(f"Extra solutions: {sum(map(len, extra_solutions.values()))} for {len(extra_solutions)} problems")
 
-    print("\n--- 3. INGESTION STARTED (Using 'completion' column) ---")
-    
-    ids = []
-    documents = []
-    metadatas = []
-    embeddings = []
-
-    for i, row in tqdm(enumerate(dataset), total=total_records):
-        
-        # --- THE FIX IS HERE ---
-        # We use 'completion' which contains the full solution code
-        code_solution = row.get('completion', '')
-        
-        # Fallback: Sometimes 'completion' is None, check 'response'
-        if not code_solution:
-            code_solution = row.get('response', '')
+    if mode == "incremental":
+        existing = fetch_existing_hashes(collection)
+        rows, stale, unchanged = plan_incremental(dataset, existing, extra_solutions)
+        total = len(rows)
+        print(f"Changed/new: {len(rows)} | Removed: {len(stale)} | Unchanged: {unchanged}")
 
-        if not code_solution:
-            continue
+        if stale:
+            for start in range(0, len(stale), WRITE_BATCH_SIZE):
+                collection.delete(ids=stale[start:start + WRITE_BATCH_SIZE])
+            print(f"Deleted {len(stale)} stale records.")
+    else:
+        # Streamed: a row can hold several solutions, so the progress bar counts up without a total
+        rows = iter_rows(dataset, extra_solutions)
+        total = None
 
-        # Create Embedding
-        vector = model.encode(code_solution).tolist()
-        
-        # Get problem name (or make one up)
-        p_name = row.get('task_id', f"Problem {i}")
+    print(f"\n--- 3. INGESTION STARTED ({mode}, using 'completion' column) ---")
+    print(f"Embed batch: {EMBED_BATCH_SIZE} | Write batch: {WRITE_BATCH_SIZE} | Queue depth: {QUEUE_DEPTH}")
+    started = time.perf_counter()
+    cache = EmbeddingCache(model_name=MODEL_NAME)
+    stages = ingest(rows, collection, model, total=total, cache=cache)
+    elapsed = time.perf_counter() - started
+    invalidate_snapshot(DB_PATH)
+    invalidate_flat_index(DB_PATH)
+
+    print("\n--- 4. STAGE THROUGHPUT ---")
+    for stage in stages:
+        print(stage.report())
+    print(f"{'total':<8} {stages[-1].rows:>7} rows in {elapsed:7.2f}s")
+    cache_stats = cache.stats()
+    print(f"Embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['size']} stored)")
+    cache.close()
 
-        ids.append(str(i))
-        embeddings.append(vector)
-        # Store metadata
-        metadatas.append({"id": i, "name": p_name})
-        # Store the actual code text
-        documents.append(code_solution)
-
-        # Batch Insert
-        if len(ids) >= BATCH_SIZE:
-            collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                documents=documents
-            )
-            ids, embeddings, metadatas, documents = [], [], [], []
-
-    # Final Batch
-    if ids:
-        collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    print("\n--- 5. REFERENCE ARTEFACTS ---")
+    store = ArtifactStore(DB_PATH)
+    print(build_artifacts(dataset, store, run_references=run_references, measure_growth=measure_growth,
+                          extra_solutions=extra_solutions).report())
+    store.close()
 
     print("\n" + "="*50)
-    print(f"SUCCESS! Database built with {collection.count()} problems.")
+    print(f"SUCCESS! Database built with {collection.count()} solutions.")
     print("="*50)
 
 if __name__ == "__main__":
-    build_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the local LeetCode solution index.")
+    parser.add_argument("--full", action="store_true",
+                        help="Delete the database folder and re-embed everything (default: incremental update)")
+    parser.add_argument("--no-reference-runs", action="store_true",
+                        help="Store signatures and bytecode only; skip executing references on canonical inputs")
+    parser.add_argument("--no-complexity", action="store_true",
+                        help="Skip measuring each reference's complexity (scaled runs, see complexity.py)")
+    parser.add_argument("--extra-solutions", metavar="JSONL",
+                        help='More reference solutions: one {"slug": ..., "code": ...} object per line')
+    args = parser.parse_args()
+    build_database(full=args.full, run_references=not args.no_reference_runs,
+                   measure_growth=not args.no_complexity, extra_solutions_path=args.extra_solutions)
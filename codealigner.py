@@ -0,0 +1,226 @@
+"""
+CodeAligner command line.
+
+    python codealigner.py batch submissions/ -o results.jsonl --workers 8 --no-llm
+
+batch grades every submission in a directory (one file each) or a JSONL file
+({"id", "code", "problem"?, "slug"?} per line) through the analysis pipeline
+and appends one JSON result per submission to the output file. The output is
+the checkpoint: a rerun skips ids already in it, so a crashed run resumes.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tqdm import tqdm
+import argparse
+import json
+import time
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # plain environment variables still work
+    load_dotenv = None
+
+from executor import ExecutionPool, POOL_SIZE
+from pipeline import analyze, PHASE_NAMES
+import metrics
+
+# --- CONFIGURATION ---
+SOURCE_EXTENSIONS = (".py", ".cpp", ".cc", ".java")  # files picked up from a submissions directory
+FSYNC_EVERY = 100  # results between fsyncs (every result is flushed; fsync survives power loss too)
+API_KEY_VARS = ("GEMINI_API_KEY", "GOOGLE_API_KEY")
+
+
+def api_key_from_env():
+    if load_dotenv is not None:
+        load_dotenv()
+    return next((os.environ[name] for name in API_KEY_VARS if os.environ.get(name)), None)
+
+
+# --- INPUT ---
+def iter_submissions(source):
+    """Yields {"id", "code", "problem", "slug"} from a directory or a JSONL file."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(SOURCE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        code = f.read()
+                    yield {"id": os.path.relpath(path, source), "code": code, "problem": "", "slug": None}
+        return
+    with open(source, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            yield {"id": str(row.get("id", number)), "code": row["code"],
+                   "problem": row.get("problem") or row.get("description") or "", "slug": row.get("slug")}
+
+
+def read_checkpoint(path):
+    """
+    Ids already graded in an earlier run's output. A torn last line (the run died
+    mid-write) is cut off so appending starts on a clean line; an unreadable line
+    before it is skipped and left in place. SYSTEM ERROR records (an LLM outage,
+    a crash) don't count: those submissions are graded again and the retry's
+    record is appended after the failed one.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        good = 0
+        torn = False
+        for number, line in enumerate(f, 1):
+            if not line.endswith(b"\n"):
+                torn = True
+                break
+            good += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if record.get("verdict") != "SYSTEM ERROR":
+                    done.add(record["id"])
+            except (ValueError, KeyError, AttributeError, TypeError):
+                print(f"[batch] ⚠️ skipping unreadable line {number} of {path}")
+        if torn:
+            f.truncate(good)
+    return done
+
+
+# --- GRADING ---
+def grade(sub, engine, pool, api_key=None, use_llm=True, skip=()):
+    """One submission through the pipeline -> flat, JSON-safe result record."""
+    started = time.perf_counter()
+    record = {"id": sub["id"]}
+    try:
+        with metrics.request("grade", id=sub["id"]):
+            res = analyze(sub["code"], sub["problem"], api_key, engine, pool,
+                          use_llm=use_llm, slug=sub["slug"], skip=skip)
+    except Exception as e:
+        record.update(verdict="SYSTEM ERROR", error=str(e), seconds=round(time.perf_counter() - started, 3))
+        return record
+    if hasattr(res["u_log"], "close"):
+        res["u_log"].close()  # spilled trace file; nobody pages through it here
+
+    checks, diff, scaling, aligned = res["checks"], res["diff"], res["complexity"], res["alignment"]
+    fam = res["family"]
+    record.update(
+        verdict=res["fb_type"],
+        message=res["fb_msg"],
+        lang=res["lang"],
+        slug=res["slug"],
+        reference_id=res["reference_id"],
+        approach=fam["user"]["approach"] if fam else None,
+        nearest_reference_id=fam["nearest"]["id"] if fam else None,
+        confidence=round(res["conf"], 4),
+        user_steps=res["u_steps"],
+        ref_steps=res["g_steps"],
+        checks_passed=sum(c["got"] == c["expected"] for c in checks) if checks else None,
+        checks_total=len(checks) if checks else None,
+        generated_inputs=diff["valid"] if diff else None,
+        counterexample=repr(diff["counterexample"]["args"]) if diff and diff["counterexample"] else None,
+        counterexample_verified=diff["counterexample"]["verified"] if diff and diff["counterexample"] else None,
+        user_order=scaling["user"]["order"] if scaling else None,
+        ref_order=scaling["reference"]["order"] if scaling and scaling["reference"] else None,
+        divergence=aligned["divergence"]["index"] if aligned and aligned["divergence"] else None,
+        timings_ms={name: round(t * 1000, 1) for name, t in res["timings"].items()},
+        phase_errors=res["phase_errors"] or None,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return record
+
+
+def run_batch(source, output, engine, pool, workers=POOL_SIZE, api_key=None, use_llm=True, skip=(), limit=None):
+    """
+    Grades every submission in source not yet in output, `workers` at a time,
+    appending results in completion order. Returns the number graded this run.
+    """
+    done = read_checkpoint(output)
+    todo, seen = [], set(done)
+    for sub in iter_submissions(source):
+        if sub["id"] not in seen:
+            seen.add(sub["id"])
+            todo.append(sub)
+    if limit is not None:
+        todo = todo[:limit]
+    print(f"[batch] {len(done)} already graded, {len(todo)} to go ({workers} workers, "
+          f"LLM {'on' if use_llm else 'off'}{', skipping ' + ', '.join(skip) if skip else ''})")
+
+    written = 0
+    with open(output, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(todo), unit="sub") as bar:
+
+        def write(futures):
+            nonlocal written
+            for future in futures:
+                out.write(json.dumps(future.result(), default=str) + "\n")
+                out.flush()
+                written += 1
+                if written % FSYNC_EVERY == 0:
+                    os.fsync(out.fileno())
+                bar.update(1)
+
+        # Bounded window of in-flight submissions: memory stays flat on huge inputs
+        pending = set()
+        for sub in todo:
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(finished)
+            pending.add(executor.submit(grade, sub, engine, pool, api_key, use_llm, skip))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            write(finished)
+        os.fsync(out.fileno())
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CodeAligner command line.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Grade a directory or JSONL file of submissions headlessly")
+    batch.add_argument("source", help="Directory of source files, or JSONL with id/code[/problem/slug] per line")
+    batch.add_argument("-o", "--output", default="results.jsonl",
+                       help="JSONL results file; also the checkpoint a rerun resumes from")
+    batch.add_argument("--workers", type=int, default=POOL_SIZE,
+                       help="Submissions graded concurrently (and execution worker processes)")
+    batch.add_argument("--no-llm", action="store_true",
+                       help="Skip Gemini: static inspection, slug from the input or vector search")
+    batch.add_argument("--skip", default="",
+                       help=f"Comma-separated phases to skip, e.g. complexity,alignment (of: {', '.join(PHASE_NAMES[1:])})")
+    batch.add_argument("--limit", type=int, help="Grade at most this many new submissions")
+    batch.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                       help="Serve Prometheus metrics on this port while grading (0: off)")
+    args = parser.parse_args(argv)
+
+    skip = tuple(name for name in args.skip.split(",") if name)
+    unknown = [name for name in skip if name not in PHASE_NAMES[1:]]
+    if unknown:
+        parser.error(f"unknown phase(s) for --skip: {', '.join(unknown)}")
+    api_key = None if args.no_llm else api_key_from_env()
+    if not args.no_llm and not api_key:
+        parser.error(f"set {API_KEY_VARS[0]} (environment or .env) or pass --no-llm")
+
+    metrics.serve(args.metrics_port)
+    from search_engine import get_engine
+    engine = get_engine().warmup()
+    pool = ExecutionPool(size=args.workers)
+    try:
+        started = time.perf_counter()
+        graded = run_batch(args.source, args.output, engine, pool, workers=args.workers,
+                           api_key=api_key, use_llm=not args.no_llm, skip=skip, limit=args.limit)
+        print(f"[batch] ✅ {graded} graded in {time.perf_counter() - started:.1f}s -> {args.output}")
+        for row in metrics.get_registry().summary()[:10]:
+            if row["metric"].startswith("span_seconds"):
+                print(f"   {row['metric'][len('span_seconds span='):]:<24} n={row['count']:<6} "
+                      f"p50={row['p50'] * 1000:8.1f}ms p95={row['p95'] * 1000:8.1f}ms p99={row['p99'] * 1000:8.1f}ms")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
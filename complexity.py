@@ -0,0 +1,145 @@
+import random
+import math
+
+from difftest import random_input
+
+# --- CONFIGURATION ---
+GROWTH_SIZES = (4, 8, 16, 32, 64, 128, 256, 512, 1024)  # container sizes, geometric
+SCALAR_SIZES = (2, 4, 6, 8, 10, 12, 14, 16, 20, 24, 32, 64, 128, 256, 1024)  # f(n) with n an int: denser
+# Inputs per size; the slowest one counts. "large" values rarely collide, so searches
+# that stop at the first match (two-sum style) run to the end: closer to the worst case
+PROFILE_MODES = ("random", "large")
+PROFILE_MAX_STEPS = 300_000  # per call; bigger sizes of a slow solution are simply cut off
+MIN_SAMPLES = 3
+
+# Candidate growth curves, cheapest first (ties go to the simpler one)
+CURVES = (
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n * n)),
+    ("O(2^n)", None),  # exponential: c^n with the base c fitted from the samples
+)
+RANK = {name: i for i, (name, _) in enumerate(CURVES)}
+
+_BUDGET_ERRORS = ("Error: Exceeded", "Error: CPU time", "Error: Time limit")  # step limit, rlimit, pool timeout
+
+
+def _fit(samples, curve):
+    """
+    Weighted least squares for cost ~ a * curve(n) + b with a >= 0, weights 1/cost^2
+    (so every size counts in relative terms). Returns (RMS relative error, a).
+    """
+    sw = sx = sy = sxx = sxy = 0.0
+    for n, cost in samples:
+        w = 1.0 / max(cost, 1.0) ** 2
+        x = curve(n)
+        sw += w; sx += w * x; sy += w * cost; sxx += w * x * x; sxy += w * x * cost
+    det = sw * sxx - sx * sx
+    a = (sw * sxy - sx * sy) / det if det > 1e-12 * max(1.0, sw * sxx) else 0.0
+    if a <= 0:
+        a, b = 0.0, sy / sw
+    else:
+        b = (sy - a * sx) / sw
+    err = sum(((cost - a * curve(n) - b) / max(cost, 1.0)) ** 2 for n, cost in samples)
+    return math.sqrt(err / len(samples)), a
+
+
+def _exponential_base(samples):
+    """Base c of cost ~ k * c^n from a log-linear fit (at least 1.1 so the curve grows)."""
+    points = [(n, math.log(max(c, 1.0))) for n, c in samples]
+    mean_n = sum(n for n, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((n - mean_n) ** 2 for n, _ in points)
+    slope = sum((n - mean_n) * (y - mean_y) for n, y in points) / var if var else 0.0
+    return max(1.1, min(2.0, math.exp(slope)))
+
+
+def estimate_order(samples):
+    """
+    Best-fitting growth curve for [(n, cost)] samples.
+    Returns {"order", "confidence" (0..1), "errors": {curve: rms relative error}}.
+    Confidence compares the best fit with the runner-up: 0 means indistinguishable.
+    Curves that only fit by collapsing to a constant (a == 0) don't count as runner-up.
+    """
+    samples = [(n, c) for n, c in samples if n >= 1]
+    if len({n for n, _ in samples}) < MIN_SAMPLES:
+        return {"order": None, "confidence": 0.0, "errors": {}}
+    base = _exponential_base(samples)
+    curves = [(name, curve or (lambda n: base ** min(n, 60))) for name, curve in CURVES]
+    fits = {name: _fit(samples, curve) for name, curve in curves}
+    errors = {name: err for name, (err, _) in fits.items()}
+    ranked = sorted(errors, key=lambda name: (round(errors[name], 4), RANK[name]))
+    best = ranked[0]
+
+    lo, hi = min(n for n, _ in samples), max(n for n, _ in samples)
+    mean = sum(c for _, c in samples) / len(samples)
+    curve_of = dict(curves)
+    def grows(name):  # the fitted curve actually varies over the sampled range
+        return fits[name][1] * (curve_of[name](hi) - curve_of[name](lo)) > 0.01 * max(mean, 1.0)
+    rivals = [name for name in ranked[1:] if grows(name)]
+    if rivals:
+        confidence = 1.0 - (errors[best] + 0.01) / (errors[rivals[0]] + 0.01)
+    else:
+        confidence = 1.0 - 5 * errors[best]  # nothing but a constant fits
+    return {"order": best, "confidence": max(0.0, min(1.0, confidence)), "errors": errors}
+
+
+def profile(pool, code, func, types, is_class=False, sizes=None, seed=0, language="python"):
+    """
+    Runs func on random inputs of growing size (one pool batch, count mode) and fits
+    step counts and wall time. Runs that raise are skipped; from the first size
+    that runs out of budget (steps, CPU, timeout) on, sizes are dropped.
+    The estimate is whichever fit is more confident: steps miss work done in C
+    (sorted(), set ops), wall time is noisy at small sizes.
+    Returns {"order", "confidence", "source", "steps_order", "time_order", "samples": [(n, steps, seconds)]}.
+    """
+    rng = random.Random(seed)
+    scalar_only = not any(t[0] in ("list", "str") for t in types)
+    if sizes is None:
+        sizes = SCALAR_SIZES if scalar_only else GROWTH_SIZES
+    inputs = [(n, random_input(types, n, rng, mode, exact_scalars=scalar_only))
+              for n in sizes for mode in PROFILE_MODES]
+    runs = pool.run_batch(code, func, [args for _, args in inputs], is_class=is_class,
+                          mode="count", max_steps=PROFILE_MAX_STEPS, language=language)
+
+    worst, cutoff = {}, math.inf
+    for (n, _), run in zip(inputs, runs):
+        if run["result"].startswith(_BUDGET_ERRORS):
+            cutoff = min(cutoff, n)  # out of budget: this size and larger say nothing
+        elif not run["result"].startswith("Error"):
+            steps, seconds = worst.get(n, (0, 0.0))
+            worst[n] = (max(steps, run["steps"]), max(seconds, run["seconds"]))
+    samples = sorted((n, steps, seconds) for n, (steps, seconds) in worst.items() if n < cutoff)
+
+    by_steps = estimate_order([(n, steps) for n, steps, _ in samples])
+    by_time = estimate_order([(n, seconds * 1e6) for n, _, seconds in samples])
+    best, source = (by_steps, "steps") if by_steps["confidence"] >= by_time["confidence"] else (by_time, "time")
+    return {
+        "order": best["order"],
+        "confidence": best["confidence"],
+        "source": source,
+        "steps_order": by_steps["order"],
+        "time_order": by_time["order"],
+        "samples": samples,
+    }
+
+
+def is_slower(user, reference, min_confidence=0.3):
+    """True if the user's estimated order is a worse growth class than the reference's."""
+    if not user or not reference or not user["order"] or not reference["order"]:
+        return False
+    if min(user["confidence"], reference["confidence"]) < min_confidence:
+        return False
+    return RANK[user["order"]] > RANK[reference["order"]]
+
+
+def summary(user, reference=None):
+    """One line for the UI and the LLM context."""
+    def fmt(p):
+        return f"{p['order']} (confidence {p['confidence']:.0%})" if p and p["order"] else "unknown"
+    text = f"Measured complexity: yours {fmt(user)}"
+    if reference is not None:
+        text += f", reference {fmt(reference)}"
+    return text
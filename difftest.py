@@ -0,0 +1,326 @@
+from concurrent.futures import ThreadPoolExecutor
+import random
+import copy
+import ast
+
+import metrics
+
+# --- CONFIGURATION ---
+NUM_INPUTS = 48                         # generated inputs per analysis (edge cases included)
+SIZES = (0, 1, 2, 3, 5, 8, 16, 32, 64)  # container sizes, smallest first
+VALUE_RANGE = 10                        # small ints collide often (duplicates, zero sums)
+BIG_VALUE = 10 ** 9
+MAX_SHRINK_ROUNDS = 30
+SHRINK_BATCH = 16                       # candidates tried per shrink round
+CHUNKS = 4                              # generated inputs are split across this many pool jobs
+MAX_ALTERNATES = 3                      # other reference solutions asked whether a counterexample is real
+
+# Fallback element types by parameter name when there are no annotations
+_NAME_HINTS = {
+    "nums": ("list", ("int",)), "arr": ("list", ("int",)), "prices": ("list", ("int",)),
+    "heights": ("list", ("int",)), "height": ("list", ("int",)), "numbers": ("list", ("int",)),
+    "nums1": ("list", ("int",)), "nums2": ("list", ("int",)),
+    "s": ("str",), "t": ("str",), "word": ("str",), "text": ("str",), "p": ("str",),
+    "words": ("list", ("str",)), "strs": ("list", ("str",)),
+    "grid": ("list", ("list", ("int",))), "matrix": ("list", ("list", ("int",))),
+    "k": ("int",), "n": ("int",), "m": ("int",), "target": ("int",), "x": ("int",),
+}
+
+
+# --- SAFE INPUT PARSING ---
+def parse_args(text):
+    """
+    Safe replacement for eval() on a test-input string. Accepts a Python literal
+    ("([1, 2], 3)", "[1, 2]") or LeetCode's "nums = [1, 2], target = 3" form.
+    Always returns a tuple; raises ValueError if it isn't plain literal data.
+    """
+    text = (text or "").strip() or "()"
+    try:
+        value = ast.literal_eval(text)
+        return value if isinstance(value, tuple) else (value,)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        pass
+    try:
+        call = ast.parse(f"f({text})", mode="eval").body
+        if not call.args and all(kw.arg for kw in call.keywords):
+            return tuple(ast.literal_eval(kw.value) for kw in call.keywords)
+        return tuple(ast.literal_eval(a) for a in call.args)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError(f"Test input is not a plain literal: {text[:80]!r}")
+
+
+# --- TYPES ---
+def type_from_annotation(annotation):
+    """'List[List[int]]' -> ('list', ('list', ('int',))); None for anything unsupported."""
+    if not annotation:
+        return None
+    try:
+        node = ast.parse(annotation, mode="eval").body
+    except SyntaxError:
+        return None
+    return _type_node(node)
+
+
+def _type_node(node):
+    if isinstance(node, ast.Name) and node.id in ("int", "str", "bool", "float"):
+        return (node.id,)
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+        outer = node.value.id
+        if outer in ("List", "list"):
+            inner = _type_node(node.slice)
+            return ("list", inner) if inner else None
+        if outer == "Optional":
+            return _type_node(node.slice)
+    return None
+
+
+def type_of_value(value):
+    """Type of an example value (first element decides a list's element type)."""
+    if isinstance(value, bool):
+        return ("bool",)
+    for name, t in (("int", int), ("float", float), ("str", str)):
+        if isinstance(value, t):
+            return (name,)
+    if isinstance(value, list):
+        inner = type_of_value(value[0]) if value else ("int",)
+        return ("list", inner) if inner else None
+    return None
+
+
+def infer_types(signature, example_args=None):
+    """
+    Parameter types for the signature's entry point: type hints first, then the
+    example argument values, then parameter-name conventions. None if any is unknown.
+    """
+    entry = next(m for m in signature["methods"] if m["name"] == signature["entry_point"])
+    types = []
+    for i, param in enumerate(entry["params"]):
+        t = type_from_annotation(param["annotation"])
+        if t is None and example_args is not None and i < len(example_args):
+            t = type_of_value(example_args[i])
+        if t is None:
+            t = _NAME_HINTS.get(param["name"])
+        if t is None:
+            return None
+        types.append(t)
+    return types
+
+
+# --- GENERATION ---
+def _value(t, size, rng, mode):
+    kind = t[0]
+    if kind == "int":
+        if mode == "negative":
+            return rng.randint(-VALUE_RANGE, -1)
+        if mode == "large":
+            return rng.choice((BIG_VALUE, -BIG_VALUE, rng.randint(-BIG_VALUE, BIG_VALUE)))
+        return rng.randint(-VALUE_RANGE, VALUE_RANGE) if mode != "small" else rng.randint(0, max(1, size))
+    if kind == "float":
+        return round(rng.uniform(-VALUE_RANGE, VALUE_RANGE), 2)
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "str":
+        alphabet = "ab" if mode == "duplicates" else "abcxyz"
+        return "".join(rng.choice(alphabet) for _ in range(size))
+    if kind == "list":
+        if mode == "duplicates" and size:
+            item = _value(t[1], max(1, size // 4), rng, "random")
+            return [copy.deepcopy(item) for _ in range(size)]  # equal, not shared: solutions may mutate them
+        inner_size = min(size, 8) if t[1][0] == "list" else max(1, size // 4)
+        return [_value(t[1], inner_size, rng, mode) for _ in range(size)]
+    raise ValueError(f"Unsupported type {t}")
+
+
+def input_size(args):
+    """Problem size of an argument tuple: the longest container/string, or the largest small int."""
+    sizes = [len(a) for a in args if isinstance(a, (list, str))]
+    if sizes:
+        return max(sizes)
+    ints = [abs(a) for a in args if isinstance(a, int) and not isinstance(a, bool)]
+    return max(ints, default=0)
+
+
+def random_input(types, size, rng, mode="random", exact_scalars=False):
+    """
+    One argument tuple whose containers/strings have `size` elements.
+    With exact_scalars, int arguments of a container-free signature are exactly `size`.
+    """
+    has_container = any(t[0] in ("list", "str") for t in types)
+    args = []
+    for t in types:
+        if t[0] in ("list", "str"):
+            args.append(_value(t, size, rng, mode))
+        elif not has_container and exact_scalars and t[0] == "int":
+            args.append(size)
+        else:
+            # scalars track the size only when nothing else carries it (e.g. fib(n))
+            args.append(_value(t, size, rng, "small" if not has_container else mode))
+    return tuple(args)
+
+
+def generate_inputs(types, count=NUM_INPUTS, seed=0):
+    """
+    Edge cases first (empty, single, all-duplicate, negative, huge values),
+    then random inputs of increasing size. Deterministic for a given seed.
+    """
+    rng = random.Random(seed)
+    plan = [(0, "random"), (1, "random"), (4, "duplicates"), (4, "negative"), (4, "large")]
+    per_size = max(1, (count - len(plan)) // len(SIZES))
+    plan += [(size, "random") for size in SIZES for _ in range(per_size)]
+
+    inputs, seen = [], set()
+    for size, mode in plan:
+        if len(inputs) >= count:
+            break
+        args = random_input(types, size, rng, mode)
+        key = repr(args)
+        if key not in seen:
+            seen.add(key)
+            inputs.append(args)
+    return inputs
+
+
+# --- SHRINKING ---
+def _shrink_value(value):
+    """Smaller variants of one value, most aggressive first."""
+    if isinstance(value, bool):
+        return [False] if value else []
+    if isinstance(value, int):
+        out = [0] if value else []
+        if abs(value) > 1:
+            out += [value // 2, value - (1 if value > 0 else -1)]
+        return out
+    if isinstance(value, (list, str)):
+        n = len(value)
+        out = []
+        if n:
+            out.append(value[:0])
+        if n > 1:
+            out += [value[:n // 2], value[n // 2:]]
+        out += [value[:i] + value[i + 1:] for i in range(min(n, 8))]
+        if isinstance(value, list):
+            for i, item in enumerate(value[:8]):
+                out += [value[:i] + [smaller] + value[i + 1:] for smaller in _shrink_value(item)]
+        return out
+    return []
+
+
+def shrink_candidates(args):
+    """
+    Argument tuples one shrink step smaller than args. Each is a deep copy: they
+    travel in one pickled batch, where shared objects stay shared, so a solution
+    mutating its input would otherwise change the next candidate.
+    """
+    candidates = []
+    for i, value in enumerate(args):
+        for smaller in _shrink_value(value):
+            candidates.append(copy.deepcopy(args[:i] + (smaller,) + args[i + 1:]))
+    return candidates
+
+
+# --- DIFFERENTIAL EXECUTION ---
+class DiffRunner:
+    """
+    Runs user and reference code side by side on the pool, in parallel batches.
+    The reference is Python; the user's code may be in any pool language.
+    """
+    def __init__(self, pool, user_code, user_func, ref_code, ref_func, ref_is_class=True, user_language="python"):
+        self.pool = pool
+        self.user = (user_code, user_func, False, user_language)
+        self.ref = (ref_code, ref_func, ref_is_class, "python")
+
+    def compare(self, inputs, chunks=CHUNKS):
+        """[(args, user_run, ref_run)] with both sides' {"result", "steps"}."""
+        if not inputs:
+            return []
+        size = max(1, -(-len(inputs) // chunks))
+        parts = [inputs[i:i + size] for i in range(0, len(inputs), size)]
+        jobs = [(side, part) for part in parts for side in (self.user, self.ref)]
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [executor.submit(metrics.bind(self.pool.run_batch), code, func, part, is_class=is_class,
+                                       language=language)
+                       for (code, func, is_class, language), part in jobs]
+            results = [f.result() for f in futures]
+        compared = []
+        for n, part in enumerate(parts):
+            user_runs, ref_runs = results[2 * n], results[2 * n + 1]
+            compared += list(zip(part, user_runs, ref_runs))
+        return compared
+
+    def shrink(self, args, rounds=MAX_SHRINK_ROUNDS):
+        """Greedily reduces a failing input while user and reference still disagree."""
+        for _ in range(rounds):
+            candidates = shrink_candidates(args)[:SHRINK_BATCH]
+            smaller = next((a for a, u, r in self.compare(candidates, chunks=1) if _disagree(u, r)), None)
+            if smaller is None:
+                break
+            args = smaller
+        return args
+
+
+def _rejected(ref_run):
+    """
+    The input is outside the problem's preconditions: the reference raised, or
+    returned None (e.g. a two-sum with no answer falling off the end). Such inputs
+    have no expected output to compare against.
+    """
+    return ref_run["result"].startswith("Error") or ref_run["result"] == "None"
+
+
+def _disagree(user_run, ref_run):
+    return not _rejected(ref_run) and user_run["result"] != ref_run["result"]
+
+
+def _verified(pool, alternates, args, expected, got):
+    """
+    Whether expected is THE answer for args: True if other reference solutions
+    (code, func, is_class) all give it, False if there are none to ask or one gives
+    another answer (the problem accepts several), None if one gives the user's.
+    """
+    answers = set()
+    for code, func, is_class in alternates[:MAX_ALTERNATES]:
+        run = pool.run_batch(code, func, [copy.deepcopy(args)], is_class=is_class)[0]
+        if not _rejected(run):
+            answers.add(run["result"])
+    if got in answers:
+        return None
+    return answers == {expected}
+
+
+def differential_test(pool, user_code, user_func, ref_code, ref_func, types,
+                      ref_is_class=True, count=NUM_INPUTS, seed=0, user_language="python", alternates=()):
+    """
+    Generates inputs for `types`, runs both sides and shrinks the first disagreement.
+    A disagreement is only reported if it shows up again when re-run (the shrunk
+    input, else the original one), and it is only "verified" (a logic error, not
+    a different valid answer) if the `alternates` (other reference solutions as
+    (code, func, is_class)) agree with the reference on it. It is dropped if one
+    of them gives the user's answer.
+    Returns {"inputs", "valid",
+             "counterexample" (None or {"args", "expected", "got", "verified"}),
+             "records": [{"size", "user_steps", "ref_steps"}] for inputs both sides agree on}.
+    """
+    runner = DiffRunner(pool, user_code, user_func, ref_code, ref_func, ref_is_class, user_language)
+    compared = runner.compare(generate_inputs(types, count=count, seed=seed))
+
+    valid = [(a, u, r) for a, u, r in compared if not _rejected(r)]
+    failing = next((a for a, u, r in valid if u["result"] != r["result"]), None)
+    counterexample = None
+    if failing is not None:
+        minimal = runner.shrink(failing)
+        for args in ([minimal] if minimal is failing else [minimal, failing]):
+            _, u, r = runner.compare([args], chunks=1)[0]
+            if not _disagree(u, r):
+                continue
+            verified = _verified(pool, list(alternates), args, r["result"], u["result"])
+            if verified is not None:
+                counterexample = {"args": args, "expected": r["result"], "got": u["result"], "verified": verified}
+            break
+
+    return {
+        "inputs": len(compared),
+        "valid": len(valid),
+        "counterexample": counterexample,
+        "records": [{"size": input_size(a), "user_steps": u["steps"], "ref_steps": r["steps"]}
+                    for a, u, r in valid if u["result"] == r["result"]],
+    }
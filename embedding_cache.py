@@ -0,0 +1,151 @@
+from array import array
+import threading
+import tokenize
+import ast
+import hashlib
+import sqlite3
+import time
+import io
+import os
+import re
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.getenv("CODEALIGNER_EMBED_CACHE", "./.codealigner_cache/embeddings.sqlite3")
+MAX_ENTRIES = int(os.getenv("CODEALIGNER_EMBED_CACHE_SIZE", 50000))  # ~1.5KB per MiniLM vector
+
+_C_COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+_HASH_COMMENTS = re.compile(r"#[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+_SKIP_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+def normalize_code(code):
+    """
+    Canonical form used for the cache key: comments dropped, whitespace collapsed.
+    Python goes through tokenize (so '#' inside strings survives);
+    anything that doesn't parse as Python (C++/Java, broken code) gets a regex pass.
+    """
+    code = code or ""
+    try:
+        ast.parse(code)
+        parts = []
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in _SKIP_TOKENS:
+                continue
+            if tok.type == tokenize.NEWLINE:
+                parts.append(";")
+            elif tok.type == tokenize.INDENT:
+                parts.append("{")
+            elif tok.type == tokenize.DEDENT:
+                parts.append("}")
+            else:
+                parts.append(tok.string)
+        return " ".join(parts)
+    except (tokenize.TokenError, SyntaxError, ValueError):
+        code = _HASH_COMMENTS.sub("", _C_COMMENTS.sub("", code))
+        return _WHITESPACE.sub(" ", code).strip()
+
+
+class EmbeddingCache:
+    """
+    Persistent text -> vector cache in SQLite with LRU eviction.
+    encode() only calls the model for misses; hits/misses are counted.
+    """
+    def __init__(self, path=CACHE_PATH, model_name="", max_entries=MAX_ENTRIES):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def key(self, code):
+        payload = f"{self.model_name}\n{normalize_code(code)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def encode(self, encoder, texts):
+        """
+        Returns one vector (list of floats) per text.
+        `encoder(list_of_texts)` is only called with the texts that missed.
+        """
+        keys = [self.key(t) for t in texts]
+        found = self._get_many(set(keys))
+
+        missing = {}  # key -> first text with that key (duplicates in a batch are encoded once)
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+
+        with self._lock:
+            self.misses += sum(1 for k in keys if k not in found)
+            self.hits += sum(1 for k in keys if k in found)
+
+        if missing:
+            vectors = encoder(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            self._put_many(new)
+            found.update(new)
+
+        return [found[k] for k in keys]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": self._size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- STORAGE ---
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for k, blob in rows:
+                    found[k] = array("f", blob).tolist()
+            if found:
+                # Touch hits so LRU eviction keeps them
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used=? WHERE key=?",
+                                       [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def _put_many(self, vectors):
+        now = time.time()
+        rows = [(k, array("f", v).tobytes(), now) for k, v in vectors.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (overflow,)
+                )
+                self._size -= overflow
+            self._conn.commit()
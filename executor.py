@@ -0,0 +1,410 @@
+import multiprocessing
+import threading
+import tempfile
+import atexit
+import shutil
+import signal
+import queue
+import time
+import os
+
+try:
+    import resource  # POSIX only; limits are skipped where it is missing
+except ImportError:
+    resource = None
+
+from trace_log import TraceLog, TraceLimitExceeded, MAX_STEPS
+import backends
+import metrics
+
+# --- CONFIGURATION ---
+POOL_SIZE = int(os.getenv("CODEALIGNER_WORKERS", min(4, os.cpu_count() or 1)))
+JOBS_PER_WORKER = int(os.getenv("CODEALIGNER_JOBS_PER_WORKER", 50))  # recycle after this many jobs
+WALL_TIMEOUT = float(os.getenv("CODEALIGNER_WALL_TIMEOUT", 10))      # seconds per job, enforced by the parent
+CPU_SECONDS = int(os.getenv("CODEALIGNER_CPU_SECONDS", 10))           # per job, RLIMIT_CPU
+MEMORY_MB = int(os.getenv("CODEALIGNER_MEMORY_MB", 512))              # per job on top of the worker baseline, RLIMIT_AS
+CHECKOUT_TIMEOUT = float(os.getenv("CODEALIGNER_CHECKOUT_TIMEOUT", 300))  # max wait for a free worker
+SPAWN_RETRIES = 3  # attempts at starting a replacement worker before the pool shrinks
+
+
+class CpuLimitExceeded(TraceLimitExceeded):
+    """Raised in a worker when the job used up its CPU seconds (SIGXCPU)."""
+
+
+class PoolUnavailable(RuntimeError):
+    """No worker could be checked out: every worker is gone, or none freed up in time."""
+
+
+# --- WORKER PROCESS ---
+def _on_sigxcpu(signum, frame):
+    # Lift the soft limit so the kernel doesn't follow up with SIGKILL while we unwind
+    resource.setrlimit(resource.RLIMIT_CPU, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+    raise CpuLimitExceeded("CPU time limit exceeded")
+
+
+def _cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _apply_memory_limit(memory_mb):
+    """Caps the address space at the worker's current size + memory_mb (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return
+    limit = baseline + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, cpu_seconds, memory_mb, max_jobs, spill_dir):
+    # Pre-warm: everything a job needs is imported before the first job arrives
+    from tracer import CodeTracer
+
+    # Trace spill files go to the pool's folder, so a killed worker leaves nothing behind
+    tempfile.tempdir = spill_dir
+
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        _apply_memory_limit(memory_mb)
+
+    jobs = 0
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+
+        if resource is not None:
+            soft = int(_cpu_used() + cpu_seconds) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+
+        if "command" in job:  # a compiled submission (backends.py) runs as a child process
+            reply = backends.run_compiled(job["command"], job["batch"], job["max_steps"] or MAX_STEPS, job["budget"])
+            jobs += 1
+            reply["recycle"] = jobs >= max_jobs
+            conn.send(reply)
+            if reply["recycle"]:
+                return
+            continue
+
+        if "batch" in job:
+            reply = _run_batch(job, CodeTracer)
+            jobs += 1
+            reply["recycle"] = jobs >= max_jobs
+            conn.send(reply)
+            if reply["recycle"]:
+                return
+            continue
+
+        tracer = CodeTracer(mode=job["mode"])
+        started = time.perf_counter()
+        try:
+            result, log = tracer.run(job["code"], job["func"], job["args"], is_class=job["is_class"])
+        except CpuLimitExceeded as e:
+            result, log = f"Error: {e}", tracer.log.finish()
+        elapsed = time.perf_counter() - started
+        jobs += 1
+
+        reply = {
+            "result": result,
+            "steps": tracer.steps,
+            "coverage": dict(tracer.coverage),
+            "log": log.handoff(),
+            "seconds": elapsed,
+            "recycle": jobs >= max_jobs,
+        }
+        try:
+            conn.send(reply)
+        except Exception:
+            # Result object that can't be pickled: send its repr instead
+            reply["result"] = repr(result)
+            conn.send(reply)
+        if reply["recycle"]:
+            return
+
+
+def _run_batch(job, tracer_cls):
+    """
+    One call per argument tuple in job["batch"], all in this job's CPU budget.
+    Results come back as str() (what callers compare), so they always pickle.
+    """
+    started = time.perf_counter()
+    runs = []
+    for args in job["batch"]:
+        tracer = tracer_cls(mode=job["mode"], max_steps=job.get("max_steps") or MAX_STEPS)
+        call_started = time.perf_counter()
+        try:
+            result, log = tracer.run(job["code"], job["func"], args, is_class=job["is_class"])
+        except CpuLimitExceeded as e:
+            result, log = f"Error: {e}", tracer.log.finish()
+        log.close()
+        runs.append({"result": str(result), "steps": tracer.steps,
+                     "seconds": time.perf_counter() - call_started})
+        if isinstance(result, str) and result.startswith("Error: CPU time"):
+            break  # the rest of the batch has no budget left
+    runs += [{"result": "Error: CPU time limit exceeded", "steps": 0, "seconds": 0.0}] * (len(job["batch"]) - len(runs))
+    return {"runs": runs, "seconds": time.perf_counter() - started}
+
+
+# --- PARENT SIDE ---
+class _Worker:
+    def __init__(self, ctx, cpu_seconds, memory_mb, max_jobs, spill_dir):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main,
+                                   args=(child_conn, cpu_seconds, memory_mb, max_jobs, spill_dir),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ExecutionPool:
+    """
+    Pre-started worker processes that run CodeTracer jobs in isolation.
+
+    Each job runs under a CPU-seconds and address-space rlimit inside the worker
+    and a wall-clock timeout enforced here (a worker that overruns is killed and
+    replaced). Workers are recycled after max_jobs jobs. Thread-safe: concurrent
+    callers each check out their own worker.
+    """
+    def __init__(self, size=POOL_SIZE, max_jobs=JOBS_PER_WORKER, timeout=WALL_TIMEOUT,
+                 cpu_seconds=CPU_SECONDS, memory_mb=MEMORY_MB):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._ctx = multiprocessing.get_context("spawn")
+        self.spill_dir = tempfile.mkdtemp(prefix="codealigner-pool-")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = set()  # every live worker, idle or busy
+        self._spawn_error = None
+        self._starting = 0  # replacements being started in the background
+        self._closed = False
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        # A cold C++ precompiled header takes seconds: build it now, not on the first request
+        threading.Thread(target=backends.warm_up, daemon=True).start()
+
+    def _spawn(self):
+        worker = _Worker(self._ctx, self.cpu_seconds, self.memory_mb, self.max_jobs, self.spill_dir)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.kill()
+
+    def _release(self, worker):
+        """Back to the idle queue; a pool closed meanwhile stops it instead."""
+        if self._closed:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+    def _replace_later(self, worker):
+        """Retires a worker and starts its replacement off the request path (retrying a failed start)."""
+        def replace():
+            worker.kill()
+            try:
+                for attempt in range(SPAWN_RETRIES):
+                    if self._closed:
+                        return
+                    try:
+                        fresh = self._spawn()
+                    except Exception as e:  # fork/spawn failure: out of memory, process limit...
+                        self._spawn_error = e
+                        time.sleep(0.5 * 2 ** attempt)
+                        continue
+                    if self._closed:
+                        self._retire(fresh)
+                    else:
+                        self._idle.put(fresh)
+                    return
+                metrics.inc("executor.failures", kind="spawn")
+                print(f"   [executor] ⚠️ could not start a replacement worker ({self._spawn_error}); "
+                      f"{len(self._workers)} of {self.size} left")
+            finally:
+                with self._lock:
+                    self._starting -= 1
+
+        with self._lock:
+            self._starting += 1
+            self._workers.discard(worker)
+        threading.Thread(target=replace, daemon=True).start()
+
+    def _checkout(self):
+        """
+        An idle worker. Raises PoolUnavailable rather than waiting forever: at once
+        if no worker is left (after one more start attempt), or after CHECKOUT_TIMEOUT.
+        """
+        deadline = time.monotonic() + CHECKOUT_TIMEOUT
+        while True:
+            if self._closed:
+                raise RuntimeError("ExecutionPool is closed")
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                pass
+            if not self._workers and not self._starting:
+                try:
+                    return self._spawn()
+                except Exception as e:
+                    raise PoolUnavailable(f"No execution workers left and none can be started ({e})") from e
+            if time.monotonic() > deadline:
+                raise PoolUnavailable(f"No execution worker free after {CHECKOUT_TIMEOUT:g}s")
+
+    def run(self, code, func_name, args, is_class=False, mode="full", timeout=None, language="python"):
+        """
+        Runs one traced call in a worker. Returns a dict:
+        {"result", "log" (TraceLog), "steps", "coverage", "seconds"}.
+        Failures (timeouts, crashes, limits) come back as an "Error: ..." result.
+        Compiled languages (backends.py) are counted, not line-traced: their log
+        and coverage are empty and the result is its str().
+        """
+        if self._closed:
+            raise RuntimeError("ExecutionPool is closed")
+        if backends.normalize_language(language) != "python":
+            # "seconds" is the binary's own run time, not the (cached) build before it
+            run = self.run_batch(code, func_name, [args], is_class=is_class, timeout=timeout, language=language)[0]
+            return dict(run, log=TraceLog(), coverage={})
+        timeout = timeout or self.timeout
+        job = {"code": code, "func": func_name, "args": tuple(args), "is_class": is_class, "mode": mode}
+
+        with metrics.span("executor.run", mode=mode):
+            worker = self._checkout()
+            started = time.perf_counter()
+            try:
+                worker.conn.send(job)
+                if not worker.conn.poll(timeout):
+                    self._replace_later(worker)
+                    metrics.inc("executor.failures", kind="timeout")
+                    return _failure(f"Error: Time limit exceeded ({timeout:g}s)", started)
+                reply = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                # Worker died mid-job (hard memory/CPU kill, segfault...)
+                self._replace_later(worker)
+                metrics.inc("executor.failures", kind="crash")
+                return _failure(f"Error: Execution worker crashed ({str(e) or 'no reply'})", started)
+
+            if reply.pop("recycle"):
+                self._replace_later(worker)
+            else:
+                self._release(worker)
+            reply["log"] = TraceLog.adopt(reply["log"])
+            # Time inside CodeTracer.run in the worker (the rest of this span is queueing + IPC)
+            metrics.record_span("tracer.run", reply["seconds"], steps=reply["steps"])
+            if mode == "full":
+                metrics.observe("trace_records", len(reply["log"]))
+                metrics.observe("trace_bytes", reply["log"].bytes)
+            return reply
+
+    def run_batch(self, code, func_name, args_list, is_class=False, mode="count", timeout=None, max_steps=None,
+                  language="python"):
+        """
+        Runs func on every argument tuple in args_list inside ONE worker (one round trip).
+        Returns [{"result": str, "steps": int, "seconds": float}] in order; on a timeout or
+        crash every entry carries the error. The wall timeout applies to the whole batch,
+        max_steps (default: the tracer's) to each call.
+        For a compiled language the submission is built here first (cached, outside
+        the wall timeout) and the worker runs the binary; a build error comes back as
+        every entry's result.
+        """
+        if self._closed:
+            raise RuntimeError("ExecutionPool is closed")
+        timeout = timeout or self.timeout
+        language = backends.normalize_language(language)
+        if language == "python":
+            job = {"code": code, "func": func_name, "batch": [tuple(a) for a in args_list],
+                   "is_class": is_class, "mode": mode, "max_steps": max_steps}
+        else:
+            try:
+                command = backends.build(language, code, func_name)
+            except backends.BuildError as e:
+                metrics.inc("executor.failures", kind="build")
+                return [{"result": f"Error: {e}", "steps": 0, "seconds": 0.0} for _ in args_list]
+            # The worker stops the binary a little before the parent gives up on the worker
+            job = {"command": command, "batch": [tuple(a) for a in args_list], "max_steps": max_steps,
+                   "budget": max(0.5, timeout - 0.5)}
+
+        with metrics.span("executor.batch", calls=len(args_list), language=language):
+            worker = self._checkout()
+            try:
+                worker.conn.send(job)
+                if not worker.conn.poll(timeout):
+                    self._replace_later(worker)
+                    metrics.inc("executor.failures", kind="timeout")
+                    return [{"result": f"Error: Time limit exceeded ({timeout:g}s)", "steps": 0, "seconds": timeout} for _ in args_list]
+                reply = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._replace_later(worker)
+                metrics.inc("executor.failures", kind="crash")
+                return [{"result": f"Error: Execution worker crashed ({str(e) or 'no reply'})", "steps": 0, "seconds": 0.0} for _ in args_list]
+
+            if reply.pop("recycle"):
+                self._replace_later(worker)
+            else:
+                self._release(worker)
+            for run in reply["runs"]:
+                metrics.timing("tracer.run", run["seconds"])
+            return reply["runs"]
+
+    def close(self):
+        """Stops idle workers and kills busy ones (their callers get a crash error)."""
+        self._closed = True
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            busy = [w for w in self._workers if w not in idle]
+            self._workers.clear()
+        for worker in idle:
+            worker.stop()
+        for worker in busy:
+            worker.kill()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def _failure(message, started):
+    return {"result": message, "log": TraceLog(), "steps": 0, "coverage": {},
+            "seconds": time.perf_counter() - started}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide ExecutionPool singleton (workers start on first use)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExecutionPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,107 @@
+import re
+
+from llm_gateway import stream
+
+# --- CONFIGURATION ---
+SECTIONS = ("Diagnosis", "Action Plan", "Solution", "Complexity Analysis")  # headers the review prompt asks for
+
+_HEADER = re.compile(r"^#{2,4}\s*(?:\d+\.\s*)?(.+?)\s*$", re.M)
+
+
+def review_prompt(user_code, lang, issue_type, context, reference_code=None):
+    """Concise, Executive Summary Style Feedback"""
+    ref_instruction = ""
+    if reference_code:
+        ref_instruction = f"\nREFERENCE SOLUTION (Use this as ground truth):\n{reference_code}\n"
+
+    return f"""
+    You are a Principal Software Engineer conducting a code review.
+
+    USER CODE ({lang}):
+    {user_code}
+    {ref_instruction}
+
+    CONTEXT: {issue_type} | {context}
+
+    TASK: Provide a structured code review using the exact headers below.
+
+    ### 1. Diagnosis
+    [Brief explanation of the logic error or inefficiency if there is any. Otherwise, appreciate the code]
+
+    ### 2. Action Plan
+    [Concrete steps to fix or optimize if needed]
+
+    ### 3. Solution
+    ```{lang}
+    [The corrected code block]
+    ```
+
+    ### 4. Complexity Analysis
+    [Time & Space Big O with brief reasoning]
+
+    CONSTRAINT: Do not output 'undefined'. Keep it professional, structured, brief and direct. We can keep indepth analysis for later.
+    """
+
+
+def deep_dive_prompt(user_code, lang, issue_type, context):
+    """Detailed Academic Breakdown"""
+    return f"""
+    You are a Computer Science Professor.
+    USER CODE ({lang}):
+    {user_code}
+    CONTEXT: {issue_type} | {context}
+
+    TASK:
+    1. **Algorithmic Concept:** Explain the pattern used (e.g., Two Pointers, Sliding Window).
+    2. **Step-by-Step Diagnosis:** Walk through the execution trace to show exactly where it deviates.
+    3. **Complexity Theory:** Prove mathematically why the solution is O(n) vs O(n^2).
+    4. **Industry Standard:** How would this be written in a FAANG production environment?
+
+    FORMAT: Use clear headers and bullet points.
+    """
+
+
+def stream_feedback(prompt, api_key):
+    """Yields response chunks; an API failure becomes a final error chunk instead of an exception."""
+    try:
+        yield from stream(prompt, api_key)
+    except Exception as e:
+        yield f"\n\nAI Service Error: {str(e)}"
+
+
+def parse_sections(text):
+    """
+    Splits a (possibly still streaming) review into {section: body} for SECTIONS.
+    Text before the first known header goes under "", unknown headers stay inside
+    the section they appear in. A code fence left open by a partial chunk is closed
+    so the markdown renders while it streams.
+    """
+    head, _, last_line = text.rpartition("\n")
+    if head and last_line.lstrip().startswith("#"):
+        text = head  # header still arriving; don't render it as body text
+    sections = {"": ""}
+    current, start = "", 0
+    for match in _HEADER.finditer(text):
+        title = _section_for(match.group(1))
+        if title is None:
+            continue
+        sections[current] = sections.get(current, "") + text[start:match.start()]
+        current, start = title, match.end()
+    sections[current] = sections.get(current, "") + text[start:]
+    return {name: _close_fence(body.strip()) for name, body in sections.items()}
+
+
+def _section_for(header):
+    header = header.strip("*# ").lower()
+    if len(header) < 4:
+        return None
+    for title in SECTIONS:
+        if header.startswith(title.lower()) or title.lower().startswith(header):
+            return title
+    return None
+
+
+def _close_fence(body):
+    if body.count("```") % 2:
+        return body + "\n```"
+    return body
@@ -0,0 +1,78 @@
+from collections import Counter, defaultdict
+import math
+import re
+
+# --- CONFIGURATION ---
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # standard reciprocal-rank-fusion constant
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def code_tokens(code):
+    """
+    Identifier tokens for lexical matching: every identifier plus its
+    camelCase / snake_case pieces, lowercased ('maxProfit' -> maxprofit, max, profit).
+    """
+    tokens = []
+    for ident in _IDENTIFIER.findall(code or ""):
+        lower = ident.lower()
+        tokens.append(lower)
+        pieces = [p.lower() for part in ident.split("_") for p in _CAMEL.findall(part)]
+        if len(pieces) > 1:
+            tokens.extend(pieces)
+    return tokens
+
+
+class BM25Index:
+    """Plain in-memory BM25 over code_tokens(), built from {doc_id: text}."""
+    def __init__(self, docs):
+        self.doc_ids = []
+        self.doc_lens = []
+        self.postings = defaultdict(list)  # term -> [(doc_idx, tf)]
+
+        for doc_id, text in docs.items():
+            idx = len(self.doc_ids)
+            counts = Counter(code_tokens(text))
+            self.doc_ids.append(doc_id)
+            self.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((idx, tf))
+
+        n = len(self.doc_ids)
+        self.avg_len = (sum(self.doc_lens) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query, top_k=10):
+        """Returns [(doc_id, bm25_score)] best-first."""
+        scores = defaultdict(float)
+        for term, qtf in Counter(code_tokens(query)).items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for idx, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens[idx] / (self.avg_len or 1))
+                scores[idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return [(self.doc_ids[idx], score) for idx, score in best]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuses several best-first id lists. Returns [(doc_id, score)] best-first,
+    with score scaled to [0, 1] (1.0 = ranked first by every list).
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    ceiling = len(rankings) / (k + 1) if rankings else 1.0
+    return sorted(((d, s / ceiling) for d, s in fused.items()), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,331 @@
+import threading
+import hashlib
+import sqlite3
+import random
+import time
+import os
+import re
+
+import metrics
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:  # only the fake model is usable without the Google SDK
+    class ResourceExhausted(Exception):
+        pass
+
+# --- CONFIGURATION ---
+MODEL_NAME = 'gemini-2.0-flash'
+CACHE_PATH = os.getenv("CODEALIGNER_LLM_CACHE", "./.codealigner_cache/llm.sqlite3")
+TTL_SECONDS = float(os.getenv("CODEALIGNER_LLM_TTL", 7 * 24 * 3600))  # cached responses expire after this
+MAX_ENTRIES = int(os.getenv("CODEALIGNER_LLM_CACHE_SIZE", 5000))
+MAX_RETRIES = int(os.getenv("CODEALIGNER_LLM_RETRIES", 4))            # extra attempts on ResourceExhausted
+BACKOFF_SECONDS = 2.0   # first retry delay when the API doesn't suggest one (doubles per attempt)
+MAX_BACKOFF = 60.0
+USE_FAKE = os.getenv("CODEALIGNER_FAKE_LLM", "") == "1"  # offline runs / benchmarks
+
+_RETRY_DELAY = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)|retry in ([\d.]+)s", re.I)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    In-process stand-in for GenerativeModel.generate_content().
+    `handler(prompt) -> str` decides the reply (default: a fixed JSON/markdown stub);
+    `fail_times` raises ResourceExhausted that many times first. Calls are recorded.
+    With stream=True the reply comes back word by word, `delay` apart.
+    """
+    def __init__(self, handler=None, delay=0.0, fail_times=0):
+        self.handler = handler or _default_fake_reply
+        self.delay = delay
+        self.fail_times = fail_times
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls.append(prompt)
+            fail = self.fail_times > 0
+            if fail:
+                self.fail_times -= 1
+        if fail:
+            raise ResourceExhausted("429 Resource has been exhausted (fake). retry in 0.01s")
+        text = self.handler(prompt)
+        if stream:
+            return self._chunks(text)
+        if self.delay:
+            time.sleep(self.delay)
+        return FakeResponse(text)
+
+    def _chunks(self, text):
+        for word in re.findall(r"\S*\s*", text):
+            if word:
+                if self.delay:
+                    time.sleep(self.delay)
+                yield FakeResponse(word)
+
+
+def _default_fake_reply(prompt):
+    if "Return ONLY raw JSON" in prompt:
+        match = re.search(r"def\s+(\w+)\s*\(", prompt.split("USER CODE SNIPPET:", 1)[-1])
+        func = match.group(1) if match else "solve"
+        return ('{"language": "python", "user_function": "%s", '
+                '"predicted_slug": "unknown", "test_input": "()"}' % func)
+    return ("### 1. Diagnosis\nOffline review (fake model).\n\n### 2. Action Plan\nNone.\n\n"
+            "### 3. Solution\nNo changes.\n\n### 4. Complexity Analysis\nNot analysed offline.\n")
+
+
+def _google_model(api_key, model_name):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+class _Flight:
+    """One in-progress call that identical concurrent requests wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+class LLMGateway:
+    """
+    Every Gemini call goes through here:
+      - persistent prompt-hash -> response cache in SQLite (TTL + LRU eviction)
+      - single-flight: concurrent identical prompts share one API call
+      - retries with backoff on ResourceExhausted (honours the server's retry delay)
+    model_factory(api_key, model_name) returns anything with generate_content(prompt).text.
+    """
+    def __init__(self, path=CACHE_PATH, model_factory=None, ttl=TTL_SECONDS,
+                 max_entries=MAX_ENTRIES, max_retries=MAX_RETRIES):
+        if model_factory is None:
+            model_factory = (lambda key, name: FakeModel()) if USE_FAKE else _google_model
+        self.path = path
+        self.model_factory = model_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_retries = max_retries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._models = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_used ON responses(last_used)")
+
+    @staticmethod
+    def key(prompt, model_name):
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def generate(self, prompt, api_key, model_name=MODEL_NAME, use_cache=True):
+        """Response text for prompt. Raises whatever the model raised once retries are used up."""
+        with metrics.span("llm.generate", model=model_name) as attrs:
+            text = self._generate(prompt, api_key, model_name, use_cache, attrs)
+            attrs["chars"] = len(text or "")
+            return text
+
+    def _generate(self, prompt, api_key, model_name, use_cache, attrs):
+        key = self.key(prompt, model_name)
+        if use_cache:
+            cached = self._get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                attrs["cache"] = "hit"
+                metrics.inc("llm.requests", cache="hit")
+                return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        attrs["cache"] = "miss" if leader else "coalesced"
+        metrics.inc("llm.requests", cache=attrs["cache"])
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.text
+
+        try:
+            flight.text = self._call_with_retries(prompt, api_key, model_name)
+            if use_cache and flight.text:
+                self._put(key, flight.text)
+            return flight.text
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _model(self, api_key, model_name):
+        with self._lock:
+            model = self._models.get((api_key, model_name))
+            if model is None:
+                model = self._models[(api_key, model_name)] = self.model_factory(api_key, model_name)
+            return model
+
+    def stream(self, prompt, api_key, model_name=MODEL_NAME, use_cache=True):
+        """
+        Yields the response text in chunks as the model generates it.
+        A cache hit comes back as one chunk. The full text is only cached when
+        the caller reads the stream to the end, so closing the generator early
+        (cancelling) leaves nothing half-written. Streams are not coalesced.
+        Timed by hand (llm.stream, llm.first_chunk): a span can't stay open
+        across the yields of a generator the caller may abandon.
+        """
+        key = self.key(prompt, model_name)
+        if use_cache:
+            cached = self._get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                metrics.inc("llm.requests", cache="hit")
+                yield cached
+                return
+        with self._lock:
+            self.misses += 1
+        metrics.inc("llm.requests", cache="miss")
+        started = time.perf_counter()
+
+        model = self._model(api_key, model_name)
+        # Rate-limit errors surface when the stream is opened, so only that step is retried
+        response = self._with_retries(lambda: model.generate_content(prompt, stream=True))
+        parts = []
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:  # chunk without text (e.g. safety-filtered)
+                continue
+            if not parts:
+                metrics.timing("llm.first_chunk", time.perf_counter() - started)
+            parts.append(text)
+            yield text
+        metrics.record_span("llm.stream", time.perf_counter() - started, model=model_name, chunks=len(parts))
+        if use_cache and parts:
+            self._put(key, "".join(parts))
+
+    def _call_with_retries(self, prompt, api_key, model_name):
+        model = self._model(api_key, model_name)
+        return self._with_retries(lambda: model.generate_content(prompt).text)
+
+    def _with_retries(self, call):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except ResourceExhausted as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _suggested_delay(e)
+                if delay is None:
+                    delay = min(MAX_BACKOFF, BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.8, 1.2)
+                with self._lock:
+                    self.retries += 1
+                metrics.inc("llm.retries")
+                print(f"   [llm] ⏳ Rate limited, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- STORAGE ---
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_used=? WHERE key=?", (now, key))
+            self._conn.commit()
+        return row[0]
+
+    def _put(self, key, text):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, text, now, now))
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            overflow = size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)", (overflow,)
+                )
+            self._conn.commit()
+
+
+def _suggested_delay(error):
+    match = _RETRY_DELAY.search(str(error))
+    if not match:
+        return None
+    return min(MAX_BACKOFF, float(match.group(1) or match.group(2)))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Process-wide LLMGateway singleton."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+                metrics.get_registry().register_collector("llm_cache", _gateway.stats)
+    return _gateway
+
+
+def set_gateway(gateway):
+    """Replaces the process-wide gateway (offline benchmarks: a FakeModel factory). Returns the old one."""
+    global _gateway
+    with _gateway_lock:
+        previous, _gateway = _gateway, gateway
+    if gateway is not None:
+        metrics.get_registry().register_collector("llm_cache", gateway.stats)
+    return previous
+
+
+def generate(prompt, api_key, model_name=MODEL_NAME, use_cache=True):
+    return get_gateway().generate(prompt, api_key, model_name=model_name, use_cache=use_cache)
+
+
+def stream(prompt, api_key, model_name=MODEL_NAME, use_cache=True):
+    return get_gateway().stream(prompt, api_key, model_name=model_name, use_cache=use_cache)
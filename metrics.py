@@ -0,0 +1,295 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import contextmanager
+from collections import deque
+import contextvars
+import itertools
+import threading
+import bisect
+import json
+import time
+import os
+
+# --- CONFIGURATION ---
+METRICS_FILE = os.getenv("CODEALIGNER_METRICS_FILE")            # JSONL: one line per finished request, spans included
+METRICS_PORT = int(os.getenv("CODEALIGNER_METRICS_PORT", 0))     # > 0: serve Prometheus text on this port
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+SIZE_BUCKETS = tuple(4 ** i for i in range(1, 14))               # 4 .. 67M (records, bytes)
+RESERVOIR = 2048   # most recent samples kept per histogram for p50/p95/p99
+MAX_SPANS = 5000   # spans kept per request (later ones are only counted)
+
+_request = contextvars.ContextVar("codealigner_request", default=None)
+_parent = contextvars.ContextVar("codealigner_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Histogram:
+    """Cumulative bucket counts (for Prometheus) plus a window of recent samples (for quantiles)."""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RESERVOIR)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Registry:
+    """
+    Process-wide metrics: counters, histograms keyed by (family, labels), and
+    collectors (callables returning {stat: number}) read at export time, so
+    components that already keep stats (LLM / embedding caches) aren't double counted.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+
+    def inc(self, family, n=1, **labels):
+        key = (family, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, family, value, buckets=TIME_BUCKETS, **labels):
+        key = (family, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def register_collector(self, name, fn):
+        with self._lock:
+            self.collectors[name] = fn
+
+    def summary(self):
+        """[{"metric", "count", "mean", "p50", "p95", "p99"}] per histogram: spans slowest p95 first, then sizes."""
+        with self._lock:
+            items = [(family, labels, h, [h.quantile(q) for q in (0.5, 0.95, 0.99)])
+                     for (family, labels), h in self.histograms.items()]
+        rows = [{"metric": family + "".join(f" {k}={v}" for k, v in labels), "count": h.count,
+                 "mean": h.sum / h.count if h.count else 0.0, "p50": p50, "p95": p95, "p99": p99}
+                for family, labels, h, (p50, p95, p99) in items]
+        return sorted(rows, key=lambda r: (not r["metric"].startswith("span_seconds"), -(r["p95"] or 0)))
+
+    def collected(self):
+        with self._lock:
+            collectors = dict(self.collectors)
+        stats = {}
+        for name, fn in collectors.items():
+            try:
+                stats[name] = fn()
+            except Exception as e:  # a closed store etc.: skip, never break an export
+                stats[name] = {"error": str(e)}
+        return stats
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items(), key=lambda kv: repr(kv[0]))
+            histograms = sorted(self.histograms.items(), key=lambda kv: repr(kv[0]))
+            snapshot = [(key, h.buckets, list(h.counts), h.count, h.sum) for key, h in histograms]
+        typed = set()
+        for (family, labels), value in counters:
+            name = _prom_name(family) + "_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_prom_labels(labels)} {value}")
+        for (family, labels), buckets, counts, count, total in snapshot:
+            name = _prom_name(family)
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, n in zip(buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_prom_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_prom_labels(labels)} {total}")
+            lines.append(f"{name}_count{_prom_labels(labels)} {count}")
+        for collector, stats in sorted(self.collected().items()):
+            for stat, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = _prom_name(f"{collector}.{stat}")
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _prom_name(family):
+    return "codealigner_" + "".join(c if c.isalnum() else "_" for c in family)
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        text = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+_registry = Registry()
+
+
+def get_registry():
+    return _registry
+
+
+def inc(family, n=1, **labels):
+    _registry.inc(family, n, **labels)
+
+
+def observe(family, value, buckets=SIZE_BUCKETS, **labels):
+    """Non-time distributions (trace sizes, batch sizes...)."""
+    _registry.observe(family, value, buckets=buckets, **labels)
+
+
+def timing(name, seconds):
+    """Span duration measured elsewhere, histogram only (e.g. each call of a worker batch)."""
+    _registry.observe("span_seconds", seconds, span=name)
+
+
+# --- REQUESTS AND SPANS ---
+class Request:
+    """Spans of one unit of work (an analysis, a graded submission), for the waterfall."""
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self.seconds = None
+
+    def add(self, record):
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(record)  # list.append is atomic: phases on other threads add here too
+        else:
+            self.dropped += 1
+
+    def as_dict(self):
+        return {"request": self.name, "attrs": self.attrs, "time": self.wall, "seconds": self.seconds,
+                "spans": sorted(self.spans, key=lambda s: s["start"]), "dropped": self.dropped}
+
+
+@contextmanager
+def request(name, **attrs):
+    """
+    Collects every span opened inside (this thread and threads started via bind())
+    under one Request; appended to METRICS_FILE when it ends.
+    """
+    req = Request(name, attrs)
+    token = _request.set(req)
+    try:
+        with span(name, **attrs):
+            yield req
+    finally:
+        _request.reset(token)
+        req.seconds = time.perf_counter() - req.started
+        if METRICS_FILE:
+            _append_jsonl(METRICS_FILE, req.as_dict())
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times the block into span_seconds{span=name} and, inside a request, adds
+    {"id", "parent", "name", "start" (s from request start), "seconds", "attrs"}
+    to its waterfall. Yields the attrs dict so the block can add to it.
+    """
+    req = _request.get()
+    span_id = next(_span_ids)
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _parent.reset(token)
+        _registry.observe("span_seconds", seconds, span=name)
+        if req is not None:
+            req.add({"id": span_id, "parent": _parent.get(), "name": name,
+                     "start": started - req.started, "seconds": seconds, "attrs": attrs})
+
+
+def record_span(name, seconds, **attrs):
+    """A span that just ended but was timed elsewhere (another process); attached to the current span."""
+    _registry.observe("span_seconds", seconds, span=name)
+    req = _request.get()
+    if req is not None:
+        req.add({"id": next(_span_ids), "parent": _parent.get(), "name": name,
+                 "start": time.perf_counter() - req.started - seconds, "seconds": seconds, "attrs": attrs})
+
+
+def bind(fn):
+    """
+    fn wrapped to run in a copy of the caller's context, so spans opened on a
+    thread-pool thread still land in the caller's request (one copy per call:
+    a Context can't be entered by two threads at once).
+    """
+    context = contextvars.copy_context()
+
+    def bound(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+
+# --- EXPORT ---
+_file_lock = threading.Lock()
+
+
+def _append_jsonl(path, record):
+    line = json.dumps(record, default=str) + "\n"
+    with _file_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = _registry.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the console
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=METRICS_PORT, host="127.0.0.1"):
+    """Starts (once per process) a background HTTP server exposing /metrics. Returns it, or None if port is 0."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-http").start()
+            print(f"   [metrics] 📈 Prometheus endpoint on http://{host}:{port}/metrics")
+    return _server
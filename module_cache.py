@@ -0,0 +1,177 @@
+"""
+Compiled-code and loaded-module caches for repeated executions of the same solution.
+
+difftest, complexity profiling and reference checks call the same code hundreds
+of times with different arguments. Instead of compiling and exec'ing the source
+for every call, the code object is cached by source (str / bytes objects cache
+their hash, so a repeated lookup doesn't rehash the text) and the module body
+runs once; each run then only restores the module's bindings and instantiates
+Solution. A module that holds mutable state (a module-level memo dict, a
+mutable default argument, an lru_cache...) can't be reset without copying it,
+so it is re-executed from the cached code object instead.
+Caches are per process (each pool worker has its own) and not thread-safe.
+"""
+from collections import OrderedDict
+from operator import attrgetter, is_not
+from typing import List
+import marshal
+import types
+
+# --- CONFIGURATION ---
+SOURCE_NAME = "<solution>"  # filename solutions are compiled under (the tracer ignores other frames)
+MAX_CODE_OBJECTS = 256      # compiled code objects kept per process
+MAX_MODULES = 32            # loaded modules kept per process (they hold the solution's globals)
+
+_IMMUTABLE = {int, float, bool, str, bytes, complex, range, type(None), type(Ellipsis), type(NotImplemented)}
+_HEAPTYPE = 1 << 9  # Py_TPFLAGS_HEAPTYPE: classes created by a class statement
+_CLASS_INTERNALS = {"__dict__", "__weakref__", "__module__", "__doc__", "__qualname__"}
+# Definition metadata: mutable containers nobody mutates at run time
+_DEFINITIONS = {"__builtins__", "__annotations__", "__dataclass_fields__", "__dataclass_params__"}
+
+_function_attrs = attrgetter("__dict__")
+_code_objects = OrderedDict()
+_modules = OrderedDict()
+_stats = {"compiled": 0, "code_hits": 0, "loaded": 0, "module_hits": 0, "reexecs": 0}
+
+
+def _lru_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache, key, value, limit):
+    cache[key] = value
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def compile_cached(code):
+    """Code object for source text (compiled under SOURCE_NAME) or marshalled bytecode; raises SyntaxError."""
+    code_obj = _lru_get(_code_objects, code)
+    if code_obj is not None:
+        _stats["code_hits"] += 1
+        return code_obj
+    code_obj = marshal.loads(code) if isinstance(code, bytes) else compile(code, SOURCE_NAME, "exec")
+    _stats["compiled"] += 1
+    _lru_put(_code_objects, code, code_obj, MAX_CODE_OBJECTS)
+    return code_obj
+
+
+def _user_class(value):
+    # Classes defined by the solution run under exec() with no __name__, so they land in "builtins"
+    return isinstance(value, type) and value.__flags__ & _HEAPTYPE and value.__module__ == "builtins"
+
+
+def _stateless(value, classes, functions, seen):
+    """
+    True if value can't carry state from one run to the next except by rebinding
+    (collected into classes / functions so those bindings can be restored).
+    """
+    if id(value) in seen:
+        return True
+    seen.add(id(value))
+    t = type(value)
+    if t in _IMMUTABLE or isinstance(value, (types.ModuleType, types.BuiltinFunctionType,
+                                             types.MemberDescriptorType, types.GetSetDescriptorType)):
+        return True
+    if t in (tuple, frozenset):
+        return all(_stateless(v, classes, functions, seen) for v in value)
+    if t in (staticmethod, classmethod):
+        return _stateless(value.__func__, classes, functions, seen)
+    if t is property:
+        return all(_stateless(f, classes, functions, seen) for f in (value.fget, value.fset, value.fdel) if f)
+    if t is types.FunctionType:
+        if value.__code__.co_filename != SOURCE_NAME:
+            return True  # library function
+        if value.__dict__:
+            return False  # attributes set on the function (counters, caches)
+        functions.append(value)
+        cells = [_cell_value(c) for c in value.__closure__ or ()]
+        return all(_stateless(v, classes, functions, seen)
+                   for v in (*(value.__defaults__ or ()), *(value.__kwdefaults__ or {}).values(), *cells))
+    if isinstance(value, type):
+        if not _user_class(value):
+            return True  # builtin / library class
+        classes.append((value, dict(vars(value))))
+        return all(_stateless(v, classes, functions, seen)
+                   for k, v in vars(value).items() if k not in _CLASS_INTERNALS and k not in _DEFINITIONS)
+    # typing aliases (List, Optional[int]...) are definitions, not state
+    return t.__module__ == "typing"
+
+
+def _cell_value(cell):
+    try:
+        return cell.cell_contents
+    except ValueError:  # not assigned yet
+        return None
+
+
+class LoadedModule:
+    """
+    A solution's module, executed once and invoked many times. Call entry() at
+    the start of every run: it puts the module back in its just-loaded state and
+    returns the callable (a bound method of a fresh Solution() when is_class).
+    """
+    def __init__(self, code_obj):
+        self.code_obj = code_obj
+        self.globals = self._execute()
+        self._classes, self._functions = [], []
+        seen = set()
+        self.reusable = all(_stateless(v, self._classes, self._functions, seen)
+                            for k, v in self.globals.items() if k not in _DEFINITIONS)
+        self._bindings = dict(self.globals)
+        self._fresh = True
+
+    def _execute(self):
+        sandbox = {"List": List}
+        exec(self.code_obj, sandbox)
+        return sandbox
+
+    def reset(self):
+        if self._fresh:
+            self._fresh = False
+            return
+        if not self.reusable:
+            self.globals = self._execute()
+            _stats["reexecs"] += 1
+            return
+        # Rebinding is the only way state survives a run here: restore every binding
+        self.globals.clear()
+        self.globals.update(self._bindings)
+        for cls, attrs in self._classes:
+            current = vars(cls)
+            # By identity: == on values the run bound could run user code (or raise)
+            if len(current) != len(attrs) or any(map(is_not, map(current.get, attrs), attrs.values())):
+                for k in [k for k in current if k not in attrs]:
+                    delattr(cls, k)
+                for k, v in attrs.items():
+                    if k not in _CLASS_INTERNALS and current.get(k) is not v:
+                        setattr(cls, k, v)
+        if any(map(_function_attrs, self._functions)):
+            for fn in self._functions:
+                fn.__dict__.clear()
+
+    def entry(self, func_name, is_class=False):
+        """Resets the module and resolves the entry point (KeyError / AttributeError if it's missing)."""
+        self.reset()
+        if is_class:
+            return getattr(self.globals['Solution'](), func_name)
+        return self.globals[func_name]
+
+
+def load_module(code):
+    """LoadedModule for source text or marshalled bytecode, cached by source. Raises what the module body raises."""
+    module = _lru_get(_modules, code)
+    if module is not None:
+        _stats["module_hits"] += 1
+        return module
+    module = LoadedModule(compile_cached(code))
+    _stats["loaded"] += 1
+    _lru_put(_modules, code, module, MAX_MODULES)
+    return module
+
+
+def stats():
+    return dict(_stats, code_objects=len(_code_objects), modules=len(_modules))
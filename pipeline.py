@@ -0,0 +1,446 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+
+from inspector import inspect_code_snippet, inspect_statically
+from signature import analyze_signature, signature_from_metadata
+from difftest import parse_args, infer_types, differential_test
+from executor import PoolUnavailable
+import complexity
+import alignment
+import approach
+import backends
+import metrics
+
+# --- CONFIGURATION ---
+MAX_PARALLEL_PHASES = 4
+EXACT_MATCH = 0.9  # confidence above which a reference counts as the same problem
+GROWTH_CONFIDENCE = 0.3  # a reference's measured complexity below this confidence counts as unknown
+PHASE_NAMES = ("inspect", "vector_search", "user_trace", "reference", "family", "golden_artifacts",
+               "reference_check", "difftest", "complexity", "alignment", "golden_trace")
+
+
+class PhaseSkipped(Exception):
+    """Recorded for a phase that never ran because one of its deps failed."""
+
+
+class Phase:
+    """
+    One node of the analysis DAG: fn(results) runs once every dep has finished.
+    Optional deps are waited for too, but a failed one is just missing from results.
+    """
+    def __init__(self, name, fn, deps=(), optional=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.optional = tuple(optional)
+
+
+def run_phases(phases, max_workers=MAX_PARALLEL_PHASES, on_done=None):
+    """
+    Runs a DAG of Phases on a thread pool, starting each phase as soon as its
+    deps are done. fn receives the dict of results so far.
+    on_done(name, seconds) is called from the CALLING thread (safe for Streamlit).
+    Returns (results, timings, errors); phases whose (non-optional) deps failed are skipped.
+    Each phase is a "phase.<name>" span of the caller's metrics request.
+    """
+    pending = {p.name: p for p in phases}
+    results, timings, errors = {}, {}, {}
+    running = {}
+
+    def timed(phase):
+        start = time.perf_counter()
+        try:
+            with metrics.span(f"phase.{phase.name}"):
+                return phase.fn(results)
+        finally:
+            timings[phase.name] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, phase in list(pending.items()):
+                if any(d in errors for d in phase.deps):
+                    errors[name] = PhaseSkipped(f"{name}: dependency failed")
+                    del pending[name]
+                elif all(d in results for d in phase.deps) and \
+                        all(d in results or d in errors for d in phase.optional):
+                    running[pool.submit(metrics.bind(timed), phase)] = name
+                    del pending[name]
+
+            if not running:
+                break  # remaining phases depend on something that never ran
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+                if on_done:
+                    on_done(name, timings.get(name, 0.0))
+
+    return results, timings, errors
+
+
+# --- ANALYSIS DAG ---
+def analysis_phases(user_code, problem_desc, api_key, engine, pool, use_llm=True, slug=None, skip=()):
+    """
+    inspect ──────┬─ user_trace ────────────────────────────────────────┐
+                  ├─ reference ─ family ─ golden_artifacts ─┬─ difftest ─┴─ alignment
+    vector_search ┘                                         ├─ reference_check ─ golden_trace
+                                                            └─ complexity
+    vector_search starts on the raw code while the inspector LLM call is in
+    flight; reference uses it only without a slug index hit, so a failed search
+    doesn't stop a known slug from being judged. When the problem has several stored solutions, family picks the
+    one with the best measured complexity to judge against and the one whose
+    approach (approach.py) is closest to the user's to align with.
+    With precomputed reference runs (artifacts.py) the user code is
+    checked against them; otherwise the golden trace runs on the inspector's
+    input. difftest runs both sides on generated inputs (difftest.py);
+    complexity profiles both on growing input sizes (complexity.py); alignment
+    diffs both full traces on one input (alignment.py). C++ / Java submissions
+    run through backends.py against the Python reference; alignment needs line
+    traces, so it is Python-only.
+    Without use_llm the inspector is replaced by static parsing (slug: a known
+    problem slug, if any); phases named in skip return None.
+    """
+    def inspect(r):
+        if not use_llm:
+            return inspect_statically(user_code, slug)
+        meta = inspect_code_snippet(user_code, problem_desc, api_key)
+        if not meta:
+            raise RuntimeError("Analysis failed. Please check input.")
+        return meta
+
+    def vector_search(r):
+        candidates = engine.find_solutions([user_code], top_k=1)[0]
+        return candidates[0] if candidates else None
+
+    def language(r):
+        return backends.normalize_language(r["inspect"].get('language', 'unknown'))
+
+    def is_python(r):
+        return language(r) == 'python'
+
+    def executable(r):
+        return backends.is_executable(language(r))
+
+    def user_signature(r):
+        if is_python(r):
+            return analyze_signature(user_code)
+        return backends.signature(language(r), user_code, r["inspect"].get('user_function'))
+
+    def user_trace(r):
+        if not executable(r):
+            return None
+        meta = r["inspect"]
+        if meta.get('test_input', '()') is None:
+            return None  # static inspection: no test input to run
+        real_args = parse_args(meta.get('test_input', '()'))
+        run = pool.run(user_code, meta.get('user_function', 'unknown'), real_args, is_class=False,
+                       language=language(r))
+        run["args"] = real_args
+        return run
+
+    def reference(r):
+        slug = r["inspect"].get('predicted_slug')
+        if slug:
+            doc_id, entry = engine.slug_index.lookup(slug)
+            if doc_id is not None:
+                return {"id": doc_id, "name": entry['name'], "code": entry['document'],
+                        "metadata": entry.get('metadata', {}), "confidence": 1.0, "source": "slug"}
+        return r.get("vector_search")  # None if the search failed too
+
+    def family(r):
+        ref = r["reference"]
+        if not ref or ref['confidence'] <= EXACT_MATCH:
+            return None
+        members = engine.slug_index.solutions(ref['name'])
+        if len(members) < 2:
+            return None
+        user = approach.classify(user_code, language(r))
+        growth = engine.artifacts.growth(doc_id for doc_id, _ in members)
+        candidates = []
+        for doc_id, entry in members:
+            meta = entry.get('metadata', {})
+            # Rows indexed before approach tagging are classified here
+            tagged = meta if meta.get('approach') else approach.classify(entry['document'])
+            measured = growth.get(doc_id)
+            candidates.append({"id": doc_id, "name": entry['name'], "code": entry['document'], "metadata": meta,
+                               "confidence": ref['confidence'], "source": "family",
+                               "approach": tagged['approach'], "tags": tagged['tags'],
+                               "order": measured["order"] if measured and
+                               measured["confidence"] >= GROWTH_CONFIDENCE else None})
+        # Primary solution first in members: it wins ties on both sides
+        optimal = min(candidates, key=lambda c: complexity.RANK.get(c["order"], len(complexity.CURVES)))
+        nearest = min(candidates, key=lambda c: (approach.family_distance(user, c), c is not optimal))
+        judged = f"{optimal['approach']} ({optimal['order'] or 'unmeasured'})"
+        text = f"{len(candidates)} reference solutions; yours looks like {user['approach']}, judged against {judged}"
+        if nearest is not optimal:
+            text += f", traced against the closest one: {nearest['approach']}"
+        return {"user": user, "optimal": optimal, "nearest": nearest, "candidates": candidates,
+                "size": len(candidates), "summary": text}
+
+    def artifacts_for(ref):
+        # Precomputed by build_db.py; parsed locally for rows indexed before that
+        store = engine.artifacts
+        sig = (store.signature(ref['id']) or signature_from_metadata(ref.get('metadata'))
+               or analyze_signature(ref['code']))
+        if not sig:
+            return None
+        return {"id": ref['id'], "code": ref['code'], "signature": sig, "bytecode": store.bytecode(ref['id']),
+                "runs": store.reference_runs(ref['id'])}
+
+    def golden_artifacts(r):
+        ref = r["family"]["optimal"] if r["family"] else r["reference"]
+        if not ref or ref['confidence'] <= EXACT_MATCH or not executable(r):
+            return None
+        return artifacts_for(ref)
+
+    def comparable(r):
+        """The reference's artefacts if user and reference take the same parameters, else None."""
+        art = r["golden_artifacts"]
+        if not art:
+            return None
+        user_sig = user_signature(r)
+        if not user_sig or user_sig["arity"] != art["signature"]["arity"]:
+            return None  # different parameter list: the reference's inputs don't apply
+        return art
+
+    def reference_check(r):
+        art = comparable(r)
+        if not art or not art["runs"]:
+            return None
+        func = r["inspect"].get('user_function', 'unknown')
+
+        def check(run):
+            args, expected, ref_steps = run
+            got = pool.run(user_code, func, args, is_class=False, mode="count", language=language(r))
+            return {"args": args, "expected": expected, "got": str(got["result"]),
+                    "ref_steps": ref_steps, "user_steps": got["steps"]}
+
+        with ThreadPoolExecutor(max_workers=len(art["runs"])) as checks:
+            return list(checks.map(metrics.bind(check), art["runs"]))
+
+    def difftest(r):
+        art = comparable(r)
+        if not art:
+            return None
+        sig = art["signature"]
+        try:
+            example = art["runs"][0][0] if art["runs"] else parse_args(r["inspect"].get('test_input', '()'))
+        except ValueError:
+            example = None
+        types = infer_types(sig, example)
+        if types is None:
+            return None  # an argument type we can't generate (trees, linked lists...)
+        # The problem's other solutions tell a wrong answer from another valid one
+        alternates = []
+        for other in (r["family"] or {}).get("candidates", ()):
+            alt = artifacts_for(other) if other["id"] != art["id"] else None
+            if alt and alt["signature"]["arity"] == sig["arity"]:
+                alternates.append((alt["bytecode"] or alt["code"], alt["signature"]["entry_point"],
+                                   alt["signature"]["class"] is not None))
+        return differential_test(pool, user_code, r["inspect"].get('user_function', 'unknown'),
+                                 art["bytecode"] or art["code"], sig["entry_point"], types,
+                                 ref_is_class=sig["class"] is not None, user_language=language(r),
+                                 alternates=alternates)
+
+    def scaling(r):
+        art = r["golden_artifacts"]
+        user_sig = user_signature(r) if executable(r) else None
+        if not user_sig:
+            return None
+        func = r["inspect"].get('user_function', 'unknown')
+        if any(m["name"] == func for m in user_sig["methods"]):
+            user_sig = dict(user_sig, entry_point=func)
+        try:
+            example = art["runs"][0][0] if art and art["runs"] else parse_args(r["inspect"].get('test_input', '()'))
+        except ValueError:
+            example = None
+
+        ref_art = comparable(r)
+        # Same argument types on both sides when there is a comparable reference
+        types = infer_types(ref_art["signature"], example) if ref_art else None
+        types = types or infer_types(user_sig, example)
+        if types is None:
+            return None
+
+        jobs = {"user": (user_code, func, False, language(r))}
+        if ref_art:
+            sig = ref_art["signature"]
+            jobs["reference"] = (ref_art["bytecode"] or ref_art["code"], sig["entry_point"],
+                                 sig["class"] is not None, "python")
+        with ThreadPoolExecutor(max_workers=len(jobs)) as profiles:
+            futures = {side: profiles.submit(metrics.bind(complexity.profile), pool, code, fn, types,
+                                             is_class=is_class, language=lang)
+                       for side, (code, fn, is_class, lang) in jobs.items()}
+            result = {side: f.result() for side, f in futures.items()}
+        result.setdefault("reference", None)
+        result["summary"] = complexity.summary(result["user"], result["reference"])
+        return result
+
+    def align(r):
+        art = comparable(r)
+        user_run = r["user_trace"]
+        # The shrunk counterexample makes short traces that diverge where it matters
+        ce = r["difftest"] and r["difftest"]["counterexample"]
+        if not art or not is_python(r) or not (ce or user_run):
+            return None
+        fam = r["family"]
+        if fam and fam["nearest"] is not fam["optimal"]:
+            # Same problem and inputs, but traced like the user's approach: the divergence is about the bug
+            nearest = artifacts_for(fam["nearest"])
+            if nearest and nearest["signature"]["arity"] == art["signature"]["arity"]:
+                art = nearest
+        sig = art["signature"]
+        if ce:
+            args = ce["args"]
+            user_run = pool.run(user_code, r["inspect"].get('user_function', 'unknown'), args, is_class=False)
+        else:
+            args = user_run["args"]
+        ref_run = pool.run(art["bytecode"] or art["code"], sig["entry_point"], args,
+                           is_class=sig["class"] is not None)
+        try:
+            report = alignment.align(user_run["log"], user_code, ref_run["log"], art["code"])
+        finally:
+            ref_run["log"].close()
+            if ce:
+                user_run["log"].close()
+        report["args"] = args
+        report["reference_id"] = art["id"]
+        report["summary"] = alignment.summary(report)
+        return report
+
+    def golden_trace(r):
+        art = r["golden_artifacts"]
+        if not art or r["reference_check"] or r["inspect"].get('test_input', '()') is None:
+            return None  # no reference, already judged against cached runs, or no input to run
+        sig = art["signature"]
+        real_args = parse_args(r["inspect"].get('test_input', '()'))
+        # Only the step count of the reference is needed
+        return pool.run(art["bytecode"] or art["code"], sig["entry_point"], real_args,
+                        is_class=sig["class"] is not None, mode="count")
+
+    phases = [
+        Phase("inspect", inspect),
+        Phase("vector_search", vector_search),
+        Phase("user_trace", user_trace, deps=["inspect"]),
+        Phase("reference", reference, deps=["inspect"], optional=["vector_search"]),
+        Phase("family", family, deps=["inspect", "reference"]),
+        Phase("golden_artifacts", golden_artifacts, deps=["family"]),
+        Phase("reference_check", reference_check, deps=["inspect", "golden_artifacts"]),
+        Phase("difftest", difftest, deps=["inspect", "golden_artifacts"]),
+        Phase("complexity", scaling, deps=["inspect", "golden_artifacts"]),
+        Phase("alignment", align, deps=["user_trace", "difftest"]),
+        Phase("golden_trace", golden_trace, deps=["inspect", "reference_check"]),
+    ]
+    for phase in phases:
+        if phase.name in skip:
+            phase.fn = lambda r: None
+    return phases
+
+
+def judge(user_run, golden_run, checks=None, diff=None, scaling=None, same_units=True):
+    """
+    Verdict: (fb_type, fb_msg). A failing canonical input or a verified (shrunk)
+    generated counterexample is a logic error. An unverified one (the problem may
+    accept several answers) never overrides passing canonical checks; without
+    them it asks for review. Speed: a worse measured growth class than the
+    reference first, then step totals on the canonical-input checks, the generated
+    inputs, and finally the inspector's test input. Step totals are only compared
+    when both sides count the same thing (same_units: both Python).
+    """
+    for c in checks or []:
+        if c["got"] != c["expected"]:
+            return "LOGIC ERROR", f"On input {c['args']}: Expected {c['expected']}, Got {c['got']}"
+    if diff and diff["counterexample"]:
+        ce = diff["counterexample"]
+        if ce["verified"]:
+            return "LOGIC ERROR", f"Counterexample {ce['args']}: Expected {ce['expected']}, Got {ce['got']}"
+        if not checks:
+            return "REVIEW", (f"Unverified counterexample {ce['args']}: reference gives {ce['expected']}, "
+                              f"yours {ce['got']} (may be another valid answer)")
+    if scaling and complexity.is_slower(scaling["user"], scaling["reference"]):
+        return "OPTIMIZATION NEEDED", (f"Estimated {scaling['user']['order']} vs reference "
+                                       f"{scaling['reference']['order']}")
+    if checks:
+        u_steps = sum(c["user_steps"] for c in checks)
+        g_steps = sum(c["ref_steps"] for c in checks)
+        if same_units and u_steps > g_steps * 2:
+            return "OPTIMIZATION NEEDED", f"Steps: {u_steps} vs Ref: {g_steps} ({len(checks)} reference inputs)"
+        return "OPTIMAL", "Performance matches reference."
+    if diff and diff["records"]:
+        u_steps = sum(rec["user_steps"] for rec in diff["records"])
+        g_steps = sum(rec["ref_steps"] for rec in diff["records"])
+        if same_units and u_steps > g_steps * 2:
+            return "OPTIMIZATION NEEDED", f"Steps: {u_steps} vs Ref: {g_steps} ({len(diff['records'])} generated inputs)"
+        return "OPTIMAL", "Performance matches reference."
+    if not user_run or not golden_run:
+        return "REVIEW", "Complexity Analysis"
+    u_res, g_res = user_run["result"], golden_run["result"]
+    u_steps, g_steps = user_run["steps"], golden_run["steps"]
+    if str(u_res) != str(g_res):
+        return "LOGIC ERROR", f"Expected {g_res}, Got {u_res}"
+    if same_units and u_steps > g_steps * 2:
+        return "OPTIMIZATION NEEDED", f"Steps: {u_steps} vs Ref: {g_steps}"
+    return "OPTIMAL", "Performance matches reference."
+
+
+def analyze(user_code, problem_desc, api_key, engine, pool, on_done=None, use_llm=True, slug=None, skip=()):
+    """
+    Runs the analysis DAG and flattens it into the result dict the UI renders.
+    Raises if the inspector failed (nothing else can run without it) or the
+    execution pool is unavailable. Any other failing phase is recorded in "phase_errors" and the verdict uses what succeeded.
+    use_llm, slug and skip are passed to analysis_phases.
+    """
+    phases = analysis_phases(user_code, problem_desc, api_key, engine, pool,
+                             use_llm=use_llm, slug=slug, skip=skip)
+    results, timings, errors = run_phases(phases, on_done=on_done)
+    if "inspect" in errors:
+        raise errors["inspect"]
+    for name, e in errors.items():
+        if isinstance(e, PoolUnavailable):
+            raise e  # nothing could run: no verdict to give
+        if not isinstance(e, PhaseSkipped):
+            print(f"   [pipeline] ⚠️ {name} failed, judging without it: {type(e).__name__}: {e}")
+
+    meta = results["inspect"]
+    fam = results.get("family")
+    ref = (fam["optimal"] if fam else results.get("reference")) or {}
+    user_run = results.get("user_trace")
+    golden_run = results.get("golden_trace")
+    checks = results.get("reference_check")
+    diff = results.get("difftest")
+    scaling = results.get("complexity")
+
+    u_res = user_run["result"] if user_run else meta.get('syntax_error')
+    crashed = isinstance(u_res, str) and "Error" in u_res
+    python = backends.normalize_language(meta.get('language')) == 'python'
+    fb_type, fb_msg = (judge(user_run, golden_run, checks, diff, scaling, same_units=python)
+                       if not crashed else ("RUNTIME CRASH", u_res))
+
+    return {
+        "error": crashed,
+        "lang": meta.get('language', 'unknown'),
+        "executed": user_run is not None,
+        "slug": meta.get('predicted_slug') or 'Unknown',
+        "conf": ref.get('confidence') or 0.0,
+        "reference_id": ref.get('id'),
+        "golden_code": ref.get('code'),
+        "u_code": user_code,
+        "u_res": u_res,
+        "u_log": user_run["log"] if user_run else [],
+        "u_steps": user_run["steps"] if user_run else 0,
+        "g_res": golden_run["result"] if golden_run else None,
+        "g_steps": golden_run["steps"] if golden_run else 0,
+        "checks": checks or [],
+        "diff": diff,
+        "complexity": scaling,
+        "alignment": results.get("alignment"),
+        "family": fam,
+        "used_reference": ref.get('code') if golden_run or checks or diff else None,
+        "fb_type": fb_type,
+        "fb_msg": fb_msg,
+        "timings": timings,
+        "phase_errors": {k: str(v) for k, v in errors.items()},
+    }
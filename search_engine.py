@@ -1,50 +1,331 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import threading
 
-print("   [Search Engine] Loading Model & DB...")
-client = chromadb.PersistentClient(path="./leetcodedb_data")
-collection = client.get_collection(name="leetcode_solutions")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from slug_index import SlugIndex
+from artifacts import ArtifactStore
+from embedding_cache import EmbeddingCache
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from vector_backends import DEFAULT_BACKEND, make_backend, distance
+import metrics
 
-def find_solution(user_code, predicted_slug=None):
+# --- CONFIGURATION ---
+DB_PATH = "./leetcodedb_data"
+COLLECTION_NAME = "leetcode_solutions"
+MODEL_NAME = 'all-MiniLM-L6-v2'
+CANDIDATE_POOL = 20  # neighbours taken from each retriever before fusion
+
+
+class SearchEngine:
     """
-    Priority 1: Exact Metadata Match on Slug (100% Accuracy).
-    Priority 2: Vector Search on Code Logic (Fallback).
+    Owns the Chroma client, collection and embedding model.
+    Everything is loaded on first use (or explicitly via warmup()),
+    so importing this module is free.
     """
-    
-    # STRATEGY 1: EXACT METADATA LOOKUP (The "Direct Hit")
-    if predicted_slug:
-        print(f"   [search] 🔍 Attempting Direct Lookup for slug: '{predicted_slug}'...")
-        
-        # ChromaDB filter query
-        direct_hit = collection.get(
-            where={"name": predicted_slug},
-            limit=1,
-            include=["documents", "metadatas"]
-        )
-        
-        if direct_hit['ids']:
-            print(f"   [search] 🎯 SUCCESS: Exact match found for '{predicted_slug}'!")
-            return direct_hit['documents'][0], 1.0
-
-    # STRATEGY 2: VECTOR SEARCH (Fallback)
-    print(f"   [search] ⚠️ Direct lookup failed. Falling back to Vector Search...")
-    query_vector = model.encode(user_code).tolist()
-    results = collection.query(
-        query_embeddings=[query_vector],
-        n_results=1 
-    )
-    
-    if not results['documents'][0]:
-        return None, 0.0
-        
-    best_code = results['documents'][0][0]
-    confidence = 1 - results['distances'][0][0]
-    
-    return best_code, confidence
+    def __init__(self, db_path=DB_PATH, model_name=MODEL_NAME, backend=DEFAULT_BACKEND):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.backend_name = backend
+        self._backend = None
+        self._client = None
+        self._collection = None
+        self._model = None
+        self._slug_index = None
+        self._embedding_cache = None
+        self._lexical_index = None
+        self._artifacts = None
+        self._lock = threading.Lock()
+
+    # --- LAZY RESOURCES ---
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    import chromadb
+                    print("   [Search Engine] Opening DB...")
+                    self._client = chromadb.PersistentClient(path=self.db_path)
+                    self._collection = self._client.get_collection(name=COLLECTION_NAME)
+        return self._collection
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    print("   [Search Engine] Loading Model...")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def slug_index(self):
+        if self._slug_index is None:
+            collection = self.collection
+            with self._lock:
+                if self._slug_index is None:
+                    print("   [Search Engine] Building slug index...")
+                    self._slug_index = SlugIndex.load_or_build(collection, self.db_path)
+        return self._slug_index
+
+    @property
+    def backend(self):
+        """Nearest-neighbour backend (see vector_backends.py): 'chroma' or 'flat-int8'."""
+        if self._backend is None:
+            collection = self.collection
+            with self._lock:
+                if self._backend is None:
+                    self._backend = make_backend(self.backend_name, collection, self.db_path)
+        return self._backend
+
+    @property
+    def lexical_index(self):
+        if self._lexical_index is None:
+            entries = self.slug_index.entries
+            with self._lock:
+                if self._lexical_index is None:
+                    print("   [Search Engine] Building lexical index...")
+                    self._lexical_index = BM25Index({d: e['document'] for d, e in entries.items()})
+        return self._lexical_index
+
+    @property
+    def embedding_cache(self):
+        if self._embedding_cache is None:
+            with self._lock:
+                if self._embedding_cache is None:
+                    self._embedding_cache = EmbeddingCache(model_name=self.model_name)
+                    metrics.get_registry().register_collector("embedding_cache", self._embedding_cache.stats)
+        return self._embedding_cache
+
+    @property
+    def artifacts(self):
+        """Precomputed per-solution artefacts written by build_db.py (see artifacts.py)."""
+        if self._artifacts is None:
+            with self._lock:
+                if self._artifacts is None:
+                    self._artifacts = ArtifactStore(self.db_path)
+        return self._artifacts
+
+    def embed(self, texts):
+        """Embeds a batch of texts, skipping the model for anything already cached."""
+        with metrics.span("search.embed", texts=len(texts)):
+            return self.embedding_cache.encode(self._encode, texts)
+
+    def _encode(self, texts):
+        return self.model.encode(texts, batch_size=64, show_progress_bar=False).tolist()
+
+    def warmup(self):
+        """Loads the DB, slug/lexical indexes and model up front (and primes the model with one encode)."""
+        self.lexical_index
+        self.backend
+        self.model.encode("warmup")
+        return self
+
+    def close(self):
+        """Drops the model and DB handles. The next search re-opens them."""
+        with self._lock:
+            if self._embedding_cache is not None:
+                self._embedding_cache.close()
+            self._embedding_cache = None
+            if self._artifacts is not None:
+                self._artifacts.close()
+            self._artifacts = None
+            self._collection = None
+            self._client = None
+            self._model = None
+            self._slug_index = None
+            self._lexical_index = None
+            self._backend = None
+
+    # --- SEARCH ---
+    def _vector_candidates(self, query_vectors, top_k):
+        """One batched backend query. Returns a candidate list per query vector."""
+        entries = self.slug_index.entries
+        ranked = []
+        with metrics.span("search.vector_query", backend=self.backend_name, queries=len(query_vectors)):
+            results = self.backend.query(query_vectors, top_k)
+        for hits in results:
+            candidates = []
+            for doc_id, dist in hits:
+                entry = entries.get(doc_id)
+                if entry is None:
+                    continue
+                candidates.append({
+                    "id": doc_id,
+                    "name": entry['name'],
+                    "code": entry['document'],
+                    "metadata": entry.get('metadata', {}),
+                    "distance": dist,
+                    "confidence": 1 - dist,
+                    "source": "vector",
+                })
+            ranked.append(candidates)
+        return ranked
+
+    def _ranked_candidates(self, snippets, top_k):
+        """
+        Hybrid retrieval: MiniLM neighbours and BM25 identifier matches,
+        fused with reciprocal rank fusion. One batched encode for all snippets.
+        Every candidate carries 'score' (fused, 0..1), 'bm25', its vector 'distance'
+        and 'confidence' (1 - distance). The fused score only ranks: it depends on
+        the pool, not on how close the code is, so confidence stays the vector one.
+        """
+        if not snippets:
+            return []
+        query_vectors = self.embed(list(snippets))
+        pool = max(top_k, CANDIDATE_POOL)
+        vector_ranked = self._vector_candidates(query_vectors, pool)
+        entries = self.slug_index.entries
+
+        ranked = []
+        lexical_only = []  # (query index, candidate) pairs that still need a vector distance
+        for q, snippet in enumerate(snippets):
+            by_id = {c['id']: c for c in vector_ranked[q]}
+            with metrics.span("search.lexical"):
+                bm25 = dict(self.lexical_index.search(snippet, pool))
+            fused = reciprocal_rank_fusion([[c['id'] for c in vector_ranked[q]], list(bm25)])
+
+            candidates = []
+            for doc_id, score in fused[:top_k]:
+                cand = by_id.get(doc_id)
+                if cand is None:
+                    entry = entries[doc_id]
+                    cand = {
+                        "id": doc_id,
+                        "name": entry['name'],
+                        "code": entry['document'],
+                        "metadata": entry.get('metadata', {}),
+                        "distance": None,
+                        "confidence": None,
+                        "source": "lexical",
+                    }
+                    lexical_only.append((q, cand))
+                elif doc_id in bm25:
+                    cand = dict(cand, source="hybrid")
+                cand["score"] = score
+                cand["bm25"] = bm25.get(doc_id, 0.0)
+                candidates.append(cand)
+            ranked.append(candidates)
+
+        if lexical_only:
+            self._fill_distances(query_vectors, lexical_only)
+        return ranked
+
+    def _fill_distances(self, query_vectors, pairs):
+        """
+        Vector distance for candidates that only the lexical index found. Documents
+        the backend has no vector for are embedded here, so every candidate has one.
+        """
+        missing = []
+        for q, cand in pairs:
+            dist = self.backend.distances(query_vectors[q], [cand['id']]).get(cand['id'])
+            if dist is None:
+                missing.append((q, cand))
+            else:
+                cand['distance'] = dist
+                cand['confidence'] = 1 - dist
+        if missing:
+            vectors = self.embed([cand['code'] for _, cand in missing])
+            for (q, cand), vector in zip(missing, vectors):
+                cand['distance'] = distance(query_vectors[q], vector, self.backend.space)
+                cand['confidence'] = 1 - cand['distance']
+
+    def find_solution(self, user_code, predicted_slug=None):
+        """
+        Priority 1: Exact Metadata Match on Slug (100% Accuracy).
+        Priority 2: Vector Search on Code Logic (Fallback).
+        Returns (code, confidence). Confidence is 1.0 for a slug hit, else the top
+        hybrid candidate's vector similarity (1 - distance, the scale EXACT_MATCH is
+        on), whichever retriever ranked it first.
+        """
+
+        # STRATEGY 1: SLUG INDEX LOOKUP (The "Direct Hit")
+        if predicted_slug:
+            print(f"   [search] 🔍 Attempting Direct Lookup for slug: '{predicted_slug}'...")
+
+            # In-memory dict hit (also resolves title/case/spacing variants)
+            doc_id, entry = self.slug_index.lookup(predicted_slug)
+
+            if doc_id is not None:
+                print(f"   [search] 🎯 SUCCESS: Exact match found for '{predicted_slug}' -> '{entry['name']}'!")
+                return entry['document'], 1.0
+
+        # STRATEGY 2: HYBRID SEARCH (Fallback): vector + BM25, fused
+        print(f"   [search] ⚠️ Direct lookup failed. Falling back to Hybrid Search...")
+        with metrics.span("search.find", queries=1):
+            candidates = self._ranked_candidates([user_code], top_k=1)[0]
+
+        if not candidates:
+            return None, 0.0
+
+        best = candidates[0]
+        return best['code'], best['confidence']
+
+    def find_solutions(self, snippets, slugs=None, top_k=3):
+        """
+        Batch version of find_solution for bulk grading.
+        Returns, per snippet, up to top_k candidates ranked best-first:
+        a slug-index hit (distance 0.0) first, then hybrid (vector + BM25) matches.
+        """
+        snippets = list(snippets)
+        slugs = list(slugs) if slugs is not None else [None] * len(snippets)
+        if len(slugs) != len(snippets):
+            raise ValueError(f"Got {len(snippets)} snippets but {len(slugs)} slugs")
+
+        ranked = [[] for _ in snippets]
+        for q, slug in enumerate(slugs):
+            if not slug:
+                continue
+            doc_id, entry = self.slug_index.lookup(slug)
+            if doc_id is not None:
+                ranked[q].append({
+                    "id": doc_id,
+                    "name": entry['name'],
+                    "code": entry['document'],
+                    "metadata": entry.get('metadata', {}),
+                    "distance": 0.0,
+                    "confidence": 1.0,
+                    "source": "slug",
+                    "score": 1.0,
+                })
+
+        # Only snippets that still need candidates go to the retrievers
+        pending = [q for q in range(len(snippets)) if len(ranked[q]) < top_k]
+        with metrics.span("search.find", queries=len(pending)):
+            hybrid_results = self._ranked_candidates([snippets[q] for q in pending], top_k)
+        for q, candidates in zip(pending, hybrid_results):
+            seen = {c['id'] for c in ranked[q]}
+            for cand in candidates:
+                if len(ranked[q]) >= top_k:
+                    break
+                if cand['id'] not in seen:
+                    ranked[q].append(cand)
+
+        return ranked
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide SearchEngine singleton (nothing is loaded until it is used)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SearchEngine()
+    return _engine
+
+
+def find_solution(user_code, predicted_slug=None):
+    return get_engine().find_solution(user_code, predicted_slug=predicted_slug)
+
+
+def find_solutions(snippets, slugs=None, top_k=3):
+    return get_engine().find_solutions(snippets, slugs=slugs, top_k=top_k)
+
 
 # This only runs if you run 'py search_engine.py' directly
 if __name__ == "__main__":
     print("Testing Search Engine...")
     code, conf = find_solution("def test(): pass")
-    print(f"Test Result: {conf}")
\ No newline at end of file
+    print(f"Test Result: {conf}")
@@ -0,0 +1,101 @@
+import ast
+import json
+
+# --- CONFIGURATION ---
+SOLUTION_CLASS = "Solution"
+
+
+def _annotation(node):
+    if node is None:
+        return None
+    try:
+        return ast.unparse(node)
+    except Exception:
+        return None
+
+
+def _method_info(fn):
+    """Parameter names and type hints of one function (self/cls dropped)."""
+    args = fn.args
+    positional = args.posonlyargs + args.args
+    if positional and positional[0].arg in ("self", "cls"):
+        positional = positional[1:]
+    return {
+        "name": fn.name,
+        "params": [{"name": a.arg, "annotation": _annotation(a.annotation)} for a in positional],
+        "returns": _annotation(fn.returns),
+    }
+
+
+def _called_names(fn):
+    """Names of self.<method>(...) calls inside fn (helpers the entry point delegates to)."""
+    called = set()
+    for node in ast.walk(fn):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if isinstance(node.func.value, ast.Name) and node.func.value.id == "self":
+                called.add(node.func.attr)
+    return called
+
+
+def analyze_signature(code_str):
+    """
+    Statically extracts the entry point of a Python solution.
+    Returns {"class", "entry_point", "arity", "methods": [...]} or None if the
+    code doesn't parse or has no callable entry point.
+
+    With a `Solution` class the entry point is its public method that no other
+    method calls (so helpers like `dfs` are skipped); otherwise the first
+    top-level function.
+    """
+    try:
+        tree = ast.parse(code_str)
+    except (SyntaxError, ValueError):
+        return None
+
+    classes = [n for n in tree.body if isinstance(n, ast.ClassDef)]
+    target = next((c for c in classes if c.name == SOLUTION_CLASS), None)
+
+    if target is not None:
+        functions = [n for n in target.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        public = [f for f in functions if not f.name.startswith("_")]
+        called = set().union(*(_called_names(f) for f in functions)) if functions else set()
+        entry = next((f for f in public if f.name not in called), public[0] if public else None)
+        class_name = target.name
+    else:
+        functions = [n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        entry = functions[0] if functions else None
+        class_name = None
+
+    if entry is None:
+        return None
+
+    methods = [_method_info(f) for f in functions]
+    return {
+        "class": class_name,
+        "entry_point": entry.name,
+        "arity": len(next(m for m in methods if m["name"] == entry.name)["params"]),
+        "methods": methods,
+    }
+
+
+def signature_metadata(code_str):
+    """Flat, Chroma-storable form of analyze_signature() ({} when there is none)."""
+    sig = analyze_signature(code_str)
+    if not sig:
+        return {}
+    return {
+        "entry_point": sig["entry_point"],
+        "arity": sig["arity"],
+        "signature": json.dumps(sig, separators=(",", ":")),
+    }
+
+
+def signature_from_metadata(metadata):
+    """Inverse of signature_metadata(); None when the row predates signature extraction."""
+    raw = (metadata or {}).get("signature")
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
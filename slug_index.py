@@ -0,0 +1,154 @@
+import json
+import os
+import re
+
+# --- CONFIGURATION ---
+SNAPSHOT_NAME = "slug_index.json"  # stored inside the DB folder, rebuilt when stale
+PAGE_SIZE = 5000
+INDEXED_FIELDS = ("problem", "approach")  # metadata fields with a secondary (value -> ids) index
+
+_DROP_CHARS = re.compile(r"[^\w\s-]")       # punctuation LeetCode drops from slugs: "Pow(x, n)" -> "powx-n"
+_SEPARATORS = re.compile(r"[\s_-]+")
+_NUMBER_PREFIX = re.compile(r"^\d+-")       # "1-two-sum" (from "1. Two Sum") -> "two-sum"
+
+
+def normalize_slug(text):
+    """Folds titles, task ids and sloppy slugs onto LeetCode's dashed slug form."""
+    if not text:
+        return ""
+    text = _DROP_CHARS.sub("", str(text).strip().lower())
+    return _SEPARATORS.sub("-", text).strip("-")
+
+
+def slug_aliases(name):
+    """All keys a stored problem name is reachable under."""
+    slug = normalize_slug(name)
+    if not slug:
+        return []
+    aliases = [slug, slug.replace("-", "")]
+    unnumbered = _NUMBER_PREFIX.sub("", slug)
+    if unnumbered != slug:
+        aliases += [unnumbered, unnumbered.replace("-", "")]
+    return aliases
+
+
+def _field_value(entry, field):
+    value = entry["metadata"].get(field)
+    if field == "problem" and not value:
+        value = normalize_slug(entry["name"])  # rows indexed before solutions were grouped by problem
+    return value
+
+
+class SlugIndex:
+    """
+    In-memory slug -> document map over the Chroma collection.
+    Built once (one paged scan), then every lookup is a dict hit.
+    A problem can have several solutions (metadata "variant"): aliases point at
+    the primary one (variant 0), and a secondary index on INDEXED_FIELDS finds
+    the rest without scanning every entry.
+    """
+    def __init__(self, aliases=None, entries=None):
+        self.aliases = aliases or {}   # alias -> chroma id
+        self.entries = entries or {}   # chroma id -> {"name": ..., "document": ..., "metadata": ...}
+        self.fields = {field: {} for field in INDEXED_FIELDS}  # field -> value -> {chroma id}
+        for doc_id, entry in self.entries.items():
+            self._index(doc_id, entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _index(self, doc_id, entry):
+        for field, values in self.fields.items():
+            value = _field_value(entry, field)
+            if value:
+                values.setdefault(value, set()).add(doc_id)
+
+    def add(self, doc_id, name, document, metadata=None):
+        entry = {"name": name, "document": document, "metadata": metadata or {}}
+        self.entries[doc_id] = entry
+        self._index(doc_id, entry)
+        primary = not entry["metadata"].get("variant")
+        for alias in slug_aliases(name):
+            # First primary solution wins, same as the old `limit=1` metadata filter
+            current = self.aliases.get(alias)
+            if current is None or primary and self.entries[current]["metadata"].get("variant"):
+                self.aliases[alias] = doc_id
+
+    def lookup(self, slug):
+        """Returns (chroma_id, entry) or (None, None)."""
+        for alias in slug_aliases(slug):
+            doc_id = self.aliases.get(alias)
+            if doc_id is not None:
+                return doc_id, self.entries[doc_id]
+        return None, None
+
+    def where(self, **conditions):
+        """Ids whose metadata matches every field=value condition (indexed fields are set lookups)."""
+        ids = None
+        for field, value in sorted(conditions.items(), key=lambda c: c[0] not in self.fields):
+            if field in self.fields:
+                matches = self.fields[field].get(value, set())
+            else:
+                candidates = self.entries if ids is None else ids
+                matches = {d for d in candidates if self.entries[d]["metadata"].get(field) == value}
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return set()
+        return set(self.entries) if ids is None else ids
+
+    def solutions(self, slug, **conditions):
+        """
+        Every stored solution of the problem slug resolves to, primary first:
+        [(chroma_id, entry)], optionally filtered like where(). [] if the slug is unknown.
+        """
+        doc_id, entry = self.lookup(slug)
+        if doc_id is None:
+            return []
+        ids = self.where(problem=_field_value(entry, "problem"), **conditions)
+        order = sorted(ids, key=lambda d: (self.entries[d]["metadata"].get("variant") or 0, d))
+        return [(d, self.entries[d]) for d in order]
+
+    # --- BUILD / PERSIST ---
+    @classmethod
+    def from_collection(cls, collection):
+        index = cls()
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=PAGE_SIZE, offset=offset)
+            if not page['ids']:
+                break
+            for doc_id, meta, doc in zip(page['ids'], page['metadatas'], page['documents']):
+                index.add(doc_id, (meta or {}).get("name", ""), doc, meta)
+            offset += len(page['ids'])
+        return index
+
+    @classmethod
+    def load_or_build(cls, collection, db_path):
+        """Loads the on-disk snapshot if it matches the collection, otherwise rebuilds it."""
+        path = os.path.join(db_path, SNAPSHOT_NAME)
+        count = collection.count()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("count") == count:
+                return cls(data["aliases"], data["entries"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.from_collection(collection)
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"count": count, "aliases": index.aliases, "entries": index.entries}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"   [slug index] Warning: could not write snapshot ({e})")
+        return index
+
+
+def invalidate_snapshot(db_path):
+    """Called by build_db.py after writing, so the next search rebuilds the index."""
+    try:
+        os.remove(os.path.join(db_path, SNAPSHOT_NAME))
+    except FileNotFoundError:
+        pass
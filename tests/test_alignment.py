@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from alignment import matching_blocks, opcodes, align, TooDifferent
+from tracer import CodeTracer
+
+
+def lcs_length(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        previous = 0
+        for j, y in enumerate(b, 1):
+            previous, row[j] = row[j], previous + 1 if x == y else max(row[j], row[j - 1])
+    return row[-1]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_myers_matches_as_much_as_the_longest_common_subsequence(seed):
+    rng = random.Random(seed)
+    a = [rng.randrange(4) for _ in range(rng.randrange(0, 60))]
+    b = [rng.randrange(4) for _ in range(rng.randrange(0, 60))]
+    blocks = matching_blocks(a, b, max_edits=200)
+    i = j = 0
+    for bi, bj, size in blocks:
+        assert bi >= i and bj >= j and size > 0
+        assert a[bi:bi + size] == b[bj:bj + size]
+        i, j = bi + size, bj + size
+    assert sum(size for _, _, size in blocks) == lcs_length(a, b)
+    ops = opcodes(blocks, len(a), len(b))
+    assert sum(i2 - i1 for _, i1, i2, _, _ in ops) == len(a)
+    assert sum(j2 - j1 for _, _, _, j1, j2 in ops) == len(b)
+
+
+def test_edit_budget():
+    with pytest.raises(TooDifferent):
+        matching_blocks(list(range(50)), list(range(100, 150)), max_edits=10)
+    assert matching_blocks([1, 2, 3], [1, 2, 3], max_edits=0) == [(0, 0, 3)]
+
+
+REFERENCE = """
+def find_max(nums):
+    best = nums[0]
+    for x in nums:
+        if x > best:
+            best = x
+    return best
+"""
+
+USER = """
+def find_max(nums):
+    best = 0
+    for x in nums:
+        if x > best:
+            best = x
+    return best
+"""
+
+
+def test_first_divergence_is_the_wrong_initial_value():
+    args = ([-3, -1, -2],)
+    _, user_log = CodeTracer("full").run(USER, "find_max", args)
+    _, ref_log = CodeTracer("full").run(REFERENCE, "find_max", args)
+    report = align(user_log, USER, ref_log, REFERENCE)
+    assert report["divergence"]["user"][0]["source"] == "best = 0"
+    assert report["divergence"]["ref"][0]["source"] == "best = nums[0]"
+    assert 0 < report["similarity"] < 1 and report["hunks"]
+
+    _, same_log = CodeTracer("full").run(REFERENCE, "find_max", args)
+    assert align(same_log, REFERENCE, ref_log, REFERENCE)["divergence"] is None
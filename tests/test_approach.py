@@ -0,0 +1,71 @@
+import pytest
+
+from approach import TAG_WEIGHT, classify, family_distance
+
+BRUTE_FORCE = """
+def two_sum(nums, target):
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == target:
+                return [i, j]
+"""
+
+HASH_MAP = """
+def two_sum(nums, target):
+    seen = {}
+    for i, x in enumerate(nums):
+        if target - x in seen:
+            return [seen[target - x], i]
+        seen[x] = i
+"""
+
+BINARY_SEARCH = """
+def search(a, target):
+    lo, hi = 0, len(a) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if a[mid] == target:
+            return mid
+        if a[mid] < target:
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return -1
+"""
+
+DP = """
+def climb(n):
+    dp = [1] * (n + 1)
+    for i in range(2, n + 1):
+        dp[i] = dp[i - 1] + dp[i - 2]
+    return dp[n]
+"""
+
+
+@pytest.mark.parametrize("code, expected", [
+    (BRUTE_FORCE, "brute-force"),
+    (HASH_MAP, "hash-map"),
+    (BINARY_SEARCH, "binary-search"),  # its two moving bounds don't make it two-pointers
+    (DP, "dynamic-programming"),
+    ("def add(a, b):\n    return a + b\n", "direct"),
+    ("def f(:\n", "unknown"),
+])
+def test_python_approach_is_read_from_the_ast(code, expected):
+    assert classify(code)["approach"] == expected
+
+
+def test_compiled_languages_are_tagged_by_library_names():
+    assert classify("priority_queue<int> pq; sort(a.begin(), a.end());", "cpp") == \
+        {"approach": "heap", "tags": ["heap", "sorting"]}
+    assert classify("for (int i = 0; i < n; i++) {}", "cpp")["approach"] == "unknown"
+
+
+def test_family_distance_orders_solutions_by_approach():
+    brute, hashed = classify(BRUTE_FORCE), classify(HASH_MAP)
+    assert family_distance(brute, brute) == 0.0
+    assert family_distance(brute, hashed) == family_distance(hashed, brute) > 1.0
+    assert family_distance(brute, hashed) <= 1.0 + TAG_WEIGHT
+    stored = {"approach": "hash-map", "tags": ",".join(hashed["tags"])}  # as build_db stores it
+    assert family_distance(hashed, stored) == 0.0
+    unknown = {"approach": "unknown", "tags": []}
+    assert family_distance(unknown, unknown) == 1.0  # two unknowns aren't the same family
@@ -0,0 +1,65 @@
+import marshal
+
+import pytest
+
+import artifacts
+from artifacts import ArtifactStore, canonical_inputs, compile_solution
+from signature import analyze_signature
+from tracer import SOURCE_NAME
+
+CODE = """
+class Solution:
+    def twoSum(self, nums, target):
+        seen = {}
+        for i, x in enumerate(nums):
+            if target - x in seen:
+                return [seen[target - x], i]
+            seen[x] = i
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_bytecode_is_compiled_under_the_tracer_filename():
+    code = marshal.loads(compile_solution(CODE))
+    assert code.co_filename == SOURCE_NAME
+    assert compile_solution("def broken(:") is None
+
+
+def test_canonical_inputs_follow_the_parameter_order():
+    row = {"input_output": [{"input": "target = 9, nums = [2, 7, 11, 15]"},
+                            {"input": "nums = [3, 3], target = 6"},
+                            {"input": "nums = list(range(3)), target = 1"},  # not a literal
+                            {"input": "nums = [1], k = 2"}]}  # wrong parameters
+    assert canonical_inputs(row, analyze_signature(CODE)) == [([2, 7, 11, 15], 9), ([3, 3], 6)]
+    assert canonical_inputs(row, analyze_signature(CODE), limit=1) == [([2, 7, 11, 15], 9)]
+    assert canonical_inputs(row, None) == []
+
+
+def test_put_replaces_everything_stored_for_a_solution(store):
+    sig = analyze_signature(CODE)
+    store.put("7", "hash-1", sig, compile_solution(CODE), [(([2, 7], 9), "[0, 1]", 12), (([3, 3], 6), "[0, 1]", 9)],
+              growth={"order": "O(n)", "confidence": 0.97})
+    assert store.signature("7") == sig
+    assert store.reference_runs("7") == [(([2, 7], 9), "[0, 1]", 12), (([3, 3], 6), "[0, 1]", 9)]
+    assert store.growth(["7", "8"]) == {"7": {"order": "O(n)", "confidence": 0.97}}
+
+    store.put("7", "hash-2", sig, compile_solution(CODE), [(([1, 2], 3), "[0, 1]", 5)])
+    assert store.hashes() == {"7": "hash-2"}
+    assert store.reference_runs("7") == [(([1, 2], 3), "[0, 1]", 5)]
+    assert store.growth(["7"]) == {}
+
+    store.delete(["7"])
+    assert store.hashes() == {} and store.reference_runs("7") == [] and store.signature("7") is None
+
+
+def test_bytecode_from_another_interpreter_is_ignored(store, monkeypatch):
+    store.put("1", "h", None, compile_solution(CODE), [])
+    assert marshal.loads(store.bytecode("1")).co_filename == SOURCE_NAME
+    monkeypatch.setattr(artifacts, "CACHE_TAG", "cpython-299")
+    assert store.bytecode("1") is None
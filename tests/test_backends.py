@@ -0,0 +1,74 @@
+import shutil
+
+import pytest
+
+import backends
+from executor import ExecutionPool
+
+CPP = """
+#include <vector>
+using namespace std;
+
+class Solution {
+public:
+    int helper(int x) { return x; }
+
+    vector<int> twoSum(vector<int>& nums, int target) {
+        for (int i = 0; i < (int)nums.size(); i++)
+            for (int j = i + 1; j < (int)nums.size(); j++)
+                if (nums[i] + nums[j] == target) return {helper(i), j};
+        return {};
+    }
+
+    int divide(int a, int b) { return a / b; }
+};
+"""
+
+JAVA = """
+class Solution {
+    public int[] twoSum(int[] nums, int target) {
+        for (int i = 0; i < nums.length; i++)
+            for (int j = i + 1; j < nums.length; j++)
+                if (nums[i] + nums[j] == target) return new int[]{i, j};
+        return new int[0];
+    }
+}
+"""
+
+CASES = [([2, 7, 11, 15], 9), ([3, 2, 4], 6), ([3, 3], 6)]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ExecutionPool(size=1)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.parametrize("language, code", [("cpp", CPP), ("java", JAVA)])
+def test_signature_maps_native_types_for_input_generation(language, code):
+    sig = backends.signature(language, code)
+    assert (sig["class"], sig["entry_point"], sig["arity"]) == ("Solution", "twoSum", 2)
+    params = next(m for m in sig["methods"] if m["name"] == "twoSum")["params"]
+    assert [p["annotation"] for p in params] == ["List[int]", "int"]
+    assert backends.normalize_language("C++") == "cpp"
+
+
+@pytest.mark.skipif(not shutil.which(backends.CXX), reason="no C++ compiler")
+def test_cpp_runs_like_python(pool):
+    runs = pool.run_batch(CPP, "twoSum", CASES, language="cpp")
+    assert [r["result"] for r in runs] == ["[0, 1]", "[1, 2]", "[0, 1]"]
+    assert all(r["steps"] > 0 for r in runs)
+
+    crashed, ok = pool.run_batch(CPP, "divide", [(1, 0), (7, 2)], language="cpp")
+    assert crashed["result"].startswith("Error: Floating point exception")
+    assert ok["result"] == "3"  # the batch goes on after a crashing call
+
+    broken = pool.run_batch("int f(int x) { return x +; }", "f", [(1,), (2,)], language="cpp")
+    assert all(r["result"].startswith("Error: Compilation failed") for r in broken)
+
+
+@pytest.mark.skipif(not shutil.which(backends.JAVAC), reason="no JDK")
+def test_java_runs_like_python(pool):
+    runs = pool.run_batch(JAVA, "twoSum", CASES, language="java")
+    assert [r["result"] for r in runs] == ["[0, 1]", "[1, 2]", "[0, 1]"]
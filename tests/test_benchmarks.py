@@ -0,0 +1,32 @@
+import json
+import os
+
+from benchmarks.run import compare, portable, BASELINE_PATH
+from benchmarks.corpus import CORPUS_VERSION
+
+
+def metric(value, unit="ms", better="lower", tolerance=0.3, noise=0.0):
+    return {"value": value, "unit": unit, "better": better, "tolerance": tolerance, "noise": noise}
+
+
+def run(**metrics):
+    return {"meta": {}, "metrics": metrics, "skipped": {}}
+
+
+def test_only_moves_past_tolerance_and_noise_in_the_bad_direction_regress():
+    baseline = run(latency=metric(10.0, noise=1.0), tiny=metric(1.0, noise=1.0),
+                   recall=metric(0.9, "ratio", "higher", 0.05), info=metric(5.0, tolerance=None))
+    current = run(latency=metric(14.0), tiny=metric(1.9), recall=metric(0.8, "ratio", "higher"), info=metric(50.0))
+    regressed = {row["metric"] for row in compare(current, baseline) if row["regressed"]}
+    assert regressed == {"latency", "recall"}  # tiny moved 90% but within its noise floor
+    assert not any(row["regressed"] for row in compare(current, baseline, tolerance_scale=10))
+    assert not any(row["regressed"] for row in compare(run(latency=metric(5.0)), baseline))
+
+
+def test_committed_baseline_is_portable_and_current():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, BASELINE_PATH), encoding="utf-8") as f:
+        baseline = json.load(f)
+    assert baseline["meta"]["corpus_version"] == CORPUS_VERSION
+    assert baseline == portable(baseline)
+    assert baseline["metrics"]["e2e.verdict_accuracy"]["value"] == 1.0
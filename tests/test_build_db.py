@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+for module in ("chromadb", "sentence_transformers", "datasets", "tqdm"):
+    pytest.importorskip(module)
+
+import build_db  # noqa: E402
+
+
+class RecordingCollection:
+    """Collects upserts the way Chroma would store them."""
+    def __init__(self):
+        self.rows = {}
+        self.upserts = 0
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.upserts += 1
+        for doc_id, vector, meta, document in zip(ids, embeddings, metadatas, documents):
+            self.rows[doc_id] = (vector, meta, document)
+
+
+class ConstantModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **_):
+        self.calls += 1
+        return np.ones((len(texts), 3))
+
+
+def dataset(n):
+    return [{"task_id": f"problem-{i}", "completion": f"def solve(x):\n    return x + {i}\n"} for i in range(n)]
+
+
+def test_ingest_streams_every_row_once_in_batches():
+    n = 2 * build_db.EMBED_BATCH_SIZE + 3
+    rows = build_db.iter_rows(dataset(n))  # a generator: nothing is listed up front
+    collection, model = RecordingCollection(), ConstantModel()
+    read, embed, write = build_db.ingest(rows, collection, model)
+    assert sorted(collection.rows, key=int) == [str(i) for i in range(n)]
+    assert model.calls == 3
+    assert read.rows == embed.rows == write.rows == n
+    vector, meta, document = collection.rows["7"]
+    assert meta["name"] == "problem-7" and meta["entry_point"] == "solve"
+    assert meta["hash"] == build_db.content_hash(document)
+
+
+def test_incremental_plan_only_touches_changed_and_removed_rows():
+    rows = dataset(5)
+    existing = {doc_id: build_db.content_hash(code) for doc_id, _, _, code, _ in build_db.iter_rows(rows)}
+    existing["99"] = "hash of a row no longer in the dataset"
+    rows[2] = dict(rows[2], completion="def solve(x):\n    return -x\n")
+
+    changed, stale, unchanged = build_db.plan_incremental(rows, existing)
+    assert [row[0] for row in changed] == ["2"]
+    assert stale == ["99"]
+    assert unchanged == 4
+
+
+def test_content_hash_changes_with_the_index_version(monkeypatch):
+    before = build_db.content_hash("def solve(x):\n    return x\n")
+    monkeypatch.setattr(build_db, "INDEX_VERSION", build_db.INDEX_VERSION + 1)
+    assert build_db.content_hash("def solve(x):\n    return x\n") != before
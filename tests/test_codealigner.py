@@ -0,0 +1,30 @@
+import json
+
+from codealigner import read_checkpoint
+
+
+def test_read_checkpoint_truncates_a_torn_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    good = "".join(json.dumps(r) + "\n" for r in (
+        {"id": "a", "verdict": "ACCEPTED"},
+        {"id": "b", "verdict": "SYSTEM ERROR"},
+        {"id": "c", "verdict": "WRONG ANSWER"},
+    ))
+    path.write_text(good + '{"id": "d", "verd')
+    assert read_checkpoint(str(path)) == {"a", "c"}
+    assert path.read_text() == good
+
+
+def test_read_checkpoint_keeps_results_after_a_corrupt_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    text = (json.dumps({"id": "a", "verdict": "ACCEPTED"}) + "\n"
+            + "{not json\n"
+            + json.dumps(["no", "id"]) + "\n"
+            + json.dumps({"id": "b", "verdict": "ACCEPTED"}) + "\n")
+    path.write_text(text)
+    assert read_checkpoint(str(path)) == {"a", "b"}
+    assert path.read_text() == text
+
+
+def test_read_checkpoint_without_a_file(tmp_path):
+    assert read_checkpoint(str(tmp_path / "missing.jsonl")) == set()
@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from complexity import estimate_order, is_slower, profile, GROWTH_SIZES
+from executor import ExecutionPool
+
+SIZES = GROWTH_SIZES
+
+
+@pytest.mark.parametrize("order, cost", [
+    ("O(1)", lambda n: 7),
+    ("O(log n)", lambda n: 3 * math.log2(n) + 2),
+    ("O(n)", lambda n: 4 * n + 3),
+    ("O(n log n)", lambda n: n * math.log2(n) + 5),
+    ("O(n^2)", lambda n: n * n / 2 + n),
+])
+def test_clean_samples_fit_their_curve(order, cost):
+    estimate = estimate_order([(n, cost(n)) for n in SIZES])
+    assert estimate["order"] == order
+    assert order == "O(1)" or estimate["confidence"] > 0.5
+
+
+def test_exponential_and_too_few_samples():
+    assert estimate_order([(n, 2 ** n) for n in range(2, 16)])["order"] == "O(2^n)"
+    assert estimate_order([(4, 10), (8, 20)]) == {"order": None, "confidence": 0.0, "errors": {}}
+
+
+def test_only_a_confident_worse_order_is_slower():
+    linear, quadratic = {"order": "O(n)", "confidence": 0.9}, {"order": "O(n^2)", "confidence": 0.9}
+    assert is_slower(quadratic, linear) and not is_slower(linear, quadratic)
+    assert not is_slower(dict(quadratic, confidence=0.1), linear)
+    assert not is_slower(quadratic, None)
+
+
+QUADRATIC = """
+def pairs(nums):
+    count = 0
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            count += nums[i] < nums[j]
+    return count
+"""
+
+LINEAR = """
+def total(nums):
+    s = 0
+    for x in nums:
+        s += x
+    return s
+"""
+
+
+def test_profiled_solutions_are_told_apart():
+    pool = ExecutionPool(size=1)
+    try:
+        slow = profile(pool, QUADRATIC, "pairs", [("list", ("int",))])
+        fast = profile(pool, LINEAR, "total", [("list", ("int",))])
+    finally:
+        pool.close()
+    assert (slow["order"], fast["order"]) == ("O(n^2)", "O(n)")
+    assert is_slower(slow, fast)
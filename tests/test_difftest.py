@@ -0,0 +1,107 @@
+import pytest
+
+from executor import ExecutionPool
+from difftest import differential_test, parse_args
+from pipeline import judge
+
+REFERENCE = """
+class Solution:
+    def containsDuplicate(self, nums):
+        return len(set(nums)) != len(nums)
+"""
+
+# Same answers, different approach (and it sorts its input in place)
+BRUTE_FORCE = """
+def contains_duplicate(nums):
+    nums.sort()
+    for i in range(1, len(nums)):
+        if nums[i] == nums[i - 1]:
+            return True
+    return False
+"""
+
+WRONG = """
+def contains_duplicate(nums):
+    return len(nums) > 1 and nums[0] == nums[1]
+"""
+
+TYPES = [("list", ("int",))]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ExecutionPool(size=2)
+    yield pool
+    pool.close()
+
+
+def test_correct_but_different_solution_has_no_counterexample(pool):
+    result = differential_test(pool, BRUTE_FORCE, "contains_duplicate", REFERENCE, "containsDuplicate",
+                               TYPES, count=16)
+    assert result["counterexample"] is None
+    assert result["valid"] == result["inputs"] > 0
+    assert len(result["records"]) == result["valid"]
+
+
+def test_wrong_solution_is_shrunk_to_a_reproducing_counterexample(pool):
+    result = differential_test(pool, WRONG, "contains_duplicate", REFERENCE, "containsDuplicate",
+                               TYPES, count=16)
+    counterexample = result["counterexample"]
+    assert counterexample is not None
+    assert counterexample["expected"] == "True" and counterexample["got"] == "False"
+    assert counterexample["verified"] is False  # no other reference to confirm the answer is unique
+    assert len(counterexample["args"][0]) <= 3
+
+
+def test_parse_args_accepts_leetcode_form():
+    assert parse_args("nums = [1, 2], target = 3") == ([1, 2], 3)
+    with pytest.raises(ValueError):
+        parse_args("__import__('os')")
+
+
+TWO_SUM = """
+class Solution:
+    def twoSum(self, nums, target):
+        seen = {}
+        for i, x in enumerate(nums):
+            if target - x in seen:
+                return [seen[target - x], i]
+            seen[x] = i
+        return []
+"""
+
+TWO_SUM_BRUTE_FORCE = """
+def two_sum(nums, target):
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == target:
+                return [i, j]
+    return []
+"""
+
+TWO_SUM_TYPES = [("list", ("int",)), ("int",)]
+
+
+def test_another_valid_answer_is_not_a_verified_counterexample(pool):
+    # ([5, -10, 7, -8], -3): the hash map answers [1, 2], the brute force [0, 3]; both are right
+    result = differential_test(pool, TWO_SUM_BRUTE_FORCE, "two_sum", TWO_SUM, "twoSum", TWO_SUM_TYPES, count=32)
+    assert result["counterexample"] is not None
+    assert result["counterexample"]["verified"] is False
+    ok = [{"args": ([3, 3], 6), "expected": "[0, 1]", "got": "[0, 1]", "user_steps": 5, "ref_steps": 5}]
+    assert judge(None, None, checks=ok, diff=result)[0] == "OPTIMAL"
+    assert judge(None, None, diff=result)[0] == "REVIEW"
+
+
+def test_counterexample_dropped_when_another_reference_gives_the_users_answer(pool):
+    alternate = (TWO_SUM_BRUTE_FORCE, "two_sum", False)  # e.g. the problem's brute-force reference
+    result = differential_test(pool, TWO_SUM_BRUTE_FORCE, "two_sum", TWO_SUM, "twoSum", TWO_SUM_TYPES,
+                               count=32, alternates=[alternate])
+    assert result["counterexample"] is None
+
+
+def test_counterexample_verified_when_other_references_agree(pool):
+    alternate = (BRUTE_FORCE, "contains_duplicate", False)
+    result = differential_test(pool, WRONG, "contains_duplicate", REFERENCE, "containsDuplicate",
+                               TYPES, count=16, alternates=[alternate])
+    assert result["counterexample"]["verified"] is True
+    assert judge(None, None, diff=result)[0] == "LOGIC ERROR"
@@ -0,0 +1,71 @@
+import itertools
+import types
+
+import pytest
+
+import embedding_cache
+from embedding_cache import EmbeddingCache, normalize_code
+
+
+class Encoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), model_name="test")
+    yield cache
+    cache.close()
+
+
+def test_comments_and_whitespace_share_a_key():
+    a = "def f(x):\n    return x  # identity\n"
+    b = "def f(x):\n\n    # comment\n    return x\n"
+    assert normalize_code(a) == normalize_code(b)
+    assert normalize_code("s = '#'\n") != normalize_code("s = ''\n")  # not a comment inside a string
+    assert normalize_code("int f() { return 1; } // c++") == normalize_code("int f()  {\n return 1; }")
+
+
+def test_only_misses_reach_the_model(cache):
+    encoder = Encoder()
+    first = cache.encode(encoder, ["def f(x):\n    return x\n", "def g():\n    pass\n"])
+    again = cache.encode(encoder, ["def f(x):  # same\n    return x\n", "def f(x):\n    return x\n", "def h(): pass"])
+    assert encoder.calls == [["def f(x):\n    return x\n", "def g():\n    pass\n"], ["def h(): pass"]]
+    assert again[0] == again[1] == first[0]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_vectors_persist_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    encoder = Encoder()
+    cache = EmbeddingCache(path=path, model_name="test")
+    vector = cache.encode(encoder, ["x = 1"])[0]
+    cache.close()
+    reopened = EmbeddingCache(path=path, model_name="test")
+    assert reopened.encode(encoder, ["x = 1"])[0] == vector
+    assert len(encoder.calls) == 1
+    assert EmbeddingCache(path=path, model_name="other").encode(encoder, ["x = 1"])  # other model: a miss
+    assert len(encoder.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(embedding_cache, "time", types.SimpleNamespace(time=lambda: next(clock)))
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), model_name="test", max_entries=2)
+    encoder = Encoder()
+    cache.encode(encoder, ["a = 1"])
+    cache.encode(encoder, ["b = 2"])
+    cache.encode(encoder, ["a = 1"])  # touched: b is now the oldest
+    cache.encode(encoder, ["c = 3"])
+    assert cache.stats()["size"] == 2
+    calls = len(encoder.calls)
+    cache.encode(encoder, ["a = 1", "c = 3"])
+    assert len(encoder.calls) == calls  # both kept
+    cache.encode(encoder, ["b = 2"])
+    assert encoder.calls[-1] == ["b = 2"]  # evicted
+    cache.close()
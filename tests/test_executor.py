@@ -0,0 +1,50 @@
+import pytest
+
+from executor import ExecutionPool
+
+PID = """
+import os
+
+def pid():
+    return os.getpid()
+"""
+
+# Blocks without executing lines, so only the wall timeout stops it
+SLEEP = """
+import time
+
+def nap(n):
+    time.sleep(30)
+"""
+
+
+@pytest.fixture
+def pool():
+    pool = ExecutionPool(size=1, max_jobs=2, timeout=1)
+    yield pool
+    pool.close()
+
+
+def test_worker_is_recycled_after_max_jobs(pool):
+    pids = [pool.run(PID, "pid", (), mode="count")["result"] for _ in range(3)]
+    assert pids[0] == pids[1] != pids[2]
+
+
+def test_timeout_kills_the_worker_and_the_pool_recovers(pool):
+    first = pool.run(PID, "pid", (), mode="count")["result"]
+    run = pool.run(SLEEP, "nap", (0,), mode="count")
+    assert run["result"].startswith("Error: Time limit exceeded")
+    assert pool.run(PID, "pid", (), mode="count")["result"] != first
+
+
+def test_batch_timeout_gives_every_call_its_own_result(pool):
+    runs = pool.run_batch(SLEEP, "nap", [(0,), (1,), (2,)])
+    assert len(runs) == 3
+    assert all(r["result"].startswith("Error: Time limit exceeded") for r in runs)
+    runs[0]["result"] = "changed"
+    assert runs[1]["result"] != "changed"
+
+
+def test_batch_runs_in_order(pool):
+    runs = pool.run_batch("def double(x):\n    return 2 * x\n", "double", [(1,), (2,), (3,)])
+    assert [r["result"] for r in runs] == ["2", "4", "6"]
@@ -0,0 +1,52 @@
+import llm_gateway
+from feedback import parse_sections, stream_feedback, SECTIONS
+from llm_gateway import LLMGateway, FakeModel
+
+REVIEW = """Quick note first.
+
+### 1. Diagnosis
+The loop re-scans the list.
+
+### Action Plan
+- Use a hash map.
+
+### Solution
+```python
+def two_sum(nums, target):
+    return []
+```
+
+#### Complexity Analysis
+O(n) time.
+"""
+
+
+def test_review_is_split_into_its_sections():
+    sections = parse_sections(REVIEW)
+    assert sections[""] == "Quick note first."
+    assert sections["Diagnosis"] == "The loop re-scans the list."
+    assert sections["Solution"].startswith("```python") and sections["Solution"].endswith("```")
+    assert sections["Complexity Analysis"] == "O(n) time."
+    assert set(sections) == {"", *SECTIONS}
+
+
+def test_every_streamed_prefix_renders():
+    for end in range(len(REVIEW) + 1):
+        sections = parse_sections(REVIEW[:end])
+        assert all(body.count("```") % 2 == 0 for body in sections.values())  # open fences are closed
+        assert not any(body.lstrip().startswith("#") for body in sections.values())  # half-typed headers hidden
+
+
+def test_api_failure_becomes_a_final_chunk(tmp_path):
+    class Broken(FakeModel):
+        def generate_content(self, prompt, stream=False):
+            raise RuntimeError("quota gone")
+
+    gateway = LLMGateway(path=str(tmp_path / "llm.sqlite3"), model_factory=lambda key, name: Broken())
+    previous = llm_gateway.set_gateway(gateway)
+    try:
+        chunks = list(stream_feedback("review", "key"))
+    finally:
+        llm_gateway.set_gateway(previous)
+        gateway.close()
+    assert chunks[-1].strip() == "AI Service Error: quota gone"
@@ -0,0 +1,21 @@
+import pytest
+
+from inspector import inspect_statically
+
+
+@pytest.mark.parametrize("code, language, entry", [
+    ("def solve(nums):\n    return max(nums)\n", "python", "solve"),
+    ("#include <vector>\nint solve(std::vector<int>& nums) { return nums[0]; }\n", "cpp", "solve"),
+    ("class Solution {\npublic:\n    bool check(vector<int>& nums) {\n        return true;\n    }\n};\n",
+     "cpp", "check"),
+    ("class Solution {\n    public int solve(int[] nums) { return nums[0]; }\n}\n", "java", "solve"),
+])
+def test_language_and_entry_point(code, language, entry):
+    meta = inspect_statically(code)
+    assert (meta["language"], meta["user_function"], meta["syntax_error"]) == (language, entry, None)
+
+
+def test_broken_python_is_a_syntax_error_not_cpp():
+    meta = inspect_statically("def solve(nums):\n    seen = {x: 1 for x in nums\n    return seen\n")
+    assert meta["language"] == "python"
+    assert meta["syntax_error"].startswith("Error: SyntaxError:")
@@ -0,0 +1,24 @@
+from lexical_index import BM25Index, code_tokens, reciprocal_rank_fusion
+
+DOCS = {
+    "profit": "def maxProfit(prices):\n    best_profit = 0\n    return best_profit\n",
+    "anagram": "def is_anagram(s, t):\n    return sorted(s) == sorted(t)\n",
+    "sum": "def two_sum(nums, target):\n    seen = {}\n    return seen\n",
+}
+
+
+def test_identifiers_are_split_into_their_pieces():
+    assert code_tokens("maxProfit best_profit") == ["maxprofit", "max", "profit", "best_profit", "best", "profit"]
+
+
+def test_shared_identifiers_rank_the_right_document_first():
+    index = BM25Index(DOCS)
+    assert index.search("def max_profit(p):\n    profit = 0\n")[0][0] == "profit"
+    assert index.search("sorted(a) == sorted(b)")[0][0] == "anagram"
+    assert index.search("zzz") == []
+
+
+def test_fusion_rewards_agreement_and_is_scaled_to_one():
+    fused = dict(reciprocal_rank_fusion([["a", "b", "c"], ["b", "a"]]))
+    assert fused["a"] == fused["b"] > fused["c"]
+    assert reciprocal_rank_fusion([["a"], ["a"]]) == [("a", 1.0)]
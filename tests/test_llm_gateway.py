@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_gateway import LLMGateway, FakeModel
+
+
+def _gateway(tmp_path, fake):
+    return LLMGateway(path=str(tmp_path / "llm.sqlite3"), model_factory=lambda key, name: fake)
+
+
+def test_concurrent_identical_prompts_share_one_call(tmp_path):
+    fake = FakeModel(handler=lambda prompt: prompt.upper(), delay=0.3)
+    gateway = _gateway(tmp_path, fake)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        texts = list(executor.map(lambda _: gateway.generate("review this", "key"), range(8)))
+    assert texts == ["REVIEW THIS"] * 8
+    assert fake.calls == ["review this"]
+    assert gateway.misses == 1 and gateway.coalesced == 7
+    gateway.close()
+
+
+def test_cached_response_is_reused(tmp_path):
+    fake = FakeModel(handler=lambda prompt: "ok")
+    gateway = _gateway(tmp_path, fake)
+    assert gateway.generate("p", "key") == "ok"
+    assert gateway.generate("p", "key") == "ok"
+    assert len(fake.calls) == 1 and gateway.hits == 1
+    gateway.close()
+
+
+def test_retries_resource_exhausted(tmp_path):
+    fake = FakeModel(handler=lambda prompt: "ok", fail_times=2)
+    gateway = _gateway(tmp_path, fake)
+    assert gateway.generate("p", "key") == "ok"
+    assert len(fake.calls) == 3 and gateway.retries == 2
+    gateway.close()
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+from metrics import Histogram, Registry
+
+
+def test_spans_nest_across_bound_threads():
+    with metrics.request("grade", id="x") as req:
+        with metrics.span("phase.inspect"):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                pool.submit(metrics.bind(_timed), "search.embed").result()
+        with pytest.raises(ValueError):
+            with metrics.span("phase.failing"):
+                raise ValueError("boom")
+    by_name = {s["name"]: s for s in req.spans}
+    assert by_name["search.embed"]["parent"] == by_name["phase.inspect"]["id"]
+    assert by_name["phase.inspect"]["parent"] == by_name["grade"]["id"]
+    assert by_name["grade"]["parent"] is None
+    assert by_name["phase.failing"]["attrs"]["error"] == "ValueError"
+    assert req.seconds >= by_name["phase.inspect"]["seconds"]
+
+
+def _timed(name):
+    with metrics.span(name):
+        pass
+
+
+def test_histogram_quantiles_and_buckets():
+    h = Histogram((1, 10, 100))
+    for value in range(1, 101):
+        h.observe(value)
+    assert h.quantile(0.5) == 51 and h.quantile(0.99) == 100
+    assert h.counts == [1, 9, 90, 0] and h.count == 100 and h.sum == 5050
+
+
+def test_prometheus_export():
+    registry = Registry()
+    registry.inc("executor.failures", kind="timeout")
+    registry.inc("executor.failures", 2, kind="timeout")
+    registry.observe("span_seconds", 0.2, span="phase.inspect")
+    registry.register_collector("llm_cache", lambda: {"hits": 3, "enabled": True})
+    registry.register_collector("closed", lambda: 1 / 0)
+    text = registry.prometheus_text()
+    assert 'codealigner_executor_failures_total{kind="timeout"} 3' in text
+    assert 'codealigner_span_seconds_bucket{span="phase.inspect",le="0.25"} 1' in text
+    assert 'codealigner_span_seconds_count{span="phase.inspect"} 1' in text
+    assert "codealigner_llm_cache_hits 3" in text and "enabled" not in text
+    assert registry.summary()[0]["metric"] == "span_seconds span=phase.inspect"
@@ -0,0 +1,60 @@
+import module_cache
+from module_cache import load_module
+
+REBINDS = """
+total = 0
+
+class Solution:
+    def add(self, x):
+        global total
+        total += x
+        Solution.seen = x
+        return total
+"""
+
+MEMO = """
+memo = {}
+
+def fib(n):
+    memo[n] = memo.get(n, 0) + 1
+    return len(memo)
+"""
+
+COUNTER = """
+def tick():
+    tick.calls = getattr(tick, "calls", 0) + 1
+    return tick.calls
+"""
+
+
+def test_source_is_compiled_and_executed_once():
+    code = "def f(x):\n    return x + 1\n"
+    before = module_cache.stats()
+    first = load_module(code)
+    assert load_module(code) is first
+    assert module_cache.compile_cached(code) is first.code_obj
+    after = module_cache.stats()
+    assert after["compiled"] - before["compiled"] == 1
+    assert after["loaded"] - before["loaded"] == 1
+
+
+def test_rebound_globals_and_class_attributes_are_restored():
+    module = load_module(REBINDS)
+    assert module.reusable
+    assert [module.entry("add", is_class=True)(5) for _ in range(3)] == [5, 5, 5]
+    module.entry("add", is_class=True)
+    assert not hasattr(module.globals["Solution"], "seen")
+
+
+def test_mutable_module_state_is_reexecuted():
+    module = load_module(MEMO)
+    assert not module.reusable
+    before = module_cache.stats()["reexecs"]
+    assert [module.entry("fib")(1) for _ in range(3)] == [1, 1, 1]
+    assert module_cache.stats()["reexecs"] - before == 2
+
+
+def test_function_attributes_are_cleared():
+    module = load_module(COUNTER)
+    assert module.reusable
+    assert [module.entry("tick")() for _ in range(3)] == [1, 1, 1]
@@ -0,0 +1,31 @@
+from pipeline import Phase, PhaseSkipped, run_phases
+
+
+def fail(r):
+    raise RuntimeError("search backend down")
+
+
+def test_failed_optional_dep_is_missing_not_fatal():
+    phases = [
+        Phase("inspect", lambda r: {"slug": "two-sum"}),
+        Phase("vector_search", fail),
+        Phase("reference", lambda r: (r["inspect"]["slug"], r.get("vector_search")),
+              deps=["inspect"], optional=["vector_search"]),
+        Phase("family", lambda r: r["reference"][0], deps=["reference"]),
+    ]
+    results, timings, errors = run_phases(phases)
+    assert results["reference"] == ("two-sum", None)
+    assert results["family"] == "two-sum"
+    assert set(errors) == {"vector_search"}
+
+
+def test_failed_dep_skips_its_dependents():
+    phases = [
+        Phase("inspect", fail),
+        Phase("reference", lambda r: r["inspect"], deps=["inspect"]),
+        Phase("family", lambda r: r["reference"], deps=["reference"]),
+    ]
+    results, _, errors = run_phases(phases)
+    assert results == {}
+    assert isinstance(errors["reference"], PhaseSkipped)
+    assert isinstance(errors["family"], PhaseSkipped)
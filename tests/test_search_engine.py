@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import types
+import time
+import sys
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+from lexical_index import BM25Index
+from search_engine import SearchEngine, get_engine
+from slug_index import SlugIndex
+from vector_backends import distance
+
+DOCUMENTS = {
+    "1": ("two-sum", "def two_sum(nums, target):\n    seen = {}\n    return seen\n"),
+    "2": ("contains-duplicate", "def contains_duplicate(nums):\n    return len(set(nums)) != len(nums)\n"),
+}
+
+
+class CharModel:
+    """Deterministic stand-in for the sentence model: normalised letter counts."""
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **_):
+        self.calls.append(list(texts))
+        vectors = np.array([[t.count(c) for c in "abcdefghijklmnopqrstuvwxyz"] for t in texts], dtype=float)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class NoVectors:
+    """A backend that has no vector stored for any document."""
+    space = "l2"
+
+    def query(self, query_vectors, top_k):
+        return [[] for _ in query_vectors]
+
+    def distances(self, query_vector, ids):
+        return {}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SearchEngine(db_path=str(tmp_path))
+    engine._slug_index = SlugIndex()
+    for doc_id, (name, code) in DOCUMENTS.items():
+        engine._slug_index.add(doc_id, name, code)
+    engine._lexical_index = BM25Index({d: code for d, (_, code) in DOCUMENTS.items()})
+    engine._embedding_cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+    engine._model = CharModel()
+    engine._backend = NoVectors()
+    yield engine
+    engine.close()
+
+
+def test_slug_hit_has_full_confidence(engine):
+    code, confidence = engine.find_solution("anything", predicted_slug="Two Sum")
+    assert (code, confidence) == (DOCUMENTS["1"][1], 1.0)
+
+
+def test_lexical_only_match_gets_its_vector_similarity(engine):
+    query = "def contains_duplicate(values):\n    return len(set(values)) != len(values)\n"
+    code, confidence = engine.find_solution(query)
+    assert code == DOCUMENTS["2"][1]
+    vectors = CharModel().encode([query, code]).tolist()
+    assert confidence == pytest.approx(1 - distance(vectors[0], vectors[1], "l2"))
+    assert confidence > 0.5  # not coerced to 0.0
+
+    best = engine.find_solutions([query], top_k=2)[0][0]
+    assert best["source"] == "lexical"
+    assert best["confidence"] == pytest.approx(confidence)
+    assert 0 < best["score"] <= 1
+
+
+def test_model_is_loaded_once_on_first_use(tmp_path, monkeypatch):
+    loads = []
+
+    def load(name):
+        loads.append(threading.get_ident())
+        time.sleep(0.05)  # a slow load: concurrent first users must wait for it, not start their own
+        return CharModel()
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=load))
+    engine = SearchEngine(db_path=str(tmp_path))
+    assert engine._model is None and engine._collection is None
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: engine.model, range(8)))
+    assert len(loads) == 1
+    assert all(m is models[0] for m in models)
+
+    engine.close()
+    assert engine._model is None
+    engine.model
+    assert len(loads) == 2
+
+
+def test_engine_is_shared():
+    assert get_engine() is get_engine()
+
+
+def test_batch_puts_slug_hits_first_and_embeds_once(engine):
+    queries = ["def contains_duplicate(a):\n    return len(set(a)) != len(a)\n",
+               "def two_sum(nums, target):\n    return {}\n"]
+    ranked = engine.find_solutions(queries, slugs=[None, "two-sum"], top_k=2)
+    assert [c["id"] for c in ranked[0]] == ["2", "1"]
+    assert ranked[1][0]["source"] == "slug" and ranked[1][0]["id"] == "1"
+    assert [c["id"] for c in ranked[1]] == ["1", "2"]  # no duplicate of the slug hit
+    assert engine._model.calls[0] == queries  # one encode for the whole batch
+
+    with pytest.raises(ValueError):
+        engine.find_solutions(queries, slugs=["two-sum"])
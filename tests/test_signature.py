@@ -0,0 +1,33 @@
+from signature import analyze_signature, signature_metadata, signature_from_metadata
+
+WITH_HELPER = """
+class Solution:
+    def dfs(self, grid, r, c):
+        return 0
+
+    def numIslands(self, grid: List[List[str]]) -> int:
+        return self.dfs(grid, 0, 0)
+"""
+
+
+def test_entry_point_skips_helpers_the_solution_calls():
+    sig = analyze_signature(WITH_HELPER)
+    assert (sig["class"], sig["entry_point"], sig["arity"]) == ("Solution", "numIslands", 1)
+    method = next(m for m in sig["methods"] if m["name"] == "numIslands")
+    assert method["params"] == [{"name": "grid", "annotation": "List[List[str]]"}]
+    assert method["returns"] == "int"
+
+
+def test_plain_function_and_unusable_code():
+    sig = analyze_signature("def helper_first(a, b):\n    return a\n\ndef other():\n    pass\n")
+    assert (sig["class"], sig["entry_point"], sig["arity"]) == (None, "helper_first", 2)
+    assert analyze_signature("x = 1\n") is None
+    assert analyze_signature("def broken(:\n") is None
+
+
+def test_metadata_round_trip():
+    meta = signature_metadata(WITH_HELPER)
+    assert meta["entry_point"] == "numIslands" and meta["arity"] == 1
+    assert signature_from_metadata(meta) == analyze_signature(WITH_HELPER)
+    assert signature_metadata("x = 1\n") == {}
+    assert signature_from_metadata({}) is None
@@ -0,0 +1,87 @@
+import pytest
+
+from slug_index import SlugIndex, normalize_slug, invalidate_snapshot
+
+
+class PagedCollection:
+    """The parts of a Chroma collection SlugIndex reads."""
+    def __init__(self, rows):
+        self.rows = rows  # [(id, metadata, document)]
+        self.scans = 0
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, include, limit, offset):
+        if not offset:
+            self.scans += 1
+        page = self.rows[offset:offset + limit]
+        return {"ids": [r[0] for r in page], "metadatas": [r[1] for r in page],
+                "documents": [r[2] for r in page]}
+
+
+ROWS = [
+    ("0", {"name": "1. Two Sum"}, "def two_sum(): ..."),
+    ("1", {"name": "Pow(x, n)"}, "def my_pow(): ..."),
+]
+
+
+@pytest.mark.parametrize("query", ["two-sum", "Two Sum", "twosum", "1. Two Sum", "two_sum"])
+def test_title_variants_resolve_to_the_same_document(query):
+    index = SlugIndex()
+    for doc_id, meta, doc in ROWS:
+        index.add(doc_id, meta["name"], doc, meta)
+    assert index.lookup(query)[0] == "0"
+
+
+def test_unknown_slug_misses():
+    index = SlugIndex()
+    index.add("0", "two-sum", "code")
+    assert index.lookup("three-sum") == (None, None)
+    assert normalize_slug("Pow(x, n)") == "powx-n"
+
+
+def test_primary_solution_owns_the_aliases():
+    index = SlugIndex()
+    index.add("0.1", "two-sum", "brute force", {"variant": 1})
+    index.add("0", "two-sum", "hash map", {"variant": 0})
+    assert index.lookup("two-sum")[0] == "0"
+
+
+def test_snapshot_is_reused_until_the_collection_changes(tmp_path):
+    collection = PagedCollection(list(ROWS))
+    first = SlugIndex.load_or_build(collection, str(tmp_path))
+    again = SlugIndex.load_or_build(collection, str(tmp_path))
+    assert collection.scans == 1
+    assert again.lookup("powx-n")[0] == first.lookup("powx-n")[0] == "1"
+
+    collection.rows.append(("2", {"name": "Valid Palindrome"}, "def is_pal(): ..."))
+    assert SlugIndex.load_or_build(collection, str(tmp_path)).lookup("valid-palindrome")[0] == "2"
+    assert collection.scans == 2
+
+    invalidate_snapshot(str(tmp_path))
+    SlugIndex.load_or_build(collection, str(tmp_path))
+    assert collection.scans == 3
+
+
+def test_solutions_lists_every_variant_primary_first():
+    index = SlugIndex()
+    index.add("0.2", "two-sum", "sort", {"problem": "two-sum", "variant": 2, "approach": "sorting"})
+    index.add("0", "two-sum", "hash map", {"problem": "two-sum", "variant": 0, "approach": "hash-map"})
+    index.add("0.1", "two-sum", "brute force", {"problem": "two-sum", "variant": 1, "approach": "brute-force"})
+    index.add("1", "Pow(x, n)", "def my_pow(): ...")  # no problem metadata: grouped by its slug
+    assert [d for d, _ in index.solutions("Two Sum")] == ["0", "0.1", "0.2"]
+    assert [d for d, _ in index.solutions("two-sum", approach="brute-force")] == ["0.1"]
+    assert index.where(problem="powx-n") == {"1"}
+    assert index.where(approach="heap") == set()
+    assert index.solutions("three-sum") == []
+
+
+def test_secondary_index_is_rebuilt_from_a_snapshot(tmp_path):
+    rows = [("0", {"name": "1. Two Sum", "problem": "two-sum", "variant": 0}, "hash map"),
+            ("0.1", {"name": "1. Two Sum", "problem": "two-sum", "variant": 1}, "brute force")]
+    SlugIndex.load_or_build(PagedCollection(rows), str(tmp_path))
+    collection = PagedCollection(rows)
+    index = SlugIndex.load_or_build(collection, str(tmp_path))
+    assert collection.scans == 0
+    assert [d for d, _ in index.solutions("two-sum")] == ["0", "0.1"]
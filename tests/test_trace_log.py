@@ -0,0 +1,64 @@
+import os
+import pickle
+
+import pytest
+
+from trace_log import TraceLog, TraceLimitExceeded, CHECKPOINT_EVERY
+
+
+def record(i):
+    return i, i % 7 + 1, {"i": str(i), "name": "é" * (i % 3)} if i % 5 else {}
+
+
+def filled(n, ring_size=100):
+    log = TraceLog(ring_size=ring_size)
+    for i in range(n):
+        log.append(*record(i))
+    return log
+
+
+def as_dicts(rng):
+    return [{"step": s, "line": l, "vars": v} for s, l, v in map(record, rng)]
+
+
+def test_pages_come_back_from_disk_in_order():
+    n = 3 * CHECKPOINT_EVERY + 17
+    log = filled(n)
+    assert len(log) == n
+    assert len(log.ring) == 100  # memory stays bounded
+    assert log.page(0, page_size=50) == as_dicts(range(50))
+    middle = CHECKPOINT_EVERY - 10  # a page across a block boundary
+    assert log.page(1, page_size=middle) == as_dicts(range(middle, 2 * middle))
+    assert log.page(log.pages(50) - 1, page_size=50) == as_dicts(range(n - n % 50, n))
+    assert log.page(log.pages(50), page_size=50) == []
+    assert log.tail(5) == as_dicts(range(n - 5, n))
+    assert list(log) == as_dicts(range(n))
+    log.close()
+
+
+def test_handoff_moves_the_spill_file_to_the_adopter():
+    log = filled(CHECKPOINT_EVERY + 3)
+    state = pickle.loads(pickle.dumps(log.handoff()))
+    path = state["path"]
+    del log
+    assert os.path.exists(path)  # the writer no longer owns it
+
+    adopted = TraceLog.adopt(state)
+    assert list(adopted) == as_dicts(range(CHECKPOINT_EVERY + 3))
+    assert adopted.page(0, page_size=10) == as_dicts(range(10))
+    adopted.close()
+    assert not os.path.exists(path)
+
+
+def test_byte_budget_stops_the_trace():
+    log = TraceLog(max_bytes=4096)
+    with pytest.raises(TraceLimitExceeded):
+        for i in range(10 * CHECKPOINT_EVERY):
+            log.append(i, 1, {"x": "y" * 20})
+    assert log.bytes <= 4096
+    log.close()
+
+
+def test_count_only_runs_never_touch_disk():
+    log = TraceLog()
+    assert log.path is None and list(log) == [] and log.page(0) == []
@@ -0,0 +1,123 @@
+import re
+
+import pytest
+
+from artifacts import compile_solution
+from tracer import CodeTracer, snapshot, RETURN_VAR
+
+MUTATIONS = """
+from collections import Counter, defaultdict, deque
+
+def helper(xs):
+    xs.append(7)
+
+def solve(n):
+    a = list(range(40))
+    a[5] = 99; a[6] = 98
+    a.sort()
+    b = a
+    b.append(-1)
+    b += [3]
+    grid = [[0] * 30 for _ in range(30)]
+    row = grid[2]
+    row[3] = 1
+    grid[4][5] = 2
+    memo = {}
+    for i in range(30):
+        memo[i] = i * i
+    memo[3] = -1
+    seen = set()
+    for i in range(25):
+        seen.add(i)
+    c = Counter("abracadabra" * 3)
+    c["z"] += 1
+    d = defaultdict(list)
+    d[1].append(2)
+    q = deque(range(30))
+    q.appendleft(-5)
+    q.pop()
+    helper(a)
+    def push(v):
+        a.append(v)
+    push(11)
+    a[0] = 1000
+    for i in range(len(a) - 1):
+        if a[i] > a[i + 1]:
+            a[i], a[i + 1] = a[i + 1], a[i]
+    dp = [0] * 50
+    for i in range(2, 50):
+        dp[i] = dp[i - 1] + i
+    return len(a)
+"""
+
+
+class NaiveTracer(CodeTracer):
+    """Reference behaviour: re-snapshots every local on every line."""
+    def _frame_tracer(self, code):
+        previous = {}
+
+        def changes(frame):
+            changed = {}
+            for name, value in frame.f_locals.items():
+                if name.startswith('_') or name == 'self':
+                    continue
+                shot = snapshot(value)
+                if previous.get(name) != shot:
+                    changed[name] = previous[name] = shot
+            return changed
+
+        def trace_lines(frame, event, arg):
+            if event == 'line':
+                self.steps += 1
+                self.log.append(self.steps, frame.f_lineno, changes(frame))
+            elif event == 'return':
+                changed = changes(frame)
+                changed[RETURN_VAR] = snapshot(arg)
+                self.log.append(self.steps, frame.f_lineno, changed)
+            return trace_lines
+        return trace_lines
+
+
+def records(log, elements=False):
+    """(step, line, vars) with object addresses masked; element entries only if asked for."""
+    return [(r["step"], r["line"], {k: re.sub(r" at 0x[0-9a-f]+", "", v) for k, v in r["vars"].items()
+                                    if elements or "[" not in k})
+            for r in log]
+
+
+@pytest.mark.parametrize("source", [False, True], ids=["bytecode", "source"])
+def test_full_mode_records_what_re_snapshotting_every_line_records(source):
+    code = MUTATIONS if source else compile_solution(MUTATIONS)
+    result, log = CodeTracer("full").run(code, "solve", (5,))
+    expected, naive_log = NaiveTracer("full").run(code, "solve", (5,))
+    assert result == expected == 44
+    assert records(log) == records(naive_log)
+
+
+def test_in_place_write_past_the_first_elements_is_recorded():
+    code = """
+def solve():
+    a = list(range(40))
+    a[5] = 99; a[6] = 98
+    a[30] = -1
+    return a
+"""
+    _, log = CodeTracer("full").run(compile_solution(code), "solve", ())
+    shots = [r["vars"]["a"] for r in log if "a" in r["vars"]]
+    assert len(shots) == 2  # the line after a[30] = -1 changes nothing snapshot() shows
+    assert "99, 98" in shots[1] and shots[1].endswith("... (40 items)]")
+
+
+def test_item_stores_outside_the_snapshot_get_element_entries():
+    _, log = CodeTracer("full").run(MUTATIONS, "solve", (5,))
+    entries = {k: v for r in log for k, v in r["vars"].items() if k.startswith("dp[")}
+    assert entries["dp[49]"] == "1224"
+    assert "dp[5]" not in entries  # within the first MAX_HEAD items: the dp entry shows it
+
+
+def test_snapshot_shows_size_of_truncated_containers():
+    assert snapshot(list(range(3))) == "[0, 1, 2]"
+    assert snapshot(list(range(40))).endswith(", 19, ... (40 items)]")
+    assert snapshot({i: i for i in range(25)}).endswith("19: 19, ... (25 items)}")
+    assert snapshot(set()) == "set()"
+    assert snapshot((1,)) == "(1,)"
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import vector_backends
+from vector_backends import FlatInt8Backend, distance, make_backend, invalidate_flat_index
+
+
+class EmbeddingCollection:
+    def __init__(self, vectors):
+        self.ids = [f"doc-{i}" for i in range(len(vectors))]
+        self.vectors = vectors
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, include, limit, offset):
+        return {"ids": self.ids[offset:offset + limit], "embeddings": self.vectors[offset:offset + limit]}
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=(500, 32)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    # Several pages and scan chunks even on a small index
+    monkeypatch.setattr(vector_backends, "PAGE_SIZE", 64)
+    monkeypatch.setattr(vector_backends, "SCAN_CHUNK", 100)
+
+
+def test_int8_index_finds_the_exact_neighbours(tmp_path, vectors):
+    backend = make_backend("flat-int8", EmbeddingCollection(vectors), str(tmp_path))
+    queries = vectors[:20] + 0.05
+    found = backend.query(queries.tolist(), 10)
+    recalled = 0
+    for q, hits in zip(queries, found):
+        exact = np.argsort(((vectors - q) ** 2).sum(axis=1))[:10]
+        recalled += len({f"doc-{i}" for i in exact} & {doc_id for doc_id, _ in hits})
+        assert [d for _, d in hits] == sorted(d for _, d in hits)
+    assert recalled / 200 >= 0.95
+
+    doc_id, dist = found[0][0]
+    assert backend.distances(queries[0].tolist(), [doc_id])[doc_id] == pytest.approx(dist, abs=1e-3)
+    assert dist == pytest.approx(distance(queries[0].tolist(), vectors[int(doc_id[4:])].tolist()), abs=0.01)
+
+
+def test_index_is_re_exported_when_the_collection_changes(tmp_path, vectors):
+    collection = EmbeddingCollection(vectors[:100])
+    assert make_backend("flat-int8", collection, str(tmp_path)).count == 100
+    collection = EmbeddingCollection(vectors)
+    assert make_backend("flat-int8", collection, str(tmp_path)).count == 500
+    invalidate_flat_index(str(tmp_path))
+    assert make_backend("flat-int8", collection, str(tmp_path)).count == 500
+
+
+def test_empty_index_and_unknown_backend(tmp_path):
+    FlatInt8Backend.build(EmbeddingCollection(np.zeros((0, 4))), str(tmp_path / "flat"))
+    assert FlatInt8Backend(str(tmp_path / "flat")).query([[0.0] * 4], 5) == [[]]
+    with pytest.raises(ValueError):
+        make_backend("faiss", EmbeddingCollection(np.zeros((0, 4))), str(tmp_path))
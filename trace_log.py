@@ -0,0 +1,222 @@
+from collections import deque
+from bisect import bisect_right
+from array import array
+import tempfile
+import weakref
+import struct
+import os
+
+# --- CONFIGURATION ---
+MAX_STEPS = int(os.getenv("CODEALIGNER_MAX_STEPS", 1_000_000))           # executed lines per run
+MAX_BYTES = int(os.getenv("CODEALIGNER_MAX_TRACE_BYTES", 64 * 1024 * 1024))  # spilled trace size per run
+RING_SIZE = 1000        # most recent records kept in memory
+CHECKPOINT_EVERY = 256  # records per spilled block; one file offset remembered per block (for paging)
+PAGE_SIZE = 100
+
+_BLOCK = struct.Struct("<II")  # records in the block, bytes of its values section
+_VAR = struct.Struct("<HI")    # var id, value length (utf-8 bytes follow)
+
+
+class TraceLimitExceeded(BaseException):
+    """
+    Raised from inside the trace hook when a run blows its step/byte budget.
+    A BaseException so a user's `except Exception:` can't swallow it.
+    """
+
+
+class TraceLog:
+    """
+    Append-only trace of (step, line, changed vars) records.
+
+    Records are buffered and written to a temp file a block of up to
+    CHECKPOINT_EVERY at a time (their steps, lines and var counts as packed
+    arrays, then the var-id/length-prefixed values), so the tracer's per-line
+    cost is a list append. Only the last RING_SIZE records and one offset per
+    block stay in memory, so memory is bounded no matter how long the traced
+    code runs. Readers page through the file (page(), __iter__) without loading it.
+    """
+    def __init__(self, max_bytes=MAX_BYTES, ring_size=RING_SIZE, path=None):
+        self.max_bytes = max_bytes
+        self.ring = deque(maxlen=ring_size)
+        self.count = 0
+        self.bytes = 0
+        self.names = []        # var id -> name
+        self._ids = {}         # name -> var id
+        self._checkpoints = array("Q")  # file offset of every block
+        self._starts = array("Q")       # index of every block's first record
+        self._pending = []
+        self.path = path
+        self._file = None       # created on the first block (count-only runs never touch disk)
+        self._finalizer = None
+
+    def _open(self):
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(prefix="codealigner-trace-", suffix=".bin")
+            os.close(fd)
+            self._file = open(self.path, "wb", buffering=1024 * 1024)
+            self._finalizer = weakref.finalize(self, _cleanup, self._file, self.path)
+        else:
+            self._file = open(self.path, "wb", buffering=1024 * 1024)
+
+    def __len__(self):
+        return self.count + len(self._pending)
+
+    def append(self, step, line, changed):
+        pending = self._pending
+        pending.append((step, line, changed))
+        if len(pending) >= CHECKPOINT_EVERY:
+            self._spill()
+
+    def _spill(self):
+        """Writes the buffered records as one block (TraceLimitExceeded past max_bytes)."""
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        n = len(pending)
+        values = []
+        ids = self._ids
+        for _, _, changed in pending:
+            for name, value in changed.items():
+                var_id = ids.get(name)
+                if var_id is None:
+                    var_id = ids[name] = len(self.names)
+                    self.names.append(name)
+                data = value.encode("utf-8", "replace")
+                values.append(_VAR.pack(var_id, len(data)))
+                values.append(data)
+        values = b"".join(values)
+        blob = b"".join((_BLOCK.pack(n, len(values)),
+                         struct.pack(f"<{n}I{n}I{n}H", *[r[0] for r in pending], *[r[1] for r in pending],
+                                     *[len(r[2]) for r in pending]),
+                         values))
+        if self.bytes + len(blob) > self.max_bytes:
+            raise TraceLimitExceeded(f"Trace exceeded {self.max_bytes:,} bytes "
+                                     f"after {pending[-1][0]} steps (possible infinite loop)")
+        if self._file is None:
+            self._open()
+        self._checkpoints.append(self.bytes)
+        self._starts.append(self.count)
+        self._file.write(blob)
+        self.bytes += len(blob)
+        self.count += n
+        self.ring.extend(pending)
+
+    def finish(self):
+        """Writes buffered records and flushes; call before handing the log to readers."""
+        self._spill()
+        if self._file is not None and not self._file.closed:
+            self._file.flush()
+        return self
+
+    def close(self):
+        """Closes the spill file and deletes it (if this log created or adopted it)."""
+        self._pending = []
+        if self._finalizer is not None:
+            self._finalizer()
+        elif self._file is not None and not self._file.closed:
+            self._file.close()
+
+    # --- CROSS-PROCESS HAND-OFF ---
+    def handoff(self):
+        """
+        Closes the log for writing and returns a picklable state dict.
+        Ownership of the spill file moves to whoever calls TraceLog.adopt(state).
+        """
+        self._spill()
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        return {
+            "path": self.path, "count": self.count, "bytes": self.bytes, "max_bytes": self.max_bytes,
+            "names": self.names, "checkpoints": self._checkpoints.tobytes(), "starts": self._starts.tobytes(),
+            "ring": list(self.ring), "ring_size": self.ring.maxlen,
+        }
+
+    @classmethod
+    def adopt(cls, state):
+        """Read-only TraceLog over a file produced by handoff() (deleted when this log is)."""
+        log = cls(max_bytes=state["max_bytes"], ring_size=state["ring_size"], path=state["path"])
+        log.count, log.bytes, log.names = state["count"], state["bytes"], state["names"]
+        log._checkpoints.frombytes(state["checkpoints"])
+        log._starts.frombytes(state["starts"])
+        log.ring.extend(state["ring"])
+        if log.path is not None:
+            log._finalizer = weakref.finalize(log, _remove, log.path)
+        return log
+
+    # --- READERS ---
+    def page(self, number, page_size=PAGE_SIZE):
+        """Records [number * page_size, (number + 1) * page_size) as dicts."""
+        self.finish()
+        start = max(0, number * page_size)
+        stop = min(self.count, start + page_size)
+        if start >= stop:
+            return []
+
+        ring_start = self.count - len(self.ring)
+        if start >= ring_start:
+            return [_as_dict(r) for r in list(self.ring)[start - ring_start:stop - ring_start]]
+
+        block = bisect_right(self._starts, start) - 1
+        index = self._starts[block]
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(self._checkpoints[block])
+            while index < stop:
+                for record in self._read_block(f):
+                    if start <= index < stop:
+                        records.append(_as_dict(record))
+                    index += 1
+        return records
+
+    def pages(self, page_size=PAGE_SIZE):
+        return (self.count + page_size - 1) // page_size
+
+    def tail(self, n=PAGE_SIZE):
+        self.finish()
+        return [_as_dict(r) for r in list(self.ring)[-n:]]
+
+    def __iter__(self):
+        self.finish()
+        if not self.count:
+            return
+        with open(self.path, "rb") as f:
+            for _ in self._starts:
+                for record in self._read_block(f):
+                    yield _as_dict(record)
+
+    def _read_block(self, f):
+        n, size = _BLOCK.unpack(f.read(_BLOCK.size))
+        columns = struct.unpack(f"<{n}I{n}I{n}H", f.read(10 * n))
+        values = f.read(size)
+        at = 0
+        records = []
+        for step, line, nvars in zip(columns[:n], columns[n:2 * n], columns[2 * n:]):
+            changed = {}
+            for _ in range(nvars):
+                var_id, length = _VAR.unpack_from(values, at)
+                at += _VAR.size
+                changed[self.names[var_id]] = values[at:at + length].decode("utf-8", "replace")
+                at += length
+            records.append((step, line, changed))
+        return records
+
+
+def _as_dict(record):
+    step, line, changed = record
+    return {"step": step, "line": line, "vars": changed}
+
+
+def _cleanup(file, path):
+    file.close()
+    _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
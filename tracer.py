@@ -1,48 +1,462 @@
+from collections import Counter, deque
+from functools import lru_cache
+from itertools import islice
+import reprlib
+import weakref
 import sys
-from typing import List 
+import dis
+import ast
 
-class CodeTracer:
+from trace_log import TraceLog, TraceLimitExceeded, MAX_STEPS, MAX_BYTES
+from module_cache import SOURCE_NAME, load_module  # traced code is compiled under SOURCE_NAME; other frames are ignored
+
+# --- CONFIGURATION ---
+MODES = ("count", "lines", "full")
+RETURN_VAR = "<return>"     # full mode: pseudo-variable holding a call's return value (not a valid name)
+_HAS_MONITORING = hasattr(sys, "monitoring")  # Python 3.12+
+
+
+class _SnapshotRepr(reprlib.Repr):
+    """Bounded repr for objects snapshot() doesn't render itself (instances, other types)."""
     def __init__(self):
-        self.log = []
+        super().__init__()
+        self.maxlevel = 3
+        self.maxstring = self.maxother = 80
+        self.maxlong = 60
+
+
+_bounded_repr = _SnapshotRepr().repr
+_ATOMS = {int, float, bool, str, bytes, complex, type(None)}
+MAX_HEAD = 20   # elements shown per container, at every nesting level
+MAX_LEVEL = 3   # nesting levels shown; containers below that are elided
+MAX_FLAT = 400  # chars of a flat container's C repr before it is rendered element by element
+_JUMPS = set(dis.hasjrel) | set(dis.hasjabs) | set(getattr(dis, "hasjump", ()))
+_STOPS = {"RETURN_VALUE", "RETURN_CONST", "RAISE_VARARGS", "RERAISE"}
+_UNCONDITIONAL = {"JUMP_FORWARD", "JUMP_BACKWARD", "JUMP_ABSOLUTE", "JUMP", "JUMP_BACKWARD_NO_INTERRUPT",
+                  "JUMP_NO_INTERRUPT"}
+# Can change an object in place: item/attribute stores, calls (any function may mutate its arguments)
+_IN_PLACE = {"STORE_SUBSCR", "DELETE_SUBSCR", "STORE_ATTR", "DELETE_ATTR", "STORE_SLICE", "DELETE_SLICE",
+             "BEFORE_WITH", "SETUP_WITH"}
+_REBINDS = ("STORE_FAST", "DELETE_FAST", "STORE_DEREF", "DELETE_DEREF")
+_INDEX_NODES = (ast.Name, ast.Constant, ast.BinOp, ast.UnaryOp, ast.Tuple, ast.Load,
+                ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod, ast.LShift, ast.RShift,
+                ast.BitAnd, ast.BitOr, ast.BitXor, ast.USub, ast.UAdd)
+_NO_BUILTINS = {"__builtins__": {}}
+_MISSING = object()
+_ANYTHING = ((), True)  # effects of a stretch not in the table (the first line of a call)
+_line_effects = weakref.WeakKeyDictionary()  # code object -> {start offset: (rebound names, in place)}
+
+
+def _head(value):
+    """
+    (size, elements) for the containers snapshot() renders from their head,
+    None for anything else. A dict's elements are its first keys, then their values.
+    """
+    t = type(value)
+    if t is list or t is tuple:
+        return len(value), value[:MAX_HEAD]
+    if isinstance(value, dict):
+        return len(value), (*islice(value, MAX_HEAD), *islice(value.values(), MAX_HEAD))
+    if isinstance(value, (set, frozenset, deque)):
+        return len(value), tuple(islice(value, MAX_HEAD))
+    return None
+
+
+def snapshot(value, level=MAX_LEVEL):
+    """
+    Bounded, cheap stand-in for repr(value). Containers show their first MAX_HEAD
+    elements (C repr when they are flat) and their size when that isn't all of them.
+    """
+    t = type(value)
+    if t in _ATOMS:
+        if t is str and len(value) > 80:
+            return repr(value[:80]) + "..."
+        if t is int and value.bit_length() > 200:
+            return f"<int with {value.bit_length()} bits>"
+        return repr(value)
+    shown = _head(value)
+    if shown is None:
+        return _bounded_repr(value)
+    size, head = shown
+    is_dict = isinstance(value, dict)
+    if t is list or t is tuple:
+        left, right = ("[", "]") if t is list else ("(", ")")
+    elif is_dict:
+        left, right = ("{", "}") if t is dict else (f"{t.__name__}({{", "})")
+    elif t is set:
+        left, right = ("{", "}") if size else ("set(", ")")
+    else:
+        left, right = (f"{t.__name__}({{", "})") if t is not deque else ("deque([", "])")
+    if level <= 0:
+        return f"{left}...{right}"
+
+    text = None
+    if all(type(x) in _ATOMS for x in head):
+        if is_dict:
+            n = len(head) // 2
+            text = repr(dict(zip(head[:n], head[n:])))[1:-1]
+        else:
+            text = repr(list(head) if t is not list else head)[1:-1]
+        if len(text) > MAX_FLAT:
+            text = None
+    if text is None:
+        if is_dict:
+            n = len(head) // 2
+            text = ", ".join(f"{snapshot(k, level - 1)}: {snapshot(v, level - 1)}"
+                             for k, v in zip(head[:n], head[n:]))
+        else:
+            text = ", ".join(snapshot(x, level - 1) for x in head)
+    if t is tuple and size == 1:
+        text += ","
+    if size > MAX_HEAD:
+        text += f", ... ({size} items)"
+    return left + text + right
+
+
+def _probe(value, level=MAX_LEVEL):
+    """
+    Everything snapshot(value) shows, as identities: size and shown elements, and
+    the same for shown containers inside it. Equal probes of the same object mean
+    an equal snapshot. None if that can't be told (always re-snapshot).
+    The probe holds the shown elements too, so their ids can't be reused.
+    """
+    shown = _head(value)
+    if shown is None:
+        # Default repr is just the address; anything else may read any state
+        return () if type(value).__repr__ is object.__repr__ else None
+    size, head = shown
+    ids = tuple(map(id, head))
+    if level > 1:
+        nested = tuple(_probe(x, level - 1) for x in head if type(x) not in _ATOMS)
+        if nested:
+            return size, ids, nested, head
+    return size, ids, head
+
+
+def _effects(code):
+    """
+    {offset a line starts executing at: (locals it can rebind, whether it can change
+    an object in place)}, read off the bytecode. A stretch runs until the line
+    changes, following jumps that stay on it.
+    """
+    table = _line_effects.get(code)
+    if table is not None:
+        return table
+    instructions = list(dis.get_instructions(code))
+    index = {ins.offset: i for i, ins in enumerate(instructions)}
+    lines = {off: ln for start, stop, ln in code.co_lines() for off in range(start, stop, 2)}
+    starts = {ins.offset for k, ins in enumerate(instructions)
+              if k == 0 or ins.is_jump_target or lines.get(ins.offset) != lines.get(instructions[k - 1].offset)}
+    table = {}
+    for start in starts:
+        line = lines.get(start)
+        names, in_place = set(), False
+        todo, seen = [index[start]], set()
+        while todo:
+            k = todo.pop()
+            while k < len(instructions) and k not in seen:
+                ins = instructions[k]
+                if k != index[start] and lines.get(ins.offset) not in (line, None):
+                    break
+                seen.add(k)
+                op = ins.opname
+                if op.startswith(_REBINDS):
+                    names.update(ins.argval if isinstance(ins.argval, tuple) else (ins.argval,))
+                elif op in _IN_PLACE or op.startswith("CALL"):
+                    in_place = True
+                if op in _STOPS:
+                    break
+                if ins.opcode in _JUMPS and isinstance(ins.argval, int) and ins.argval in index:
+                    todo.append(index[ins.argval])
+                    if op in _UNCONDITIONAL:
+                        break
+                k += 1
+        table[start] = (tuple(n for n in names if not n.startswith('_') and n != 'self'), in_place)
+    _line_effects[code] = table
+    return table
+
+
+def _simple_index(node):
+    return all(isinstance(n, _INDEX_NODES) for n in ast.walk(node))
+
+
+@lru_cache(maxsize=64)
+def _element_writes(source):
+    """
+    {line: [(container local, compiled indices, label format)]} for item stores
+    with plain arithmetic indices (dp[i] = ..., grid[r][c] += ..., a[i], a[j] = ...)
+    whose index variables the statement doesn't rebind. {} if source doesn't parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return {}
+    writes = {}
+    for stmt in ast.walk(tree):
+        if isinstance(stmt, ast.Assign):
+            targets = stmt.targets
+        elif isinstance(stmt, (ast.AugAssign, ast.AnnAssign)):
+            targets = [stmt.target]
+        else:
+            continue
+        flat = []
+        for target in targets:
+            flat += target.elts if isinstance(target, (ast.Tuple, ast.List)) else [target]
+        rebound = {n.id for target in targets for n in ast.walk(target)
+                   if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+        for target in flat:
+            indices = []
+            node = target
+            while isinstance(node, ast.Subscript):
+                indices.append(node.slice)
+                node = node.value
+            if not indices or not isinstance(node, ast.Name) or not all(map(_simple_index, indices)):
+                continue
+            used = {n.id for i in indices for n in ast.walk(i) if isinstance(n, ast.Name)}
+            if used & rebound:
+                continue
+            indices.reverse()
+            expr = ast.Expression(ast.Tuple(elts=indices, ctx=ast.Load()))
+            code = compile(ast.fix_missing_locations(expr), "<index>", "eval")
+            for line in range(stmt.lineno, (stmt.end_lineno or stmt.lineno) + 1):
+                writes.setdefault(line, []).append((node.id, code))
+    return writes
+
+
+class CodeTracer:
+    """
+    Traces one function call inside a sandbox.
 
-    def _trace_lines(self, frame, event, arg):
+    Modes:
+      "count" - only counts executed lines (self.steps). Uses sys.monitoring on 3.12+.
+      "lines" - steps plus per-line hit counts (self.coverage). Uses sys.monitoring on 3.12+.
+      "full"  - one TraceLog record per executed line with the variables that CHANGED on that
+                line (a delta against the previous line of the same call), plus one record
+                per return holding RETURN_VAR (steps aren't counted for those). Values are
+                bounded snapshots (the first MAX_HEAD items and the size); a line is only
+                checked for the locals its bytecode can rebind, and an object that kept its
+                identity is re-snapshotted only when its probe (_probe) changed.
+
+    Every mode stops the run with TraceLimitExceeded after max_steps lines;
+    full mode also stops once the spilled log passes max_bytes.
+    """
+    def __init__(self, mode="full", max_steps=MAX_STEPS, max_bytes=MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown trace mode '{mode}' (expected one of {MODES})")
+        self.mode = mode
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.log = TraceLog(max_bytes=max_bytes)
+        self.steps = 0
+        self.coverage = Counter()
+        self._elements = {}
+
+    # --- sys.settrace backend ---
+    def _trace_calls(self, frame, event, arg):
+        if event != 'call' or frame.f_code.co_filename != SOURCE_NAME:
+            return None
+        if self.mode == "full":
+            return self._frame_tracer(frame.f_code)
+        if self.mode == "lines":
+            return self._trace_coverage
+        return self._trace_count
+
+    def _over_budget(self):
+        return TraceLimitExceeded(f"Exceeded {self.max_steps} steps (possible infinite loop)")
+
+    def _trace_count(self, frame, event, arg):
+        if event == 'line':
+            self.steps += 1
+            if self.steps > self.max_steps:
+                raise self._over_budget()
+        return self._trace_count
+
+    def _trace_coverage(self, frame, event, arg):
         if event == 'line':
-            # Record line number and local variables
-            clean_vars = {k:repr(v) for k,v in frame.f_locals.items() if not k.startswith('_') and k != 'self'}
-            self.log.append({
-                "line": frame.f_lineno, 
-                "vars": clean_vars
-            })
-        return self._trace_lines
+            self.steps += 1
+            if self.steps > self.max_steps:
+                raise self._over_budget()
+            self.coverage[frame.f_lineno] += 1
+        return self._trace_coverage
+
+    def _frame_tracer(self, code):
+        """
+        Per-call line tracer. Each record holds the locals whose snapshot the line
+        before it changed. Only the locals that line can rebind are looked at, or
+        every one (by probe) after a line that can change an object in place, so
+        an in-place write shows wherever it lands in what snapshot() shows. Item
+        stores outside that (dp[500] = ...) get their own "name[index]" entries
+        when the source is known.
+        """
+        previous = {}  # name -> (object, probe, snapshot)
+        log = self.log
+        effects = _effects(code)
+        elements = self._elements
+        last_offset = last_line = None  # where the previous line started
+
+        def look(name, value, changed):
+            """Records name if its snapshot changed; True if it changed in place."""
+            prev = previous.get(name)
+            if prev is not None and prev[0] is value:
+                if type(value) in _ATOMS:
+                    return False
+                probe = _probe(value)
+                if probe is not None and probe == prev[1]:
+                    return False
+                in_place = True
+            else:
+                probe = None if type(value) in _ATOMS else _probe(value)
+                in_place = False
+            shot = snapshot(value)
+            previous[name] = (value, probe, shot)
+            if prev is None or prev[2] != shot:
+                changed[name] = shot
+            return in_place
+
+        def changes(frame):
+            changed = {}
+            names, everything = effects.get(last_offset, _ANYTHING)
+            writes = elements.get(last_line, ())
+            if not (names or everything or writes):
+                return changed  # nothing that line did can show
+            local = frame.f_locals
+            if not everything:
+                for name in names:
+                    value = local.get(name, _MISSING)
+                    if type(value) in _ATOMS:
+                        prev = previous.get(name)
+                        if prev is None or prev[0] is not value:
+                            shot = snapshot(value)
+                            previous[name] = (value, None, shot)
+                            if prev is None or prev[2] != shot:
+                                changed[name] = shot
+                    elif value is not _MISSING and look(name, value, changed):
+                        everything = True  # aliases of the object may show it too
+            if everything:
+                for k, v in local.items():
+                    if not k.startswith('_') and k != 'self':
+                        look(k, v, changed)
+            for name, indices in writes:
+                if name in changed:
+                    continue
+                try:
+                    value = local[name]
+                    keys = eval(indices, _NO_BUILTINS, local)
+                    for key in keys:
+                        if not isinstance(value, (list, dict)):
+                            raise TypeError
+                        value = value[key]
+                except Exception:
+                    continue
+                changed[name + "".join(f"[{key!r}]" for key in keys)] = snapshot(value)
+            return changed
+
+        def trace_lines(frame, event, arg):
+            nonlocal last_offset, last_line
+            if event == 'line':
+                self.steps += 1
+                if self.steps > self.max_steps:
+                    raise self._over_budget()
+                log.append(self.steps, frame.f_lineno, changes(frame))
+                last_offset, last_line = frame.f_lasti, frame.f_lineno
+            elif event == 'return':
+                changed = changes(frame)
+                changed[RETURN_VAR] = snapshot(arg)
+                log.append(self.steps, frame.f_lineno, changed)
+            return trace_lines
+        return trace_lines
+
+    # --- sys.monitoring backend (3.12+, count/lines modes) ---
+    def _start_monitoring(self):
+        """Returns the claimed tool id, or None if settrace should be used instead."""
+        if not _HAS_MONITORING or self.mode == "full":
+            return None
+        mon = sys.monitoring
+        for tool in (mon.PROFILER_ID, 3, 4):
+            try:
+                mon.use_tool_id(tool, "codealigner")
+            except ValueError:
+                continue
+            coverage = self.coverage if self.mode == "lines" else None
+            line_of = {}  # code -> {offset: line}, for same-line loop detection
+
+            def on_line(code, line):
+                if code.co_filename != SOURCE_NAME:
+                    return mon.DISABLE
+                self.steps += 1
+                if self.steps > self.max_steps:
+                    raise self._over_budget()
+                if coverage is not None:
+                    coverage[line] += 1
+
+            def on_jump(code, src, dest):
+                # settrace also reports a 'line' event for a backward jump that lands on the
+                # same line (one-line loops, comprehensions); LINE alone would skip those.
+                # A jump instruction always has the same target, so any other jump is disabled.
+                if dest > src:
+                    return mon.DISABLE
+                lines = line_of.get(code)
+                if lines is None:
+                    if code.co_filename != SOURCE_NAME:
+                        return mon.DISABLE
+                    lines = line_of[code] = {off: ln for start, end, ln in code.co_lines()
+                                             for off in range(start, end, 2)}
+                line = lines.get(dest)
+                if line is None or line != lines.get(src):
+                    return mon.DISABLE
+                self.steps += 1
+                if self.steps > self.max_steps:
+                    raise self._over_budget()
+                if coverage is not None:
+                    coverage[line] += 1
+
+            mon.register_callback(tool, mon.events.LINE, on_line)
+            mon.register_callback(tool, mon.events.JUMP, on_jump)
+            mon.set_events(tool, mon.events.LINE | mon.events.JUMP)
+            return tool
+        return None
+
+    @staticmethod
+    def _stop_monitoring(tool):
+        mon = sys.monitoring
+        mon.set_events(tool, 0)
+        mon.register_callback(tool, mon.events.LINE, None)
+        mon.register_callback(tool, mon.events.JUMP, None)
+        mon.free_tool_id(tool)
+        mon.restart_events()  # re-arm locations we DISABLEd for library code
 
     def run(self, code_str, func_name, args, is_class=False):
-        self.log = [] # Reset log
-        
-        # Sandbox environment
-        sandbox = {"List": List} 
-        
+        """
+        code_str is source, or bytes from artifacts.compile_solution() (skips compiling).
+        The module is compiled and executed once per process (module_cache.py) and
+        reset between runs, so repeated runs of the same code only pay for the call.
+        """
+        self.log = TraceLog(max_bytes=self.max_bytes) # Reset log
+        self.steps = 0
+        self.coverage = Counter()
+        self._elements = _element_writes(code_str) if self.mode == "full" and isinstance(code_str, str) else {}
+
+        previous_trace = sys.gettrace()
+        tool = None
+
         try:
-            # 1. Compile the string into real code
-            exec(code_str, sandbox)
-            
-            # 2. Start Recording
-            sys.settrace(self._trace_lines)
-            
-            # 3. Execute
-            if is_class:
-                # Logic: instance = Solution(); instance.func()
-                instance = sandbox['Solution']()
-                method = getattr(instance, func_name)
-                result = method(*args)
+            # 1. Load the module (cached) and resolve the entry point:
+            #    a fresh Solution() per run for classes, the function otherwise
+            target = load_module(code_str).entry(func_name, is_class)
+
+            # 2. Start Recording & Execute
+            tool = self._start_monitoring()
+            if tool is None:
+                sys.settrace(self._trace_calls)
+            result = target(*args)
+            return result, self.log.finish()
+
+        except (TraceLimitExceeded, Exception) as e:
+            return f"Error: {str(e) or type(e).__name__}", self.log.finish()
+
+        finally:
+            # 3. Stop Recording
+            if tool is not None:
+                self._stop_monitoring(tool)
             else:
-                # Logic: func()
-                func = sandbox[func_name]
-                result = func(*args)
-                
-            # 4. Stop Recording
-            sys.settrace(None)
-            return result, self.log
-            
-        except Exception as e:
-            sys.settrace(None)
-            return f"Error: {e}", self.log
\ No newline at end of file
+                sys.settrace(previous_trace)
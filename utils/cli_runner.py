@@ -1,15 +1,15 @@
-from search_engine import find_solution
-from tracer import CodeTracer
+from search_engine import find_solutions
+from executor import get_pool
 from inspector import inspect_code_snippet
-import google.generativeai as genai
-from google.api_core.exceptions import ResourceExhausted
+from signature import analyze_signature, signature_from_metadata
+from difftest import parse_args
+from llm_gateway import generate, ResourceExhausted
 import ast
+import os
 
 # --- CONFIGURATION ---
-# PASTE YOUR API KEY HERE
-API_KEY = "YOUR_API_KEY"
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+# Set GEMINI_API_KEY in the environment (or paste your key here)
+API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_API_KEY")
 
 def get_ai_feedback(user_code, lang, issue_type, context):
     """
@@ -37,8 +37,7 @@ def get_ai_feedback(user_code, lang, issue_type, context):
     Use Markdown. Use bolding for key concepts. Keep it concise.
     """
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate(prompt, API_KEY)
     except ResourceExhausted:
         return "⚠️ AI Traffic Limit Reached. Please wait 60s."
     except Exception as e:
@@ -71,19 +70,19 @@ def run_universal_pipeline(user_code, problem_desc=""):
     real_args = ([1, 5, 2],) # Default fallback
 
     if lang == 'python':
-        tracer = CodeTracer()
+        pool = get_pool()
         
         # Prepare Arguments safely
         try:
-            real_args = eval(test_inputs_str)
-            if not isinstance(real_args, tuple): real_args = (real_args,)
-        except:
+            real_args = parse_args(test_inputs_str)
+        except ValueError:
             print("⚠️ Error parsing input string. Using default.")
 
         print(f"\n--- 1. RUNNING USER TRACE ---")
         try:
             # Run User Code
-            u_res, u_log = tracer.run(user_code, user_func, real_args, is_class=False)
+            u_run = pool.run(user_code, user_func, real_args, is_class=False)
+            u_res, u_log = u_run["result"], u_run["log"]
             
             # CHECK FOR CRASHES
             if isinstance(u_res, str) and "Error" in u_res:
@@ -91,7 +90,8 @@ def run_universal_pipeline(user_code, problem_desc=""):
                 print(get_ai_feedback(user_code, lang, "RUNTIME ERROR", f"Error message: {u_res}"))
                 return # Stop if user code crashes
 
-            print(f"✅ Result: {u_res} (Steps: {len(u_log)})")
+            u_steps = u_run["steps"]
+            print(f"✅ Result: {u_res} (Steps: {u_steps})")
             
         except Exception as e:
             print(f"❌ System Error: {e}")
@@ -103,22 +103,25 @@ def run_universal_pipeline(user_code, problem_desc=""):
     print("\n--- 2. SEARCHING KNOWLEDGE BASE ---")
     
     # HYBRID SEARCH: Pass the AI's predicted slug to boost accuracy
-    golden_code, conf = find_solution(user_code, predicted_slug=predicted_slug)
+    match = find_solutions([user_code], slugs=[predicted_slug], top_k=1)[0]
+    best = match[0] if match else {}
+    golden_code, conf = best.get('code'), best.get('confidence', 0.0)
     
     # If conf > 0.9, it means we found an EXACT slug match
     if conf > 0.9:
         print(f"Match Found! (Type: Exact Slug Match)")
         
         if lang == 'python':
-            # Inspect golden code to find function name
-            print("   [inspector] Scanning Golden Solution...")
-            gold_meta = inspect_code_snippet(golden_code, "", API_KEY)
+            # Entry point comes from the signature stored at build time (no LLM call)
+            gold_sig = signature_from_metadata(best.get('metadata')) or analyze_signature(golden_code)
             
-            if gold_meta:
-                gold_func = gold_meta.get('user_function') or "twoSum"
+            if gold_sig:
+                gold_func = gold_sig["entry_point"]
                 
                 print(f"   [tracer] Running Golden Code: '{gold_func}'")
-                g_res, g_log = tracer.run(golden_code, gold_func, real_args, is_class=True)
+                g_run = pool.run(golden_code, gold_func, real_args,
+                                 is_class=gold_sig["class"] is not None, mode="count")
+                g_res, g_steps = g_run["result"], g_run["steps"]
                 
                 # --- PHASE 4: LOGIC COMPARISON ---
                 print("\n--- 3. MENTOR FEEDBACK ---")
@@ -129,9 +132,9 @@ def run_universal_pipeline(user_code, problem_desc=""):
                         f"User Result: {u_res} | Expected (Golden) Result: {g_res}"))
                 
                 # CASE B: SLOW CODE (Strict Check: 2x slower)
-                elif len(u_log) > len(g_log) * 2:
+                elif u_steps > g_steps * 2:
                     print(get_ai_feedback(user_code, lang, "INEFFICIENT CODE", 
-                        f"User Steps: {len(u_log)} | Optimized Steps: {len(g_log)}. The code is inefficient."))
+                        f"User Steps: {u_steps} | Optimized Steps: {g_steps}. The code is inefficient."))
                 
                 # CASE C: GOOD CODE
                 else:
@@ -0,0 +1,82 @@
+"""
+Recall / latency comparison of the search backends in vector_backends.py.
+
+Run from the repo root:  python -m utils.compare_backends [--queries 200] [--k 10]
+
+Queries are stored solution vectors with a little Gaussian noise added;
+ground truth is an exact float32 brute-force scan over every stored vector.
+"""
+import argparse
+import time
+import os
+
+import numpy as np
+
+from search_engine import get_engine
+from vector_backends import ChromaBackend, FlatInt8Backend, FLAT_INDEX_DIR, PAGE_SIZE, flat_index_is_current
+
+
+def load_all_vectors(collection):
+    ids, vectors = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings"], limit=PAGE_SIZE, offset=offset)
+        if not len(page['ids']):
+            break
+        ids.extend(page['ids'])
+        vectors.append(np.asarray(page['embeddings'], dtype=np.float32))
+        offset += len(page['ids'])
+    return ids, np.concatenate(vectors)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def benchmark(backend, queries, truth, k):
+    latencies, recalls = [], []
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = backend.query([q.tolist()], k)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({d for d, _ in hits} & expected) / k)
+    return sum(recalls) / len(recalls), percentile(latencies, 50), percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.02)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    collection = engine.collection
+    index_dir = os.path.join(engine.db_path, FLAT_INDEX_DIR)
+    if not flat_index_is_current(index_dir, collection.count()):
+        FlatInt8Backend.build(collection, index_dir)
+
+    print("Loading stored vectors for ground truth...")
+    ids, matrix = load_all_vectors(collection)
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+    queries = matrix[picks] + rng.normal(scale=args.noise, size=(len(picks), matrix.shape[1])).astype(np.float32)
+
+    truth = []
+    for q in queries:
+        dists = ((matrix - q) ** 2).sum(axis=1)
+        truth.append({ids[i] for i in np.argsort(dists)[:args.k]})
+
+    float_mb = matrix.nbytes / 1e6
+    int8_mb = sum(os.path.getsize(os.path.join(index_dir, f)) for f in ("vectors.i8", "scales.f32", "sqnorms.f32")) / 1e6
+
+    print(f"\n{len(ids)} vectors x {matrix.shape[1]} dims | {len(queries)} queries | recall@{args.k}")
+    print(f"{'backend':<12} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8} {'vectors MB':>11}")
+    for backend, size_mb in ((ChromaBackend(collection), float_mb), (FlatInt8Backend(index_dir), int8_mb)):
+        recall, p50, p95 = benchmark(backend, queries, truth, args.k)
+        print(f"{backend.name:<12} {recall:>8.3f} {p50:>8.2f} {p95:>8.2f} {size_mb:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import shutil
+import json
+import os
+
+# --- CONFIGURATION ---
+DEFAULT_BACKEND = os.getenv("CODEALIGNER_SEARCH_BACKEND", "chroma")  # "chroma" | "flat-int8"
+FLAT_INDEX_DIR = "flat_index"   # inside the DB folder
+SCAN_CHUNK = 65536              # rows dequantised at a time (bounds RAM during a scan)
+PAGE_SIZE = 5000
+
+
+def distance(a, b, space="l2"):
+    """Same distance Chroma reports for the collection's HNSW space."""
+    if space == "cosine":
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+        return 1 - dot / norm if norm else 1.0
+    if space == "ip":
+        return 1 - sum(x * y for x, y in zip(a, b))
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+class ChromaBackend:
+    """Default backend: Chroma's own HNSW index over float32 vectors."""
+    name = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.space = (collection.metadata or {}).get("hnsw:space", "l2")
+
+    def query(self, query_vectors, top_k):
+        """Returns, per query, [(doc_id, distance)] best-first."""
+        results = self.collection.query(query_embeddings=query_vectors, n_results=top_k, include=["distances"])
+        return [list(zip(ids, dists)) for ids, dists in zip(results['ids'], results['distances'])]
+
+    def distances(self, query_vector, ids):
+        """{doc_id: distance} for specific stored documents."""
+        stored = self.collection.get(ids=list(ids), include=["embeddings"])
+        return {d: distance(query_vector, v, self.space) for d, v in zip(stored['ids'], stored['embeddings'])}
+
+
+class FlatInt8Backend:
+    """
+    Exact (brute force) scan over int8-quantised vectors, memory-mapped from disk.
+    Each row is stored as round(v / scale) with a per-row float32 scale,
+    so the index is 4x smaller than float32 and only SCAN_CHUNK rows are
+    dequantised at a time. Distances are squared L2, like Chroma's default.
+    """
+    name = "flat-int8"
+    space = "l2"  # squared L2, as distance() computes it
+
+    def __init__(self, index_dir):
+        import numpy as np
+        self.np = np
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(index_dir, "ids.json"), "r", encoding="utf-8") as f:
+            self.ids = json.load(f)
+        self.count, self.dim = meta["count"], meta["dim"]
+        if self.count:
+            self.codes = np.memmap(os.path.join(index_dir, "vectors.i8"), dtype=np.int8, mode="r",
+                                   shape=(self.count, self.dim))
+        else:
+            self.codes = np.zeros((0, self.dim), dtype=np.int8)  # mmap of an empty file fails
+        self.scales = np.fromfile(os.path.join(index_dir, "scales.f32"), dtype=np.float32)
+        self.sqnorms = np.fromfile(os.path.join(index_dir, "sqnorms.f32"), dtype=np.float32)
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def query(self, query_vectors, top_k):
+        np = self.np
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        top_k = min(top_k, self.count)
+        if top_k == 0:
+            return [[] for _ in queries]
+
+        # |q - v|^2 = |q|^2 + |v|^2 - 2 q.v, scanned chunk by chunk keeping a running top-k
+        q_sq = (queries ** 2).sum(axis=1, keepdims=True)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_dists = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count, SCAN_CHUNK):
+            stop = min(start + SCAN_CHUNK, self.count)
+            block = self.codes[start:stop].astype(np.float32) * self.scales[start:stop, None]
+            dists = q_sq + self.sqnorms[None, start:stop] - 2.0 * queries @ block.T
+
+            keep = min(top_k, stop - start)
+            part = np.argpartition(dists, keep - 1, axis=1)[:, :keep]
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+            best_dists = np.concatenate([best_dists, np.take_along_axis(dists, part, axis=1)], axis=1)
+            if best_rows.shape[1] > top_k:
+                part = np.argpartition(best_dists, top_k - 1, axis=1)[:, :top_k]
+                best_rows = np.take_along_axis(best_rows, part, axis=1)
+                best_dists = np.take_along_axis(best_dists, part, axis=1)
+
+        results = []
+        for rows, dists in zip(best_rows, best_dists):
+            order = np.argsort(dists)
+            results.append([(self.ids[rows[i]], float(max(dists[i], 0.0))) for i in order])
+        return results
+
+    def distances(self, query_vector, ids):
+        np = self.np
+        q = np.asarray(query_vector, dtype=np.float32)
+        out = {}
+        for doc_id in ids:
+            row = self.row_of.get(doc_id)
+            if row is not None:
+                v = self.codes[row].astype(np.float32) * self.scales[row]
+                out[doc_id] = float(((q - v) ** 2).sum())
+        return out
+
+    # --- BUILD ---
+    @staticmethod
+    def build(collection, index_dir):
+        """Exports every stored embedding into the int8 flat index files."""
+        import numpy as np
+        tmp_dir = index_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        ids, scales, sqnorms = [], [], []
+        dim = None
+        offset = 0
+        with open(os.path.join(tmp_dir, "vectors.i8"), "wb") as codes_file:
+            while True:
+                page = collection.get(include=["embeddings"], limit=PAGE_SIZE, offset=offset)
+                if not len(page['ids']):
+                    break
+                vectors = np.asarray(page['embeddings'], dtype=np.float32)
+                dim = vectors.shape[1]
+                scale = np.abs(vectors).max(axis=1) / 127.0
+                scale[scale == 0] = 1.0
+                codes = np.clip(np.rint(vectors / scale[:, None]), -127, 127).astype(np.int8)
+                dequantised = codes.astype(np.float32) * scale[:, None]
+
+                codes_file.write(codes.tobytes())
+                ids.extend(page['ids'])
+                scales.append(scale.astype(np.float32))
+                sqnorms.append((dequantised ** 2).sum(axis=1).astype(np.float32))
+                offset += len(page['ids'])
+
+        empty = np.zeros(0, dtype=np.float32)
+        np.concatenate(scales or [empty]).tofile(os.path.join(tmp_dir, "scales.f32"))
+        np.concatenate(sqnorms or [empty]).tofile(os.path.join(tmp_dir, "sqnorms.f32"))
+        with open(os.path.join(tmp_dir, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": len(ids), "dim": dim or 0}, f)
+
+        shutil.rmtree(index_dir, ignore_errors=True)
+        os.replace(tmp_dir, index_dir)
+
+
+def flat_index_is_current(index_dir, count):
+    try:
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("count") == count
+    except (OSError, ValueError):
+        return False
+
+
+def make_backend(name, collection, db_path):
+    """Builds the named backend, exporting the flat index from Chroma if it is missing or stale."""
+    if name == ChromaBackend.name:
+        return ChromaBackend(collection)
+    if name == FlatInt8Backend.name:
+        index_dir = os.path.join(db_path, FLAT_INDEX_DIR)
+        if not flat_index_is_current(index_dir, collection.count()):
+            print("   [Search Engine] Exporting int8 flat index...")
+            FlatInt8Backend.build(collection, index_dir)
+        return FlatInt8Backend(index_dir)
+    raise ValueError(f"Unknown search backend '{name}' (expected 'chroma' or 'flat-int8')")
+
+
+def invalidate_flat_index(db_path):
+    """Called by build_db.py after writing, so the next flat-int8 search re-exports."""
+    shutil.rmtree(os.path.join(db_path, FLAT_INDEX_DIR), ignore_errors=True)